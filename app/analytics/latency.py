@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import math
+import threading
+from collections.abc import Iterable
+from typing import Any
+
+REPORT_QUANTILES: tuple[float, ...] = (0.5, 0.95, 0.99)
+
+
+class QuantileSketch:
+    """对数分桶的流式分位数草图（DDSketch）。
+
+    数值 v 落入第 ceil(log_gamma(v)) 个桶，gamma = (1 + a) / (1 - a)，
+    任意分位数的估计值与真实值的相对误差不超过 relative_accuracy（a）。
+    内存只与数值跨越的量级有关（1ms~1h 约 400 个桶），与样本数无关；同参数的草图可直接合并。
+    """
+
+    __slots__ = ("relative_accuracy", "_gamma", "_log_gamma", "_bins", "_zero_count", "count", "total", "min", "max")
+
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f"relative_accuracy 需在 0~1 之间，当前为 {relative_accuracy}")
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._bins: dict[int, int] = {}
+        self._zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        if value < 0:
+            raise ValueError(f"只支持非负数值，当前为 {value}")
+        if value == 0:
+            self._zero_count += 1
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self._bins[key] = self._bins.get(key, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: QuantileSketch) -> None:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("只能合并 relative_accuracy 相同的草图")
+        for key, count in other._bins.items():
+            self._bins[key] = self._bins.get(key, 0) + count
+        self._zero_count += other._zero_count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float | None:
+        if not 0 <= q <= 1:
+            raise ValueError(f"分位数需在 0~1 之间，当前为 {q}")
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self._zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self._bins):
+            seen += self._bins[key]
+            if seen > rank:
+                estimate = 2 * self._gamma**key / (self._gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def summary(self, quantiles: tuple[float, ...] = REPORT_QUANTILES) -> dict[str, Any]:
+        result: dict[str, Any] = {"count": self.count}
+        for q in quantiles:
+            value = self.quantile(q)
+            result[f"p{q * 100:g}"] = round(value, 3) if value is not None else None
+        result["mean"] = round(self.total / self.count, 3) if self.count else None
+        result["max"] = self.max if self.count else None
+        return result
+
+
+class LatencyRecorder:
+    """线程安全的按名称分组耗时记录，用于进程内的细粒度调用（如单条 ADB 命令）。"""
+
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        self.relative_accuracy = relative_accuracy
+        self._sketches: dict[str, QuantileSketch] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, duration_ms: float) -> None:
+        with self._lock:
+            sketch = self._sketches.get(name)
+            if sketch is None:
+                sketch = self._sketches[name] = QuantileSketch(self.relative_accuracy)
+            sketch.add(duration_ms)
+
+    def summary(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            return {name: sketch.summary() for name, sketch in sorted(self._sketches.items())}
+
+
+def summarize_step_latency(
+    rows: Iterable[tuple[str, str, str | None, float]],
+    relative_accuracy: float = 0.01,
+) -> dict[str, dict[str, dict[str, Any]]]:
+    """把 (step_name, channel, device_id, duration_ms) 流聚合为按步骤、通道、设备分组的分位数（毫秒）。
+
+    逐行写入草图，内存与行数无关；没有设备的通道（如浏览器）不计入 by_device。
+    """
+    groups: dict[str, dict[str, QuantileSketch]] = {"by_step": {}, "by_channel": {}, "by_device": {}}
+
+    def add(group: str, key: str, value: float) -> None:
+        sketch = groups[group].get(key)
+        if sketch is None:
+            sketch = groups[group][key] = QuantileSketch(relative_accuracy)
+        sketch.add(value)
+
+    for step_name, channel, device_id, duration_ms in rows:
+        add("by_step", step_name, duration_ms)
+        add("by_channel", channel, duration_ms)
+        if device_id:
+            add("by_device", device_id, duration_ms)
+    return {group: {key: sketch.summary() for key, sketch in sorted(sketches.items())} for group, sketches in groups.items()}
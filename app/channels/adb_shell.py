@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import queue
+import shlex
+import subprocess
+import threading
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import IO
+from uuid import uuid4
+
+
+class AdbSessionError(ConnectionError):
+    """shell 会话中断或无法建立；output 为中断前已收到的输出（如 adb 的报错信息）。"""
+
+    def __init__(self, message: str, output: str = "") -> None:
+        super().__init__(message)
+        self.output = output
+
+
+@dataclass(frozen=True, slots=True)
+class ShellResult:
+    returncode: int
+    stdout: str
+
+
+class AdbShellSession:
+    """每台设备一个常驻的 `adb shell` 进程，命令逐条写入其 stdin，按哨兵行切分输出。
+
+    一次性的 `adb -s <id> shell ...` 每次都要启动 adb 客户端进程并与 adb server 握手（通常 100~300ms），
+    会话模式只在首次调用（或断线后）付出这部分开销。每条命令写成
+    `sh -c '<cmd>' </dev/null 2>&1; printf '\\n<哨兵> %d\\n' $?`：命令整体经 shlex.quote 引用后交给子 sh，
+    引号不配对、`exit`、`cd` 等只影响这一条命令，不会吞掉哨兵或改变会话状态；stdin 重定向避免命令读走
+    后续命令，stderr 合并进输出，哨兵行携带退出码；哨兵含每个会话随机的 token 与递增序号，命令输出不会误匹配。
+    与 adb shell 多参数时相同，参数以空格拼接后交给设备端 sh 解释。
+
+    同一会话的命令串行执行（设备端本来也是一个 sh 依次执行）。进程退出或写入失败时下一次调用自动重连；
+    命令执行中途断开抛 AdbSessionError（不自动重发，避免点击等操作被执行两次），超时抛
+    subprocess.TimeoutExpired 并关闭会话，下一次调用重新连接。
+    """
+
+    def __init__(self, adb_path: str = "adb", device_id: str | None = None) -> None:
+        self.adb_path = adb_path
+        self.device_id = device_id
+        self.connects = 0
+        self._lock = threading.Lock()
+        self._proc: subprocess.Popen[bytes] | None = None
+        self._lines: queue.Queue[bytes | None] = queue.Queue()
+        self._token = uuid4().hex[:12]
+        self._seq = 0
+
+    @property
+    def argv(self) -> list[str]:
+        device = ["-s", self.device_id] if self.device_id else []
+        return [self.adb_path, *device, "shell"]
+
+    def run(self, command: Sequence[str] | str, timeout: float = 30) -> ShellResult:
+        line = command if isinstance(command, str) else " ".join(command)
+        with self._lock:
+            self._seq += 1
+            marker = f"__RN_{self._token}_{self._seq}__ "
+            self._send(f"sh -c {shlex.quote(line)} </dev/null 2>&1; printf '\\n{marker}%d\\n' $?\n".encode())
+            return self._collect(marker, line, timeout)
+
+    def _send(self, data: bytes) -> None:
+        # 写入失败说明命令尚未送达设备，重启会话重试一次是安全的。
+        for attempt in range(2):
+            proc = self._ensure_started()
+            try:
+                assert proc.stdin is not None
+                proc.stdin.write(data)
+                proc.stdin.flush()
+                return
+            except OSError as exc:
+                self._close()
+                if attempt == 1:
+                    raise AdbSessionError(f"无法向 adb shell 写入命令: {exc}") from exc
+
+    def _collect(self, marker: str, command: str, timeout: float) -> ShellResult:
+        deadline = time.monotonic() + timeout
+        chunks: list[str] = []
+        while True:
+            try:
+                raw = self._lines.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                self._close()
+                raise subprocess.TimeoutExpired([*self.argv, command], timeout, output="".join(chunks)) from None
+            if raw is None:
+                self._close()
+                raise AdbSessionError("adb shell 会话在命令执行中断开", "".join(chunks))
+            text = raw.decode("utf-8", errors="replace").replace("\r\n", "\n")
+            if text.startswith(marker):
+                output = "".join(chunks)
+                # 去掉 printf 在哨兵前补的换行。
+                return ShellResult(int(text[len(marker) :].strip()), output[:-1] if output.endswith("\n") else output)
+            chunks.append(text)
+
+    def _ensure_started(self) -> subprocess.Popen[bytes]:
+        if self._proc is not None and self._proc.poll() is None:
+            return self._proc
+        self._close()
+        self.connects += 1
+        proc = subprocess.Popen(self.argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        # 每个进程一个独立的行队列：旧进程残留的输出不会混进新会话。
+        self._lines = lines = queue.Queue()
+        threading.Thread(target=_pump, args=(proc.stdout, lines), name="adb-shell-reader", daemon=True).start()
+        self._proc = proc
+        return proc
+
+    def _close(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            if proc.stdin is not None:
+                proc.stdin.close()
+        except OSError:
+            pass
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+    def __enter__(self) -> AdbShellSession:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def _pump(stream: IO[bytes] | None, lines: queue.Queue[bytes | None]) -> None:
+    assert stream is not None
+    try:
+        for line in iter(stream.readline, b""):
+            lines.put(line)
+    except (OSError, ValueError):
+        pass
+    finally:
+        lines.put(None)
@@ -1,40 +1,114 @@
 from __future__ import annotations
 
 import subprocess
+import time
 from pathlib import Path
 from typing import Any
 
+from app.analytics.latency import LatencyRecorder
+from app.channels.adb_shell import AdbSessionError, AdbShellSession
+from app.channels.screencap import PNG_SIGNATURE, ScreencapError, ScreenFrame, parse_raw_screencap
+from app.channels.ui_hierarchy import UiDumpError, UiHierarchy, UiNode, extract_hierarchy_xml
+
 
 class AndroidDeviceClient:
     """ADB client for minimal device interactions used by DeviceAutoChannel."""
 
-    def __init__(self, device_id: str, adb_path: str = "adb", artifact_dir: str = "artifacts/android") -> None:
+    def __init__(
+        self,
+        device_id: str,
+        adb_path: str = "adb",
+        artifact_dir: str = "artifacts/android",
+        shell_session: bool = False,
+    ) -> None:
         self.device_id = device_id
         self.adb_path = adb_path
         self.artifact_dir = Path(artifact_dir)
         self.artifact_dir.mkdir(parents=True, exist_ok=True)
+        self.latency = LatencyRecorder()
+        # 会话模式下 shell 命令走常驻的 adb shell 进程（首次调用时才连接），其余 adb 命令仍逐次启动进程。
+        self.shell = AdbShellSession(adb_path, device_id) if shell_session else None
+        # 每次可能改变界面的操作后递增，界面层级缓存据此失效。
+        self.screen_version = 0
+        self.ui = UiHierarchy(self.dump_ui, lambda: self.screen_version)
 
-    def _run(self, args: list[str], timeout: int = 30) -> subprocess.CompletedProcess[str]:
+    def _run(self, args: list[str], timeout: int = 30, text: bool = True) -> subprocess.CompletedProcess[Any]:
         cmd = [self.adb_path, "-s", self.device_id, *args]
-        return subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, check=False)
+        started = time.perf_counter()
+        try:
+            if self.shell is not None and text and args[0] == "shell" and len(args) > 1:
+                return self._run_in_session(cmd, args[1:], timeout)
+            return subprocess.run(cmd, capture_output=True, text=text, timeout=timeout, check=False)
+        finally:
+            # 按命令分组（如 "shell input"、"exec-out screencap"、"pull"），超时的调用同样计入。
+            name = " ".join(args[:2]) if args[0] in ("shell", "exec-out") and len(args) > 1 else args[0]
+            self.latency.record(name, (time.perf_counter() - started) * 1000)
+
+    def _run_in_session(self, cmd: list[str], command: list[str], timeout: int) -> subprocess.CompletedProcess[str]:
+        """会话中 stderr 已合并进 stdout；会话中断时按 adb 传输错误的惯例返回 255，不重发命令。"""
+        assert self.shell is not None
+        try:
+            result = self.shell.run(command, timeout=timeout)
+        except AdbSessionError as exc:
+            return subprocess.CompletedProcess(cmd, 255, exc.output, str(exc))
+        return subprocess.CompletedProcess(cmd, result.returncode, result.stdout, "")
+
+    def close(self) -> None:
+        if self.shell is not None:
+            self.shell.close()
 
     def tap(self, x: int, y: int) -> bool:
+        self.screen_version += 1
         return self._run(["shell", "input", "tap", str(x), str(y)]).returncode == 0
 
     def input_text(self, text: str) -> bool:
         escaped = text.replace(" ", "%s")
+        self.screen_version += 1
         return self._run(["shell", "input", "text", escaped]).returncode == 0
 
     def start_app(self, package: str, activity: str) -> bool:
+        self.screen_version += 1
         res = self._run(["shell", "am", "start", "-n", f"{package}/{activity}"])
         return res.returncode == 0
 
+    def dump_ui(self, timeout: int = 30) -> bytes:
+        """经 exec-out 把 `uiautomator dump /dev/tty` 的 XML 直接读进内存，不经设备存储与 pull。"""
+        res = self._run(["exec-out", "uiautomator", "dump", "/dev/tty"], timeout, text=False)
+        if res.returncode != 0:
+            raise UiDumpError(f"uiautomator dump 失败 returncode={res.returncode}: {res.stderr.decode(errors='replace').strip()}")
+        return extract_hierarchy_xml(res.stdout)
+
+    def find_element(
+        self, text: str | None = None, resource_id: str | None = None, content_desc: str | None = None, contains: bool = False
+    ) -> UiNode | None:
+        """在缓存的界面层级中查找元素；界面未变化时不重新 dump。"""
+        return self.ui.find(text, resource_id, content_desc, contains)
+
+    def tap_element(
+        self, text: str | None = None, resource_id: str | None = None, content_desc: str | None = None, contains: bool = False
+    ) -> bool:
+        """点击元素中心；找不到元素时不点击，返回 False。"""
+        node = self.find_element(text, resource_id, content_desc, contains)
+        return node is not None and self.tap(*node.center)
+
+    def capture_png(self, timeout: int = 30) -> bytes:
+        """经 exec-out 把 `screencap -p` 的输出直接读进内存：一次往返，不落设备存储，同一设备可并发截图。"""
+        res = self._run(["exec-out", "screencap", "-p"], timeout, text=False)
+        if res.returncode != 0 or not res.stdout.startswith(PNG_SIGNATURE):
+            raise ScreencapError(f"截图失败 returncode={res.returncode}: {res.stderr.decode(errors='replace').strip()}")
+        return res.stdout
+
+    def capture_frame(self, timeout: int = 30) -> ScreenFrame:
+        """原始帧缓冲（不经设备端 PNG 压缩，设备耗时更短、传输量更大）；frame.to_array() 可转 numpy 数组。"""
+        res = self._run(["exec-out", "screencap"], timeout, text=False)
+        if res.returncode != 0:
+            raise ScreencapError(f"截图失败 returncode={res.returncode}: {res.stderr.decode(errors='replace').strip()}")
+        return parse_raw_screencap(res.stdout)
+
     def screenshot(self, filename: str) -> str:
-        remote = "/sdcard/rednote_autopilot_screen.png"
+        """截图并保存为 artifact_dir 下的 PNG 文件，返回本地路径。"""
         local = self.artifact_dir / filename
-        self._run(["shell", "screencap", "-p", remote])
-        self._run(["pull", remote, str(local)])
-        self._run(["shell", "rm", "-f", remote])
+        local.write_bytes(self.capture_png())
         return str(local)
 
     def health(self) -> dict[str, Any]:
@@ -0,0 +1,322 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import logging
+import os
+import queue
+import threading
+import weakref
+from collections import OrderedDict, deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from importlib.util import find_spec
+from pathlib import Path
+
+from app.channels.screencap import ScreenFrame
+from app.models.serializer import serializer
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL = "thumbnail"
+FULL = "full"
+MANIFEST_NAME = "manifest.jsonl"
+
+_scope: ContextVar[tuple[str, str] | None] = ContextVar("artifact_scope", default=None)
+
+
+@contextmanager
+def artifact_scope(task_id: str, step_name: str) -> Iterator[None]:
+    """标记当前线程正在执行的任务步骤；通道截图时据此决定分片目录与 manifest 中的 step_name。"""
+    token = _scope.set((task_id, step_name))
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def current_artifact_scope() -> tuple[str, str] | None:
+    return _scope.get()
+
+
+@dataclass(frozen=True, slots=True)
+class ArtifactRecord:
+    """manifest.jsonl 中的一行。path 为相对存储根目录的路径，即写入 listing_task_steps.artifact_path 的值；
+    deduplicated 为 True 时 path 指向此前已保存的（近似）相同帧，本次没有写新文件；
+    error 非空表示后台写盘失败，path 处没有文件。"""
+
+    path: str
+    task_id: str
+    step_name: str
+    kind: str
+    digest: str
+    dhash: str
+    width: int
+    height: int
+    created_at: str
+    deduplicated: bool = False
+    error: str | None = None
+
+
+def _luma_grid(frame: ScreenFrame, columns: int, rows: int, samples: int = 4) -> list[list[int]]:
+    """把画面切成 rows x columns 个格子，每格取 samples x samples 个采样点的 R+G+B 均值。
+
+    R+G+B 与通道顺序无关，RGBA/BGRA 无需先转换；只读采样点，1080x2400 的帧也只访问几千个像素。
+    """
+    channels, pixels, width = frame.channels, frame.pixels, frame.width
+    grid = []
+    for row in range(rows):
+        values = []
+        for column in range(columns):
+            total = 0
+            for sy in range(samples):
+                y = min(frame.height - 1, ((row * samples + sy) * 2 + 1) * frame.height // (rows * samples * 2))
+                for sx in range(samples):
+                    x = min(width - 1, ((column * samples + sx) * 2 + 1) * width // (columns * samples * 2))
+                    offset = (y * width + x) * channels
+                    total += pixels[offset] + pixels[offset + 1] + pixels[offset + 2]
+            values.append(total)
+        grid.append(values)
+    return grid
+
+
+def dhash(frame: ScreenFrame, size: int = 8) -> int:
+    """差值感知哈希（dHash）：size x (size+1) 灰度网格中每行相邻格子比较亮度，得到 size*size 位整数。"""
+    bits = 0
+    for values in _luma_grid(frame, size + 1, size):
+        for left, right in zip(values, values[1:]):
+            bits = (bits << 1) | (left > right)
+    return bits
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def downscale(frame: ScreenFrame, max_width: int) -> ScreenFrame:
+    """最近邻缩放到不超过 max_width 宽（等比例）；按行切片拼接，不依赖 Pillow。"""
+    if frame.width <= max_width:
+        return frame
+    channels = frame.channels
+    width = max_width
+    height = max(1, frame.height * width // frame.width)
+    stride = frame.width * channels
+    columns = [(x * frame.width // width) * channels for x in range(width)]
+    rows = []
+    for y in range(height):
+        line = frame.pixels[(y * frame.height // height) * stride :][:stride]
+        rows.append(b"".join(line[offset : offset + channels] for offset in columns))
+    return ScreenFrame(width, height, frame.pixel_format, b"".join(rows))
+
+
+def _encode(frame: ScreenFrame, image_format: str) -> bytes:
+    if image_format == "png":
+        return frame.to_png()
+    from PIL import Image
+
+    mode = "RGBA" if frame.color_channels == 4 else "RGB"
+    buffer = io.BytesIO()
+    Image.frombytes(mode, (frame.width, frame.height), frame.rgb_bytes()).save(buffer, format="WEBP", quality=80)
+    return buffer.getvalue()
+
+
+def _shutdown(writes: queue.Queue[tuple[ArtifactRecord, ScreenFrame | None] | None], writer: threading.Thread) -> None:
+    writes.put(None)
+    writer.join()
+
+
+class ArtifactStore:
+    """按内容寻址的截图存储：去重、缩略图与后台写入。
+
+    每帧先算像素的 blake2b 摘要与 dHash：与同一任务最近保存的帧摘要相同、或 dHash 汉明距离不超过
+    near_duplicate_bits 时视为重复（界面没有变化），直接复用已有文件，只在 manifest 中追加一行。
+    默认只保存缩略图（宽度缩到 thumbnail_width；安装了 Pillow 时编码为 WebP，否则为 PNG），
+    keep_full=True（失败步骤）时额外保留无损的全分辨率 PNG，全分辨率帧只按摘要精确去重。
+
+    文件按任务分片：`<task_id 前两位>/<task_id>/<摘要>.<扩展名>`，同目录下的 manifest.jsonl 记录该任务
+    每一次截图（含被去重的），resolve(artifact_path) 可由步骤表中的路径查回截图元数据。
+
+    put() 只在调用线程里算哈希，缩放、编码与写盘交给后台写线程，不占用设备控制循环；待写队列满
+    （max_pending 帧）时 put() 阻塞等待，内存占用有上界。flush() 等待已提交的帧全部落盘。
+    写盘失败的帧在 manifest 中带 error 记录（引用它的去重帧同样如此），并从去重窗口中移除，
+    下一张相同画面会重新保存。
+    """
+
+    def __init__(
+        self,
+        root: str | Path,
+        thumbnail_width: int = 360,
+        near_duplicate_bits: int = 4,
+        recent_frames: int = 16,
+        thumbnail_format: str | None = None,
+        max_pending: int = 32,
+        max_tasks: int = 256,
+    ) -> None:
+        self.root = Path(root)
+        self.thumbnail_width = thumbnail_width
+        self.near_duplicate_bits = near_duplicate_bits
+        self.recent_frames = recent_frames
+        self.thumbnail_format = thumbnail_format or ("webp" if find_spec("PIL") is not None else "png")
+        self.max_tasks = max_tasks
+        self.saved = 0
+        self.deduplicated = 0
+        self.write_errors = 0
+        self._lock = threading.Lock()
+        # task_id -> 最近保存的 (dHash, 摘要, kind, path)；按任务 LRU，只保留 max_tasks 个任务。
+        self._recent: OrderedDict[str, deque[tuple[int, str, str, str]]] = OrderedDict()
+        self._writes: queue.Queue[tuple[ArtifactRecord, ScreenFrame | None] | None] = queue.Queue(maxsize=max_pending)
+        self._writer: threading.Thread | None = None
+        self._stop_writer: weakref.finalize | None = None
+
+    def put(self, frame: ScreenFrame, task_id: str, step_name: str, keep_full: bool = False) -> ArtifactRecord:
+        digest = hashlib.blake2b(frame.pixels, digest_size=16).hexdigest()
+        fingerprint = dhash(frame)
+        kind = FULL if keep_full else THUMBNAIL
+        with self._lock:
+            recent = self._recent_for(task_id)
+            match = next(
+                (
+                    path
+                    for seen_hash, seen_digest, seen_kind, path in recent
+                    if seen_kind == kind
+                    and (
+                        seen_digest == digest
+                        or (kind == THUMBNAIL and hamming(seen_hash, fingerprint) <= self.near_duplicate_bits)
+                    )
+                ),
+                None,
+            )
+            path = match or self._relative_path(task_id, digest, kind)
+            if match is None:
+                recent.append((fingerprint, digest, kind, path))
+                self.saved += 1
+            else:
+                self.deduplicated += 1
+        record = ArtifactRecord(
+            path=path,
+            task_id=task_id,
+            step_name=step_name,
+            kind=kind,
+            digest=digest,
+            dhash=f"{fingerprint:016x}",
+            width=frame.width,
+            height=frame.height,
+            created_at=datetime.now(timezone.utc).isoformat(),
+            deduplicated=match is not None,
+        )
+        self._ensure_writer()
+        self._writes.put((record, None if match else frame))
+        return record
+
+    def _recent_for(self, task_id: str) -> deque[tuple[int, str, str, str]]:
+        recent = self._recent.get(task_id)
+        if recent is None:
+            recent = self._recent[task_id] = deque(maxlen=self.recent_frames)
+            if len(self._recent) > self.max_tasks:
+                self._recent.popitem(last=False)
+        else:
+            self._recent.move_to_end(task_id)
+        return recent
+
+    def _relative_path(self, task_id: str, digest: str, kind: str) -> str:
+        suffix = ".full.png" if kind == FULL else f".{self.thumbnail_format}"
+        return f"{task_id[:2]}/{task_id}/{digest[:20]}{suffix}"
+
+    def _ensure_writer(self) -> None:
+        with self._lock:
+            if self._writer is not None:
+                return
+            self._writer = threading.Thread(target=self._write_loop, name="artifact-writer", daemon=True)
+            self._writer.start()
+            # 进程退出前把队列中的帧写完；finalize 不持有 self，不妨碍存储对象被回收。
+            self._stop_writer = weakref.finalize(self, _shutdown, self._writes, self._writer)
+
+    def _write_loop(self) -> None:
+        while True:
+            item = self._writes.get()
+            try:
+                if item is None:
+                    return
+                record, frame = item
+                try:
+                    if frame is not None:
+                        self._write_file(record, frame)
+                    elif not (self.root / record.path).exists():
+                        raise FileNotFoundError(f"去重引用的截图 {record.path} 未落盘")
+                except Exception as exc:  # noqa: BLE001
+                    with self._lock:
+                        self.write_errors += 1
+                    logger.exception("写入截图失败 path=%s", record.path)
+                    self._forget(record)
+                    record = replace(record, error=str(exc) or type(exc).__name__)
+                self._append_manifest(record)
+            except Exception:  # noqa: BLE001
+                logger.exception("写入截图 manifest 失败 path=%s", item[0].path if item else None)
+            finally:
+                self._writes.task_done()
+
+    def _write_file(self, record: ArtifactRecord, frame: ScreenFrame) -> None:
+        target = self.root / record.path
+        if target.exists():
+            return
+        if record.kind == FULL:
+            data = frame.to_png()
+        else:
+            data = _encode(downscale(frame, self.thumbnail_width), self.thumbnail_format)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再原子替换，读取方不会看到半个文件。
+        partial = target.with_name(target.name + ".part")
+        partial.write_bytes(data)
+        os.replace(partial, target)
+
+    def _forget(self, record: ArtifactRecord) -> None:
+        with self._lock:
+            recent = self._recent.get(record.task_id)
+            if recent is not None:
+                for entry in [entry for entry in recent if entry[3] == record.path]:
+                    recent.remove(entry)
+
+    def _manifest_path(self, task_id: str) -> Path:
+        return self.root / task_id[:2] / task_id / MANIFEST_NAME
+
+    def _append_manifest(self, record: ArtifactRecord) -> None:
+        path = self._manifest_path(record.task_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a", encoding="utf-8") as handle:
+            handle.write(serializer.dumps(record) + "\n")
+
+    def manifest(self, task_id: str) -> list[ArtifactRecord]:
+        """某个任务的全部截图记录（按写入顺序）；未落盘的帧需先 flush()。"""
+        path = self._manifest_path(task_id)
+        if not path.exists():
+            return []
+        with path.open(encoding="utf-8") as handle:
+            return [ArtifactRecord(**serializer.loads(line)) for line in handle if line.strip()]
+
+    def resolve(self, artifact_path: str) -> ArtifactRecord | None:
+        """由步骤表中的 artifact_path 查回首次保存该文件时的记录；写盘失败的返回 None。"""
+        task_id = Path(artifact_path).parent.name
+        return next(
+            (
+                record
+                for record in self.manifest(task_id)
+                if record.path == artifact_path and not record.deduplicated and record.error is None
+            ),
+            None,
+        )
+
+    def absolute(self, artifact_path: str) -> Path:
+        return self.root / artifact_path
+
+    def flush(self) -> None:
+        self._writes.join()
+
+    def close(self) -> None:
+        """写完已提交的帧并停止写线程；之后再 put() 会重新启动写线程。"""
+        with self._lock:
+            stop, self._stop_writer, self._writer = self._stop_writer, None, None
+        if stop is not None:
+            stop()
@@ -1,14 +1,19 @@
 from __future__ import annotations
 
+from collections.abc import Mapping
 from typing import Any, Protocol
 
 
 class CommerceChannel(Protocol):
-    """Unified capability contract for product/order/inventory operations."""
+    """Unified capability contract for product/order/inventory operations.
 
-    def create_product(self, payload: dict[str, Any]) -> dict[str, Any]: ...
+    create_product/update_product 收到的 payload 可能是模型缓存的只读视图（与 input_snapshot 共用），
+    需要改写顶层键的通道先 dict(payload) 复制。
+    """
 
-    def update_product(self, payload: dict[str, Any]) -> dict[str, Any]: ...
+    def create_product(self, payload: Mapping[str, Any]) -> dict[str, Any]: ...
+
+    def update_product(self, payload: Mapping[str, Any]) -> dict[str, Any]: ...
 
     def set_product_online(self, xhs_product_id: str) -> dict[str, Any]: ...
 
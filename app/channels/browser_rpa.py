@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from collections.abc import Mapping
 from typing import Any
 
 
@@ -9,7 +10,7 @@ class BrowserRPAChannel:
     def __init__(self, mode: str = "manual") -> None:
         self.mode = mode
 
-    def _queued(self, action: str, payload: dict[str, Any]) -> dict[str, Any]:
+    def _queued(self, action: str, payload: Mapping[str, Any]) -> dict[str, Any]:
         return {
             "success": True,
             "mode": self.mode,
@@ -18,10 +19,10 @@ class BrowserRPAChannel:
             "payload": payload,
         }
 
-    def create_product(self, payload: dict[str, Any]) -> dict[str, Any]:
+    def create_product(self, payload: Mapping[str, Any]) -> dict[str, Any]:
         return self._queued("create_product", payload)
 
-    def update_product(self, payload: dict[str, Any]) -> dict[str, Any]:
+    def update_product(self, payload: Mapping[str, Any]) -> dict[str, Any]:
         return self._queued("update_product", payload)
 
     def set_product_online(self, xhs_product_id: str) -> dict[str, Any]:
@@ -1,43 +1,81 @@
 from __future__ import annotations
 
+import logging
 import time
+from collections.abc import Mapping
 from typing import Any
 
 from app.channels.android_device_client import AndroidDeviceClient
+from app.channels.artifacts import ArtifactStore, current_artifact_scope
+from app.channels.device_pool import current_device
+
+logger = logging.getLogger(__name__)
 
 
 class DeviceAutoChannel:
-    """全自动手机端上架通道：支持 dry-run 与真实 ADB 客户端。"""
+    """全自动手机端上架通道：支持 dry-run 与真实 ADB 客户端。
+
+    执行器配置了设备池时为每个设备步骤租用一台设备，通道操作当前线程租到的设备；
+    没有租约（单设备，或脚本直接调用）时操作 device_id 对应的默认设备。
+    """
 
-    def __init__(self, device_id: str = "emulator-5554", dry_run: bool = True) -> None:
+    def __init__(
+        self,
+        device_id: str = "emulator-5554",
+        dry_run: bool = True,
+        shell_session: bool = True,
+        artifact_store: ArtifactStore | None = None,
+    ) -> None:
         self.device_id = device_id
         self.dry_run = dry_run
-        self.client = AndroidDeviceClient(device_id=device_id)
+        self.client = AndroidDeviceClient(device_id=device_id, shell_session=shell_session)
+        self.artifacts = artifact_store or ArtifactStore(self.client.artifact_dir)
+
+    def _client(self) -> AndroidDeviceClient:
+        lease = current_device()
+        return lease.client if lease is not None else self.client
 
-    def _ok(self, action: str, payload: dict[str, Any]) -> dict[str, Any]:
+    def _ok(self, action: str, payload: Mapping[str, Any]) -> dict[str, Any]:
         return {
             "success": True,
             "mode": "auto_device",
-            "device_id": self.device_id,
+            "device_id": self._client().device_id,
             "action": action,
             "status": "done",
             "payload": payload,
             "timestamp": int(time.time() * 1000),
         }
 
-    def _device_snapshot(self, action: str) -> str:
-        filename = f"{action}_{int(time.time() * 1000)}.png"
-        return self.client.screenshot(filename)
+    def _device_snapshot(self, action: str, failed: bool = False) -> str:
+        """截取原始帧交给截图存储（去重、缩略图、后台写盘），返回相对存储根目录的 artifact 路径。
+
+        在任务步骤中执行时按 task_id 分片；脚本等无任务上下文的调用归入 adhoc。
+        """
+        scope = current_artifact_scope()
+        task_id, step_name = scope if scope is not None else ("adhoc", action)
+        record = self.artifacts.put(self._client().capture_frame(), task_id, step_name, keep_full=failed)
+        return record.path
+
+    def _failure_snapshot(self, action: str) -> None:
+        """操作失败时保留一张全分辨率截图；截图本身失败只记日志，不掩盖原始异常。"""
+        try:
+            self._device_snapshot(action, failed=True)
+        except Exception:  # noqa: BLE001
+            logger.warning("失败现场截图失败 device_id=%s action=%s", self._client().device_id, action, exc_info=True)
 
-    def create_product(self, payload: dict[str, Any]) -> dict[str, Any]:
+    def create_product(self, payload: Mapping[str, Any]) -> dict[str, Any]:
         if self.dry_run:
             item_id = f"auto_{int(time.time() * 1000)}"
             result = self._ok("create_product", payload)
             result["data"] = {"item_id": item_id}
             return result
 
-        self.client.start_app("com.xingin.xhs", "com.xingin.xhs.index.v2.IndexActivityV2")
-        artifact = self._device_snapshot("create_product")
+        try:
+            self._client().start_app("com.xingin.xhs", "com.xingin.xhs.index.v2.IndexActivityV2")
+            artifact = self._device_snapshot("create_product")
+        except Exception:
+            self._failure_snapshot("create_product")
+            raise
         item_id = f"device_{int(time.time() * 1000)}"
         return {
             "success": True,
@@ -49,14 +87,18 @@ class DeviceAutoChannel:
             "payload": payload,
         }
 
-    def update_product(self, payload: dict[str, Any]) -> dict[str, Any]:
+    def update_product(self, payload: Mapping[str, Any]) -> dict[str, Any]:
         return self._ok("update_product", payload)
 
     def set_product_online(self, xhs_product_id: str) -> dict[str, Any]:
         if self.dry_run:
             return self._ok("set_product_online", {"item_id": xhs_product_id})
 
-        artifact = self._device_snapshot("set_product_online")
+        try:
+            artifact = self._device_snapshot("set_product_online")
+        except Exception:
+            self._failure_snapshot("set_product_online")
+            raise
         return {
             "success": True,
             "mode": "auto_device",
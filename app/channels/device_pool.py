@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import logging
+import subprocess
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+
+from app.channels.android_device_client import AndroidDeviceClient
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceUnavailableError(ConnectionError):
+    """等待租约超时：池中没有健康的空闲设备（按瞬时故障处理，步骤可重试）。"""
+
+
+# 计为设备失败的异常：ADB 通道/传输层故障（adb 会话、截图、UI dump 错误均为 ConnectionError）与超时。
+# 业务校验、页面元素找不到等与设备健康无关的异常不计入，免得把好设备隔离。
+DEVICE_FAILURES: tuple[type[BaseException], ...] = (TimeoutError, ConnectionError, subprocess.SubprocessError)
+
+
+@dataclass(frozen=True, slots=True)
+class DeviceLease:
+    device_id: str
+    client: AndroidDeviceClient
+    task_id: str
+
+
+_current: ContextVar[DeviceLease | None] = ContextVar("device_lease", default=None)
+
+
+def current_device() -> DeviceLease | None:
+    """当前线程持有的设备租约；DeviceAutoChannel 据此选择操作哪台设备。"""
+    return _current.get()
+
+
+@dataclass
+class _Device:
+    device_id: str
+    client: AndroidDeviceClient
+    leased_by: str | None = None
+    # None 表示可用；否则为隔离到期的时刻，到期后需通过一次健康检查才能重新出租。
+    quarantined_until: float | None = None
+    quarantines: int = 0
+    consecutive_failures: int = 0
+    leases: int = 0
+    failures: int = 0
+    last_released: float = 0.0
+    last_error: str | None = None
+
+
+class DevicePool:
+    """多台设备（模拟器）的租约池：每个设备步骤独占租用一台，用完归还。
+
+    出租时优先给 prefer 指定的设备（同一任务上一步用过的设备），否则给空闲最久的健康设备，
+    负载在各设备间均匀分布；没有可用设备时等待，超过 lease_timeout 抛 DeviceUnavailableError。
+    require 为严格亲和：只租该设备（依赖设备上已有状态的步骤，如发布前一步填好的草稿），设备忙时等待，
+    不在池中或隔离中时立即抛 DeviceUnavailableError，不会换到别的设备上。
+    租用期间抛出 failure_types 中的异常（通道/传输故障）计为设备的一次失败，其他异常既不计失败也不清零计数；
+    同一设备连续失败 failure_threshold 次即隔离，隔离时长从 quarantine_seconds 起每次翻倍（不超过
+    max_quarantine_seconds）；到期后先跑一次 AndroidDeviceClient.health 探测，通过才重新出租，
+    租用期间执行成功后隔离计数清零。check_health() 供定时任务巡检空闲设备，discover() 从 `adb devices`
+    补充新上线的设备，并隔离列表中已不在线的设备。
+    """
+
+    def __init__(
+        self,
+        device_ids: Iterable[str] = (),
+        adb_path: str = "adb",
+        shell_session: bool = True,
+        failure_threshold: int = 3,
+        quarantine_seconds: float = 120.0,
+        max_quarantine_seconds: float = 1800.0,
+        lease_timeout: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+        client_factory: Callable[[str], AndroidDeviceClient] | None = None,
+        failure_types: tuple[type[BaseException], ...] = DEVICE_FAILURES,
+    ) -> None:
+        if failure_threshold < 1:
+            raise ValueError(f"failure_threshold 需 >= 1，当前为 {failure_threshold}")
+        self.adb_path = adb_path
+        self.failure_threshold = failure_threshold
+        self.quarantine_seconds = quarantine_seconds
+        self.max_quarantine_seconds = max_quarantine_seconds
+        self.lease_timeout = lease_timeout
+        self.failure_types = failure_types
+        self._clock = clock
+        self._client_factory = client_factory or (
+            lambda device_id: AndroidDeviceClient(device_id, adb_path=adb_path, shell_session=shell_session)
+        )
+        self._cond = threading.Condition()
+        self._devices: dict[str, _Device] = {}
+        for device_id in device_ids:
+            self.add(device_id)
+
+    def add(self, device_id: str) -> bool:
+        with self._cond:
+            if device_id in self._devices:
+                return False
+            self._devices[device_id] = _Device(device_id, self._client_factory(device_id))
+            self._cond.notify_all()
+            return True
+
+    @property
+    def device_ids(self) -> list[str]:
+        with self._cond:
+            return list(self._devices)
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+    def discover(self, timeout: float = 30) -> list[str]:
+        """按 `adb devices` 的结果加入新设备，隔离已不在线的空闲设备；返回在线设备列表。"""
+        res = subprocess.run([self.adb_path, "devices"], capture_output=True, text=True, timeout=timeout, check=False)
+        online = [parts[0] for parts in map(str.split, res.stdout.splitlines()[1:]) if len(parts) >= 2 and parts[1] == "device"]
+        for device_id in online:
+            self.add(device_id)
+        with self._cond:
+            for device in self._devices.values():
+                if device.device_id not in online and device.leased_by is None and device.quarantined_until is None:
+                    self._quarantine(device, "adb devices 中不在线")
+        return online
+
+    @contextmanager
+    def lease(
+        self, task_id: str, prefer: str | None = None, timeout: float | None = None, require: str | None = None
+    ) -> Iterator[DeviceLease]:
+        """租用一台设备直到退出；块内抛出的 failure_types 异常计为该设备的一次失败。"""
+        device = self._acquire(task_id, prefer, self.lease_timeout if timeout is None else timeout, require)
+        lease = DeviceLease(device.device_id, device.client, task_id)
+        token = _current.set(lease)
+        error: BaseException | None = None
+        succeeded = False
+        try:
+            yield lease
+            succeeded = True
+        except self.failure_types as exc:
+            error = exc
+            raise
+        finally:
+            _current.reset(token)
+            self._release(device, error, succeeded)
+
+    def _acquire(self, task_id: str, prefer: str | None, timeout: float, require: str | None = None) -> _Device:
+        deadline = self._clock() + timeout
+        while True:
+            with self._cond:
+                while (device := self._pick(prefer, require)) is None:
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        wanted = f"设备 {require}" if require is not None else f"可用设备（共 {len(self._devices)} 台）"
+                        raise DeviceUnavailableError(f"{timeout:g}s 内没有等到{wanted}")
+                    self._cond.wait(min(remaining, self._next_expiry()))
+                device.leased_by = task_id
+                probation = device.quarantined_until is not None
+                if not probation:
+                    device.leases += 1
+                    return device
+            # 隔离到期的设备先探测，探测在锁外进行，不阻塞其他租约。
+            if self._probe(device):
+                with self._cond:
+                    device.leases += 1
+                return device
+
+    def _pick(self, prefer: str | None, require: str | None = None) -> _Device | None:
+        now = self._clock()
+        if require is not None:
+            device = self._devices.get(require)
+            if device is None:
+                raise DeviceUnavailableError(f"设备 {require} 不在设备池中")
+            if device.quarantined_until is not None and device.quarantined_until > now:
+                raise DeviceUnavailableError(f"设备 {require} 隔离中: {device.last_error}")
+            return device if device.leased_by is None else None
+        candidates = [
+            device
+            for device in self._devices.values()
+            if device.leased_by is None and (device.quarantined_until is None or device.quarantined_until <= now)
+        ]
+        if not candidates:
+            return None
+        preferred = next((device for device in candidates if device.device_id == prefer and device.quarantined_until is None), None)
+        return preferred or min(candidates, key=lambda device: (device.quarantined_until is not None, device.last_released))
+
+    def _next_expiry(self) -> float:
+        now = self._clock()
+        pending = [device.quarantined_until - now for device in self._devices.values() if device.quarantined_until is not None]
+        return max(0.01, min(pending, default=1.0))
+
+    def _probe(self, device: _Device) -> bool:
+        ok = _healthy(device.client)
+        with self._cond:
+            if ok:
+                device.quarantined_until = None
+                logger.info("设备 %s 探测通过，解除隔离", device.device_id)
+            else:
+                device.leased_by = None
+                self._quarantine(device, "隔离到期后健康检查未通过")
+                self._cond.notify_all()
+        return ok
+
+    def _release(self, device: _Device, error: BaseException | None, succeeded: bool) -> None:
+        with self._cond:
+            device.leased_by = None
+            device.last_released = self._clock()
+            if succeeded:
+                device.consecutive_failures = 0
+                device.quarantines = 0
+            elif error is not None:
+                device.failures += 1
+                device.consecutive_failures += 1
+                device.last_error = str(error)
+                if device.consecutive_failures >= self.failure_threshold:
+                    self._quarantine(device, f"连续失败 {device.consecutive_failures} 次: {error}")
+            self._cond.notify_all()
+
+    def _quarantine(self, device: _Device, reason: str) -> None:
+        device.quarantines += 1
+        duration = min(self.max_quarantine_seconds, self.quarantine_seconds * 2 ** (device.quarantines - 1))
+        device.quarantined_until = self._clock() + duration
+        device.consecutive_failures = 0
+        device.last_error = reason
+        logger.warning("隔离设备 %s %.0fs：%s", device.device_id, duration, reason)
+
+    def check_health(self) -> dict[str, bool]:
+        """对所有空闲设备做健康检查：失败的隔离，隔离已到期且检查通过的恢复可用。"""
+        with self._cond:
+            idle = [device for device in self._devices.values() if device.leased_by is None]
+        results = {device.device_id: _healthy(device.client) for device in idle}
+        with self._cond:
+            now = self._clock()
+            for device in idle:
+                if device.leased_by is not None:
+                    continue
+                if not results[device.device_id]:
+                    if device.quarantined_until is None or device.quarantined_until <= now:
+                        self._quarantine(device, "健康检查未通过")
+                elif device.quarantined_until is not None and device.quarantined_until <= now:
+                    device.quarantined_until = None
+            self._cond.notify_all()
+        return results
+
+    def metrics(self) -> dict[str, Any]:
+        with self._cond:
+            now = self._clock()
+            devices = []
+            for device in self._devices.values():
+                if device.leased_by is not None:
+                    state = "leased"
+                elif device.quarantined_until is not None:
+                    state = "quarantined"
+                else:
+                    state = "idle"
+                devices.append(
+                    {
+                        "device_id": device.device_id,
+                        "state": state,
+                        "leased_by": device.leased_by,
+                        "leases": device.leases,
+                        "failures": device.failures,
+                        "quarantines": device.quarantines,
+                        "quarantine_remaining_seconds": (
+                            round(max(0.0, device.quarantined_until - now), 3) if device.quarantined_until is not None else None
+                        ),
+                        "last_error": device.last_error,
+                    }
+                )
+            counts = {state: sum(item["state"] == state for item in devices) for state in ("idle", "leased", "quarantined")}
+            return {"size": len(devices), **counts, "devices": devices}
+
+    def latency(self) -> dict[str, dict[str, Any]]:
+        """各设备客户端的 ADB 命令耗时分布，按 device_id。"""
+        with self._cond:
+            devices = list(self._devices.values())
+        return {device.device_id: device.client.latency.summary() for device in devices}
+
+    def close(self) -> None:
+        for device in list(self._devices.values()):
+            device.client.close()
+
+
+def _healthy(client: AndroidDeviceClient) -> bool:
+    try:
+        return bool(client.health()["ok"])
+    except Exception:  # noqa: BLE001
+        return False
@@ -1,11 +1,35 @@
+from app.channels.artifacts import ArtifactStore
 from app.channels.base import CommerceChannel
 from app.channels.browser_rpa import BrowserRPAChannel
 from app.channels.device_auto import DeviceAutoChannel
-from app.config.settings import get_settings
+from app.channels.device_pool import DevicePool
+from app.config.settings import Settings, get_settings
+
+
+def build_device_pool(settings: Settings) -> DevicePool | None:
+    """配置了 device_ids（逗号分隔）或开启 device_discover 时构建多设备池，否则返回 None（单设备）。"""
+    device_ids = [device_id.strip() for device_id in settings.device_ids.split(",") if device_id.strip()]
+    if not device_ids and not settings.device_discover:
+        return None
+    pool = DevicePool(
+        device_ids,
+        shell_session=settings.device_shell_session,
+        failure_threshold=settings.device_failure_threshold,
+        quarantine_seconds=settings.device_quarantine_seconds,
+        lease_timeout=settings.device_lease_timeout_seconds,
+    )
+    if settings.device_discover:
+        pool.discover()
+    return pool
 
 
 def build_channel() -> CommerceChannel:
     settings = get_settings()
     if settings.operation_mode == "auto_device":
-        return DeviceAutoChannel(device_id=settings.device_id, dry_run=settings.device_dry_run)
+        return DeviceAutoChannel(
+            device_id=settings.device_id,
+            dry_run=settings.device_dry_run,
+            shell_session=settings.device_shell_session,
+            artifact_store=ArtifactStore(settings.artifact_dir, thumbnail_width=settings.artifact_thumbnail_width),
+        )
     return BrowserRPAChannel(mode=settings.operation_mode)
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import struct
+import zlib
+from dataclasses import dataclass
+from importlib.util import find_spec
+from typing import Any
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# android.graphics.PixelFormat -> 每像素字节数；screencap 实际只会输出这几种。
+RGBA_8888 = 1
+RGBX_8888 = 2
+RGB_888 = 3
+BGRA_8888 = 5
+_BYTES_PER_PIXEL = {RGBA_8888: 4, RGBX_8888: 4, RGB_888: 3, BGRA_8888: 4}
+
+
+class ScreencapError(ConnectionError):
+    """exec-out screencap 未返回有效图像（多为设备离线或 adb 传输中断，按瞬时故障处理）。"""
+
+
+@dataclass(frozen=True, slots=True)
+class ScreenFrame:
+    """screencap 原始帧：pixels 为按行排列、无填充的像素字节。"""
+
+    width: int
+    height: int
+    pixel_format: int
+    pixels: bytes
+
+    @property
+    def channels(self) -> int:
+        """pixels 中每像素的字节数。"""
+        return _BYTES_PER_PIXEL[self.pixel_format]
+
+    @property
+    def color_channels(self) -> int:
+        """rgb_bytes() 每像素的通道数：有透明通道的格式为 4，RGB_888 与 RGBX_8888 为 3。"""
+        return 3 if self.pixel_format in (RGB_888, RGBX_8888) else 4
+
+    def rgb_bytes(self) -> bytes:
+        """转成 RGBA 或 RGB 顺序的像素字节；RGBX_8888 的 X 是填充字节而不是透明度，直接丢掉。"""
+        if self.pixel_format == RGBX_8888:
+            rgb = bytearray(len(self.pixels) // 4 * 3)
+            rgb[0::3], rgb[1::3], rgb[2::3] = self.pixels[0::4], self.pixels[1::4], self.pixels[2::4]
+            return bytes(rgb)
+        if self.pixel_format != BGRA_8888:
+            return self.pixels
+        swapped = bytearray(self.pixels)
+        swapped[0::4], swapped[2::4] = self.pixels[2::4], self.pixels[0::4]
+        return bytes(swapped)
+
+    def to_array(self) -> Any:
+        """(height, width, color_channels) 的 uint8 numpy 数组（RGBA/RGB 顺序）；需要安装 numpy。"""
+        if find_spec("numpy") is None:
+            raise RuntimeError("ScreenFrame.to_array 需要 numpy：uv pip install numpy")
+        import numpy as np
+
+        return np.frombuffer(self.rgb_bytes(), dtype=np.uint8).reshape(self.height, self.width, self.color_channels)
+
+    def to_png(self, compress_level: int = 6) -> bytes:
+        return encode_png(self.width, self.height, self.rgb_bytes(), self.color_channels, compress_level)
+
+
+def parse_raw_screencap(data: bytes) -> ScreenFrame:
+    """解析不带 -p 的 screencap 输出：width/height/format（Android 9 起再加 colorspace）的小端 uint32 头 + 像素。"""
+    if len(data) < 12:
+        raise ScreencapError(f"screencap 输出过短: {len(data)} 字节")
+    width, height, pixel_format = struct.unpack_from("<III", data)
+    bpp = _BYTES_PER_PIXEL.get(pixel_format)
+    if bpp is None:
+        raise ScreencapError(f"不支持的像素格式: {pixel_format}")
+    size = width * height * bpp
+    for header in (16, 12):
+        if len(data) == header + size:
+            return ScreenFrame(width, height, pixel_format, data[header:])
+    raise ScreencapError(f"screencap 输出长度 {len(data)} 与 {width}x{height} 像素不符")
+
+
+def _png_chunk(kind: bytes, body: bytes) -> bytes:
+    return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+
+
+def encode_png(width: int, height: int, pixels: bytes, channels: int = 4, compress_level: int = 6) -> bytes:
+    """用标准库把 RGBA（channels=4）或 RGB（channels=3）像素编码为 PNG，不依赖 Pillow。"""
+    color_type = {4: 6, 3: 2}[channels]
+    stride = width * channels
+    if len(pixels) != stride * height:
+        raise ValueError(f"像素长度 {len(pixels)} 与 {width}x{height}x{channels} 不符")
+    # 每行前加过滤类型 0（None）：截图中大片纯色区域靠 deflate 本身即可压得很小。
+    raw = b"".join(b"\x00" + pixels[row : row + stride] for row in range(0, len(pixels), stride))
+    header = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+    return (
+        PNG_SIGNATURE
+        + _png_chunk(b"IHDR", header)
+        + _png_chunk(b"IDAT", zlib.compress(raw, compress_level))
+        + _png_chunk(b"IEND", b"")
+    )
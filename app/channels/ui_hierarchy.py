@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import io
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections.abc import Callable
+from dataclasses import dataclass
+
+_BOUNDS = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+
+
+class UiDumpError(ConnectionError):
+    """uiautomator dump 未输出界面层级（如设备离线、界面持续动画时的 could not get idle state），按瞬时故障处理。"""
+
+
+@dataclass(frozen=True, slots=True)
+class UiNode:
+    """界面层级中的一个节点；bounds 为 (left, top, right, bottom) 屏幕像素坐标。"""
+
+    text: str
+    resource_id: str
+    content_desc: str
+    class_name: str
+    package: str
+    bounds: tuple[int, int, int, int]
+    clickable: bool
+    enabled: bool
+
+    @property
+    def center(self) -> tuple[int, int]:
+        left, top, right, bottom = self.bounds
+        return (left + right) // 2, (top + bottom) // 2
+
+    @property
+    def visible(self) -> bool:
+        left, top, right, bottom = self.bounds
+        return right > left and bottom > top
+
+
+def parse_bounds(value: str) -> tuple[int, int, int, int]:
+    match = _BOUNDS.fullmatch(value.strip())
+    if match is None:
+        return 0, 0, 0, 0
+    left, top, right, bottom = (int(group) for group in match.groups())
+    return left, top, right, bottom
+
+
+def extract_hierarchy_xml(output: bytes) -> bytes:
+    """从 `uiautomator dump /dev/tty` 的输出中截出 XML：文档之后还跟着一行 "UI hierchary dumped to: /dev/tty"。"""
+    start = output.find(b"<?xml")
+    if start < 0:
+        start = output.find(b"<hierarchy")
+    end = output.rfind(b"</hierarchy>")
+    if start < 0 or end < 0:
+        message = output.decode("utf-8", errors="replace").strip()[:200]
+        raise UiDumpError(f"uiautomator dump 未返回界面层级: {message or '空输出'}")
+    return output[start : end + len(b"</hierarchy>")]
+
+
+class UiIndex:
+    """一次 dump 的节点索引：按 text、resource-id、content-desc 建哈希索引，精确查找为 O(1)。
+
+    nodes 按文档顺序（先父后子）排列；同一个键对应多个节点时返回文档中最靠前的可见节点。
+    """
+
+    def __init__(self, nodes: list[UiNode]) -> None:
+        self.nodes = nodes
+        self.by_text: dict[str, list[UiNode]] = {}
+        self.by_resource_id: dict[str, list[UiNode]] = {}
+        self.by_content_desc: dict[str, list[UiNode]] = {}
+        for node in nodes:
+            if not node.visible:
+                continue
+            for key, table in (
+                (node.text, self.by_text),
+                (node.resource_id, self.by_resource_id),
+                (node.content_desc, self.by_content_desc),
+            ):
+                if key:
+                    table.setdefault(key, []).append(node)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def find_all(
+        self,
+        text: str | None = None,
+        resource_id: str | None = None,
+        content_desc: str | None = None,
+        contains: bool = False,
+    ) -> list[UiNode]:
+        """同时满足所给条件的可见节点；contains=True 时 text/content_desc 按子串匹配（逐个节点扫描）。"""
+        criteria = {"text": text, "resource_id": resource_id, "content_desc": content_desc}
+        given = {name: value for name, value in criteria.items() if value is not None}
+        if not given:
+            raise ValueError("至少指定 text、resource_id、content_desc 之一")
+        if contains:
+            candidates = [node for node in self.nodes if node.visible]
+        elif resource_id is not None:
+            candidates = self.by_resource_id.get(resource_id, [])
+        elif text is not None:
+            candidates = self.by_text.get(text, [])
+        else:
+            candidates = self.by_content_desc.get(content_desc or "", [])
+        return [node for node in candidates if all(_matches(node, name, value, contains) for name, value in given.items())]
+
+    def find(
+        self,
+        text: str | None = None,
+        resource_id: str | None = None,
+        content_desc: str | None = None,
+        contains: bool = False,
+    ) -> UiNode | None:
+        found = self.find_all(text, resource_id, content_desc, contains)
+        return found[0] if found else None
+
+
+def _matches(node: UiNode, name: str, value: str, contains: bool) -> bool:
+    actual = getattr(node, name)
+    # resource-id 总是精确匹配；子串匹配只用于文案。
+    return value in actual if contains and name != "resource_id" else actual == value
+
+
+def parse_hierarchy(data: bytes) -> UiIndex:
+    """用 iterparse 流式解析 uiautomator 的 XML：节点在 start 事件读取属性，end 事件即清空，内存只保留扁平的节点列表。"""
+    nodes: list[UiNode] = []
+    try:
+        for event, element in ET.iterparse(io.BytesIO(data), events=("start", "end")):
+            if element.tag != "node":
+                continue
+            if event == "end":
+                element.clear()
+                continue
+            attrib = element.attrib
+            nodes.append(
+                UiNode(
+                    text=attrib.get("text", ""),
+                    resource_id=attrib.get("resource-id", ""),
+                    content_desc=attrib.get("content-desc", ""),
+                    class_name=attrib.get("class", ""),
+                    package=attrib.get("package", ""),
+                    bounds=parse_bounds(attrib.get("bounds", "")),
+                    clickable=attrib.get("clickable") == "true",
+                    enabled=attrib.get("enabled", "true") == "true",
+                )
+            )
+    except ET.ParseError as exc:
+        raise UiDumpError(f"界面层级 XML 解析失败: {exc}") from exc
+    return UiIndex(nodes)
+
+
+class UiHierarchy:
+    """带缓存的界面层级：首次查找时 dump 并建索引，之后的查找直接命中索引，直到界面变化信号使其失效。
+
+    screen_version 由设备客户端在每次可能改变界面的操作（点击、输入、启动应用等）后递增，版本变化即视为
+    界面已变；invalidate() 供调用方在其他已知的界面变化后手动失效；max_age_seconds 兜底界面自行变化
+    （加载完成、弹窗）的情况，为 None 时不按时间失效。
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], bytes],
+        screen_version: Callable[[], int] = lambda: 0,
+        max_age_seconds: float | None = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._fetch = fetch
+        self._screen_version = screen_version
+        self.max_age_seconds = max_age_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._index: UiIndex | None = None
+        self._version = -1
+        self._fetched_at = 0.0
+        self.dumps = 0
+
+    def index(self, refresh: bool = False) -> UiIndex:
+        with self._lock:
+            version = self._screen_version()
+            stale = (
+                self._index is None
+                or refresh
+                or version != self._version
+                or (self.max_age_seconds is not None and self._clock() - self._fetched_at > self.max_age_seconds)
+            )
+            if stale:
+                # 先记下版本与时间再 dump：dump 期间发生的界面变化会让下一次查找重新 dump。
+                self._version, self._fetched_at = version, self._clock()
+                self._index = parse_hierarchy(extract_hierarchy_xml(self._fetch()))
+                self.dumps += 1
+            assert self._index is not None
+            return self._index
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._index = None
+
+    def find(
+        self,
+        text: str | None = None,
+        resource_id: str | None = None,
+        content_desc: str | None = None,
+        contains: bool = False,
+    ) -> UiNode | None:
+        return self.index().find(text, resource_id, content_desc, contains)
+
+    def wait_for(
+        self,
+        text: str | None = None,
+        resource_id: str | None = None,
+        content_desc: str | None = None,
+        contains: bool = False,
+        timeout: float = 10.0,
+        interval: float = 0.5,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> UiNode | None:
+        """轮询直到元素出现（每轮重新 dump），超时返回 None。"""
+        deadline = self._clock() + timeout
+        node = self.find(text, resource_id, content_desc, contains)
+        while node is None and self._clock() < deadline:
+            sleep(interval)
+            node = self.index(refresh=True).find(text, resource_id, content_desc, contains)
+        return node
@@ -11,12 +11,44 @@ class Settings(BaseSettings):
     merchant_publish_url: str = "https://ark.xiaohongshu.com"
     device_id: str = "emulator-5554"
     device_dry_run: bool = True
+    device_shell_session: bool = True
+    device_ids: str = ""
+    device_discover: bool = False
+    device_failure_threshold: int = 3
+    device_quarantine_seconds: float = 120.0
+    device_lease_timeout_seconds: float = 300.0
+    artifact_dir: str = "artifacts/android"
+    artifact_thumbnail_width: int = 360
     final_confirm_required: bool = True
     task_db_path: str = "data/autopilot.db"
+    task_retention_days: int = 30
+    task_archive_dir: str = "data/archive"
+    task_execution_mode: Literal["inline", "queue"] = "inline"
+    task_queue_backend: Literal["sqlite", "redis"] = "sqlite"
+    task_queue_lease_seconds: float = 300.0
+    worker_poll_interval: float = 1.0
+    redis_url: str = "redis://localhost:6379/0"
+    batch_max_workers: int = 8
+    batch_channel_limit: int = 4
+    step_max_attempts: int = 3
+    step_retry_base_delay: float = 2.0
+    step_retry_max_delay: float = 30.0
+    channel_breaker_threshold: int = 5
+    channel_breaker_reset_seconds: float = 60.0
+    task_priority_max_wait_seconds: float = 300.0
+    task_stale_after_seconds: float = 900.0
+    task_max_recoveries: int = 3
+    idempotency_ttl_seconds: float = 86400.0
+    # 不设置时等于 task_stale_after_seconds（一次任务执行的上限）。
+    idempotency_wait_seconds: float | None = None
 
     openai_api_key: str = ""
     scheduler_order_sync_minutes: int = 10
     scheduler_sales_analysis_minutes: int = 60
+    scheduler_task_retention_minutes: int = 1440
+    scheduler_task_recovery_minutes: int = 5
+    scheduler_idempotency_purge_minutes: int = 60
+    scheduler_device_health_minutes: int = 1
 
 
 @lru_cache(maxsize=1)
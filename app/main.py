@@ -1,26 +1,93 @@
-from fastapi import FastAPI, HTTPException
+import threading
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any, Literal
+
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.responses import JSONResponse
 
 from app.config.settings import get_settings
-from app.models.schemas import ProductCreate
+from app.models import serializer
+from app.models.schemas import ProductCreate, TaskPriority, TaskStatus
+from app.tasks.base import MAX_PAGE_SIZE
+from app.tasks.idempotency import IdempotencyKeyConflict, IdempotencyKeyInProgress
 from app.workflows.auto_ops import AutoOpsWorkflow
 
-app = FastAPI(title="RedNote-AutoPilot", version="0.2.0")
+
+class SerializerJSONResponse(JSONResponse):
+    """用 app.models.serializer 渲染响应体；可直接编码 dataclass，不经 jsonable_encoder。"""
+
+    def render(self, content: Any) -> bytes:
+        return serializer.dumps_bytes(content)
+
+
 workflow = AutoOpsWorkflow()
 
 
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    # 后台回收上次进程遗留的 running 任务；inline 模式下会就地续跑，不阻塞服务启动。
+    threading.Thread(target=workflow.task_recovery.run, name="task-recovery", daemon=True).start()
+    yield
+    workflow.task_executor.close()
+
+
+app = FastAPI(
+    title="RedNote-AutoPilot",
+    version="0.2.0",
+    default_response_class=SerializerJSONResponse,
+    lifespan=lifespan,
+)
+
+
 @app.get("/health")
 def health() -> dict:
     return {"status": "ok"}
 
 
 @app.post("/products/auto-create")
-def auto_create_product(product: ProductCreate) -> dict:
-    return workflow.product_manager.auto_create_product(product)
+def auto_create_product(
+    product: ProductCreate,
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key", max_length=255),
+) -> dict:
+    try:
+        return workflow.product_manager.auto_create_product(product, idempotency_key=idempotency_key)
+    except IdempotencyKeyConflict as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    except IdempotencyKeyInProgress as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+
+
+@app.post("/products/auto-create-batch")
+def auto_create_products(products: list[ProductCreate], priority: TaskPriority | None = None) -> list[dict]:
+    return workflow.product_manager.auto_create_products(products, priority=priority)
+
+
+@app.get("/tasks")
+def list_tasks(
+    status: TaskStatus | None = None,
+    channel: str | None = None,
+    after: str | None = None,
+    limit: int = Query(default=100, ge=1, le=MAX_PAGE_SIZE),
+) -> SerializerJSONResponse:
+    # 直接返回响应对象，跳过 FastAPI 对返回值的逐字段校验与 jsonable_encoder 转换。
+    try:
+        page = workflow.product_manager.list_tasks(status=status, channel=channel, after=after, limit=limit)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return SerializerJSONResponse(page)
 
 
 @app.get("/tasks/{task_id}")
-def get_task(task_id: str) -> dict:
-    return workflow.product_manager.get_task(task_id)
+def get_task(task_id: str, view: Literal["full", "summary"] = "full") -> SerializerJSONResponse:
+    return SerializerJSONResponse(workflow.product_manager.get_task(task_id, include_payload=view == "full"))
+
+
+@app.post("/tasks/confirm-batch")
+def confirm_tasks(task_ids: list[str]) -> list[dict]:
+    if not task_ids or len(task_ids) > MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"task_ids 数量需在 1~{MAX_PAGE_SIZE} 之间")
+    return workflow.product_manager.confirm_tasks(task_ids)
 
 
 @app.post("/tasks/{task_id}/confirm")
@@ -31,11 +98,34 @@ def confirm_task(task_id: str) -> dict:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
 
+@app.post("/tasks/{task_id}/resume")
+def resume_task(task_id: str) -> dict:
+    try:
+        return workflow.product_manager.resume_task(task_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
 @app.get("/ops/sales-loop")
 def sales_loop() -> dict:
     return workflow.run_sales_loop()
 
 
+@app.get("/ops/latency")
+def latency(window_minutes: int = Query(default=60, ge=1, le=7 * 24 * 60)) -> dict:
+    return workflow.latency_report(window_minutes)
+
+
+@app.get("/ops/scheduler")
+def scheduler_metrics() -> dict:
+    return workflow.scheduler_report()
+
+
+@app.get("/ops/devices")
+def device_metrics() -> dict:
+    return workflow.device_report()
+
+
 @app.get("/ops/channel")
 def channel_mode() -> dict:
     settings = get_settings()
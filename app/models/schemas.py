@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+from collections.abc import Mapping
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from enum import Enum
+from types import MappingProxyType
+from typing import Any
 from uuid import uuid4
 
 
@@ -19,7 +22,41 @@ class TaskStatus(str, Enum):
     failed = "failed"
 
 
-@dataclass
+class TaskPriority(str, Enum):
+    """任务优先级类别：调度时按权重分配执行机会，见 app/tasks/scheduling.py。"""
+
+    urgent = "urgent"
+    normal = "normal"
+    bulk = "bulk"
+
+
+class _CachedDump:
+    """为 model_dump 提供按实例的结果缓存。
+
+    缓存的是只读视图（MappingProxyType），每次调用返回同一个视图：input_snapshot 与传给通道的 payload
+    共用一份，不再各自复制；需要改写顶层键的调用方自行 dict(...) 复制一份。视图直接引用字段值：
+    列表等字段原地修改会同步体现，重新赋值字段时缓存失效。
+    """
+
+    __slots__ = ("_dump",)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        object.__setattr__(self, name, value)
+        if name != "_dump":
+            object.__setattr__(self, "_dump", None)
+
+    def model_dump(self) -> Mapping[str, Any]:
+        dump = getattr(self, "_dump", None)
+        if dump is None:
+            dump = MappingProxyType(self._build_dump())
+            object.__setattr__(self, "_dump", dump)
+        return dump
+
+    def _build_dump(self) -> dict:
+        raise NotImplementedError
+
+
+@dataclass(slots=True)
 class ProductBase:
     title: str
     cost_price: float
@@ -28,20 +65,26 @@ class ProductBase:
     keywords: list[str] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class ProductCreate(ProductBase):
-    pass
+    # shop 与 category 组成公平调度的分组，同一优先级内不同店铺/类目轮流获得执行机会。
+    shop: str = ""
+    priority: TaskPriority = TaskPriority.normal
 
+    @property
+    def fair_key(self) -> str:
+        return f"{self.shop}/{self.category}" if self.shop else self.category
 
-@dataclass
+
+@dataclass(slots=True)
 class ProductRecord(ProductBase):
     id: str = ""
     xhs_product_id: str | None = None
     status: ProductStatus = ProductStatus.offline
 
 
-@dataclass
-class AIProductDraft:
+@dataclass(slots=True)
+class AIProductDraft(_CachedDump):
     optimized_title: str
     bullet_points: list[str]
     detail_copy: str
@@ -49,7 +92,7 @@ class AIProductDraft:
     faq: list[str]
     recommended_skus: list[str]
 
-    def model_dump(self) -> dict:
+    def _build_dump(self) -> dict:
         return {
             "optimized_title": self.optimized_title,
             "bullet_points": self.bullet_points,
@@ -60,8 +103,8 @@ class AIProductDraft:
         }
 
 
-@dataclass
-class ListingPack:
+@dataclass(slots=True)
+class ListingPack(_CachedDump):
     product_id: str
     title: str
     desc: str
@@ -73,7 +116,21 @@ class ListingPack:
     checklist: list[str] = field(default_factory=list)
     version: str = "v1"
 
-    def model_dump(self) -> dict:
+    def freeze(self) -> FrozenListingPack:
+        return FrozenListingPack(
+            product_id=self.product_id,
+            title=self.title,
+            desc=self.desc,
+            tags=tuple(self.tags),
+            sale_price=self.sale_price,
+            cost_price=self.cost_price,
+            sku_list=tuple(dict(sku) for sku in self.sku_list),
+            images=tuple(self.images),
+            checklist=tuple(self.checklist),
+            version=self.version,
+        )
+
+    def _build_dump(self) -> dict:
         return {
             "product_id": self.product_id,
             "title": self.title,
@@ -88,20 +145,94 @@ class ListingPack:
         }
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
+class FrozenListingPack(_CachedDump):
+    """ListingPack 的不可变快照：任务创建后由执行器与批量队列持有，model_dump 只计算一次。
+
+    sku_list 中的 dict 在 freeze() 时已复制，快照持有者不应再修改它们。
+    """
+
+    product_id: str
+    title: str
+    desc: str
+    tags: tuple[str, ...]
+    sale_price: float
+    cost_price: float
+    sku_list: tuple[dict[str, str | int], ...]
+    images: tuple[str, ...] = ()
+    checklist: tuple[str, ...] = ()
+    version: str = "v1"
+
+    @classmethod
+    def from_snapshot(cls, snapshot: dict[str, Any]) -> FrozenListingPack:
+        """由 model_dump 产生的 dict（如 ListingTask.input_snapshot）重建快照。"""
+        return cls(
+            product_id=str(snapshot["product_id"]),
+            title=str(snapshot["title"]),
+            desc=str(snapshot["desc"]),
+            tags=tuple(snapshot.get("tags", ())),
+            sale_price=float(snapshot["sale_price"]),
+            cost_price=float(snapshot["cost_price"]),
+            sku_list=tuple(dict(sku) for sku in snapshot.get("sku_list", ())),
+            images=tuple(snapshot.get("images", ())),
+            checklist=tuple(snapshot.get("checklist", ())),
+            version=str(snapshot.get("version", "v1")),
+        )
+
+    def thaw(self) -> ListingPack:
+        return ListingPack(
+            product_id=self.product_id,
+            title=self.title,
+            desc=self.desc,
+            tags=list(self.tags),
+            sale_price=self.sale_price,
+            cost_price=self.cost_price,
+            sku_list=[dict(sku) for sku in self.sku_list],
+            images=list(self.images),
+            checklist=list(self.checklist),
+            version=self.version,
+        )
+
+    def _build_dump(self) -> dict:
+        # 输出与 ListingPack.model_dump 一致（列表而非元组），写库后读回可直接比较。
+        return {
+            "product_id": self.product_id,
+            "title": self.title,
+            "desc": self.desc,
+            "tags": list(self.tags),
+            "sale_price": self.sale_price,
+            "cost_price": self.cost_price,
+            "sku_list": list(self.sku_list),
+            "images": list(self.images),
+            "checklist": list(self.checklist),
+            "version": self.version,
+        }
+
+
+@dataclass(slots=True)
 class ListingTask:
     task_id: str
     product_id: str
     status: TaskStatus
     listing_pack_version: str
-    input_snapshot: dict
+    input_snapshot: Mapping[str, Any]
     channel: str
     created_at: str
     updated_at: str
     output: dict = field(default_factory=dict)
+    priority: TaskPriority = TaskPriority.normal
+    fair_key: str = ""
 
     @classmethod
-    def create(cls, product_id: str, listing_pack_version: str, input_snapshot: dict, channel: str) -> "ListingTask":
+    def create(
+        cls,
+        product_id: str,
+        listing_pack_version: str,
+        input_snapshot: Mapping[str, Any],
+        channel: str,
+        priority: TaskPriority = TaskPriority.normal,
+        fair_key: str = "",
+    ) -> "ListingTask":
         now = datetime.now(timezone.utc).isoformat()
         return cls(
             task_id=str(uuid4()),
@@ -113,6 +244,8 @@ class ListingTask:
             created_at=now,
             updated_at=now,
             output={},
+            priority=priority,
+            fair_key=fair_key,
         )
 
     def model_dump(self) -> dict:
@@ -126,4 +259,6 @@ class ListingTask:
             "created_at": self.created_at,
             "updated_at": self.updated_at,
             "output": self.output,
+            "priority": self.priority.value,
+            "fair_key": self.fair_key,
         }
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Callable
+from dataclasses import dataclass, fields, is_dataclass
+from enum import Enum
+from functools import cache
+from importlib.util import find_spec
+from types import MappingProxyType
+from typing import Any
+
+# 按优先级排列；未安装的后端自动跳过，stdlib json 始终可用。
+BACKEND_PRIORITY: tuple[str, ...] = ("orjson", "msgspec", "json")
+
+
+@dataclass(frozen=True)
+class JSONSerializer:
+    """一组 JSON 编解码函数。
+
+    三个后端的输出约定一致：紧凑分隔符、不转义非 ASCII 字符、dataclass 按字段顺序编码为对象、
+    Enum 编码为其 value、MappingProxyType（模型缓存的只读 model_dump）编码为对象。
+    解码失败统一抛 ValueError，无法编码的值统一抛 TypeError。
+    """
+
+    name: str
+    dumps: Callable[[Any], str]
+    dumps_bytes: Callable[[Any], bytes]
+    loads: Callable[[str | bytes], Any]
+
+
+@cache
+def _field_names(cls: type) -> tuple[str, ...]:
+    return tuple(item.name for item in fields(cls))
+
+
+def _stdlib_default(value: Any) -> Any:
+    # stdlib json 只能经由 default 返回可编码对象，这里的 dict 无法避免。
+    if is_dataclass(value) and not isinstance(value, type):
+        return {name: getattr(value, name) for name in _field_names(type(value))}
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, MappingProxyType):
+        return value.copy()
+    raise TypeError(f"无法 JSON 编码的类型: {type(value).__name__}")
+
+
+def _mapping_default(value: Any) -> Any:
+    if isinstance(value, MappingProxyType):
+        return value.copy()
+    raise TypeError(f"无法 JSON 编码的类型: {type(value).__name__}")
+
+
+def _stdlib_serializer() -> JSONSerializer:
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_stdlib_default).encode
+
+    def dumps_bytes(value: Any) -> bytes:
+        return encode(value).encode("utf-8")
+
+    return JSONSerializer(name="json", dumps=encode, dumps_bytes=dumps_bytes, loads=json.loads)
+
+
+def _orjson_serializer() -> JSONSerializer:
+    import orjson
+
+    # 与 stdlib 行为对齐：非字符串键（如 int）转为字符串而不是报错。
+    option = orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(value: Any) -> bytes:
+        return orjson.dumps(value, default=_mapping_default, option=option)
+
+    def dumps(value: Any) -> str:
+        return orjson.dumps(value, default=_mapping_default, option=option).decode("utf-8")
+
+    return JSONSerializer(name="orjson", dumps=dumps, dumps_bytes=dumps_bytes, loads=orjson.loads)
+
+
+def _msgspec_serializer() -> JSONSerializer:
+    import msgspec
+
+    encode = msgspec.json.Encoder(enc_hook=_mapping_default).encode
+    decode = msgspec.json.Decoder().decode
+
+    def dumps_bytes(value: Any) -> bytes:
+        try:
+            return encode(value)
+        except msgspec.EncodeError as exc:
+            raise TypeError(str(exc)) from exc
+
+    def dumps(value: Any) -> str:
+        return dumps_bytes(value).decode("utf-8")
+
+    def loads(data: str | bytes) -> Any:
+        try:
+            return decode(data)
+        except msgspec.DecodeError as exc:
+            raise ValueError(str(exc)) from exc
+
+    return JSONSerializer(name="msgspec", dumps=dumps, dumps_bytes=dumps_bytes, loads=loads)
+
+
+_BUILDERS: dict[str, Callable[[], JSONSerializer]] = {
+    "orjson": _orjson_serializer,
+    "msgspec": _msgspec_serializer,
+    "json": _stdlib_serializer,
+}
+
+
+def available_backends() -> list[str]:
+    return [name for name in BACKEND_PRIORITY if name == "json" or find_spec(name) is not None]
+
+
+def build_serializer(backend: str | None = None) -> JSONSerializer:
+    """按名称构造序列化器；backend 为 None 时选择已安装的最快后端。"""
+    if backend is None:
+        backend = available_backends()[0]
+    if backend not in _BUILDERS:
+        raise ValueError(f"未知的 JSON 后端: {backend}，可选 {list(BACKEND_PRIORITY)}")
+    if backend not in available_backends():
+        raise ValueError(f"JSON 后端 {backend} 未安装")
+    return _BUILDERS[backend]()
+
+
+serializer = build_serializer()
+
+BACKEND = serializer.name
+dumps = serializer.dumps
+dumps_bytes = serializer.dumps_bytes
+loads = serializer.loads
@@ -5,9 +5,12 @@ from uuid import uuid4
 
 from app.ai_engine.content_generator import AIContentGenerator
 from app.channels.base import CommerceChannel
-from app.models.schemas import ListingTask, ProductCreate
+from app.models.schemas import AIProductDraft, FrozenListingPack, ListingTask, ProductCreate, TaskPriority, TaskStatus
+from app.tasks.base import TaskRepository
 from app.tasks.executor import ListingTaskExecutor
-from app.tasks.repository import TaskRepository
+from app.tasks.idempotency import IdempotencyGuard
+from app.tasks.queue import TaskQueue
+from app.tasks.scheduling import queue_delay
 
 
 class ProductManager:
@@ -18,14 +21,70 @@ class ProductManager:
         task_repo: TaskRepository,
         task_executor: ListingTaskExecutor,
         operation_mode: str,
+        task_queue: TaskQueue | None = None,
+        idempotency: IdempotencyGuard | None = None,
     ) -> None:
         self.channel = channel
         self.ai_generator = ai_generator
         self.task_repo = task_repo
         self.task_executor = task_executor
         self.operation_mode = operation_mode
+        self.task_queue = task_queue
+        self.idempotency = idempotency
 
-    def auto_create_product(self, product: ProductCreate) -> dict[str, Any]:
+    def auto_create_product(self, product: ProductCreate, idempotency_key: str | None = None) -> dict[str, Any]:
+        """带 idempotency_key 时，同一个键的重试直接返回首次的 draft/listing_pack/task，不会重复建任务或操作设备。"""
+        if idempotency_key and self.idempotency is not None:
+            return self.idempotency.run(idempotency_key, product, lambda: self._auto_create_product(product))
+        return self._auto_create_product(product)
+
+    def _auto_create_product(self, product: ProductCreate) -> dict[str, Any]:
+        draft, listing_pack, task = self._prepare_task(product)
+        self.task_repo.save_task(task)
+
+        if self.operation_mode == "auto_device":
+            if self.task_queue is not None:
+                self.task_queue.enqueue(task.task_id, delay=queue_delay(task.priority))
+            else:
+                task = self.task_executor.execute(task, listing_pack)
+
+        return {
+            "draft": draft.model_dump(),
+            "listing_pack": listing_pack.model_dump(),
+            "task": task.model_dump(),
+        }
+
+    def auto_create_products(
+        self,
+        products: list[ProductCreate],
+        priority: TaskPriority | None = None,
+    ) -> list[dict[str, Any]]:
+        """批量上架：任务在一个事务内创建；auto_device 模式下入队（queue 模式）或交给 execute_many 并发执行。
+
+        priority 不为 None 时覆盖各商品自带的优先级（批量导入通常传 bulk）。
+        """
+        prepared = [self._prepare_task(product, priority) for product in products]
+        with self.task_repo.transaction() as uow:
+            for _, _, task in prepared:
+                uow.save_task(task)
+
+        tasks = [task for _, _, task in prepared]
+        if self.operation_mode == "auto_device" and self.task_queue is not None:
+            for task in tasks:
+                self.task_queue.enqueue(task.task_id, delay=queue_delay(task.priority))
+        elif self.operation_mode == "auto_device":
+            tasks = self.task_executor.execute_many((task, listing_pack) for _, listing_pack, task in prepared)
+
+        return [
+            {"draft": draft.model_dump(), "listing_pack": listing_pack.model_dump(), "task": task.model_dump()}
+            for (draft, listing_pack, _), task in zip(prepared, tasks, strict=True)
+        ]
+
+    def _prepare_task(
+        self,
+        product: ProductCreate,
+        priority: TaskPriority | None = None,
+    ) -> tuple[AIProductDraft, FrozenListingPack, ListingTask]:
         draft = self.ai_generator.generate_product_content(product)
         product_id = str(uuid4())
         payload = {
@@ -39,23 +98,17 @@ class ProductManager:
             "images": [],
         }
 
-        listing_pack = self.task_executor.build_pack(product_id=product_id, payload=payload)
+        # 冻结为快照：input_snapshot 与执行时传给通道的 payload 共用一次构建的缓存（各自拿到浅拷贝）。
+        listing_pack = self.task_executor.build_pack(product_id=product_id, payload=payload).freeze()
         task = ListingTask.create(
             product_id=product_id,
             listing_pack_version=listing_pack.version,
             input_snapshot=listing_pack.model_dump(),
             channel=self.operation_mode,
+            priority=priority or product.priority,
+            fair_key=product.fair_key,
         )
-        self.task_repo.save_task(task)
-
-        if self.operation_mode == "auto_device":
-            task = self.task_executor.execute(task, listing_pack)
-
-        return {
-            "draft": draft.model_dump(),
-            "listing_pack": listing_pack.model_dump(),
-            "task": task.model_dump(),
-        }
+        return draft, listing_pack, task
 
     def auto_update_product(self, payload: dict[str, Any]) -> dict[str, Any]:
         return self.channel.update_product(payload)
@@ -66,12 +119,30 @@ class ProductManager:
     def auto_set_offline(self, xhs_product_id: str) -> dict[str, Any]:
         return self.channel.set_product_offline(xhs_product_id)
 
-    def get_task(self, task_id: str) -> dict[str, Any]:
-        task = self.task_repo.get_task(task_id)
-        if not task:
+    def get_task(self, task_id: str, include_payload: bool = True) -> dict[str, Any]:
+        detail = self.task_repo.get_task_detail(task_id, include_payload=include_payload)
+        if detail is None:
             return {"task": None, "steps": []}
-        return {"task": task.model_dump(), "steps": self.task_repo.list_steps(task_id)}
+        return detail
+
+    def list_tasks(
+        self,
+        status: TaskStatus | None = None,
+        channel: str | None = None,
+        after: str | None = None,
+        limit: int = 100,
+    ) -> dict[str, Any]:
+        # items 保留 ListingTask 对象，由响应层的序列化器直接编码，不再逐个 model_dump。
+        page = self.task_repo.list_tasks(status=status, channel=channel, after=after, limit=limit)
+        return {"items": page.items, "next_after": page.next_after}
 
     def confirm_task(self, task_id: str) -> dict[str, Any]:
-        task = self.task_executor.confirm_and_publish(task_id)
-        return {"task": task.model_dump(), "steps": self.task_repo.list_steps(task_id)}
+        self.task_executor.confirm_and_publish(task_id)
+        return self.get_task(task_id)
+
+    def confirm_tasks(self, task_ids: list[str]) -> list[dict[str, Any]]:
+        return self.task_executor.confirm_many(task_ids)
+
+    def resume_task(self, task_id: str) -> dict[str, Any]:
+        self.task_executor.resume(task_id)
+        return self.get_task(task_id)
@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from apscheduler.schedulers.blocking import BlockingScheduler
 
 from app.config.settings import get_settings
@@ -24,6 +26,32 @@ class TaskScheduler:
             minutes=self.settings.scheduler_sales_analysis_minutes,
             id="analyze_sales",
         )
+        self.scheduler.add_job(
+            self.workflow.task_retention.run,
+            "interval",
+            minutes=self.settings.scheduler_task_retention_minutes,
+            id="archive_task_history",
+        )
+        # 启动时立即执行一次，回收上次部署/崩溃遗留在 running 状态的任务。
+        self.scheduler.add_job(
+            self.workflow.task_recovery.run,
+            "interval",
+            minutes=self.settings.scheduler_task_recovery_minutes,
+            next_run_time=datetime.now(),
+            id="recover_stale_tasks",
+        )
+        self.scheduler.add_job(
+            self.workflow.product_manager.idempotency.store.purge_expired,
+            "interval",
+            minutes=self.settings.scheduler_idempotency_purge_minutes,
+            id="purge_idempotency_keys",
+        )
+        self.scheduler.add_job(
+            self.workflow.check_devices,
+            "interval",
+            minutes=self.settings.scheduler_device_health_minutes,
+            id="check_device_health",
+        )
 
     def start(self) -> None:
         self.register()
@@ -1,4 +1,14 @@
+from app.tasks.base import TaskRepository, TaskUnitOfWork
 from app.tasks.executor import ListingTaskExecutor
-from app.tasks.repository import TaskRepository
+from app.tasks.factory import build_task_repository
+from app.tasks.repository import SQLiteTaskRepository
+from app.tasks.sqlalchemy_repository import SQLAlchemyTaskRepository
 
-__all__ = ["ListingTaskExecutor", "TaskRepository"]
+__all__ = [
+    "ListingTaskExecutor",
+    "SQLAlchemyTaskRepository",
+    "SQLiteTaskRepository",
+    "TaskRepository",
+    "TaskUnitOfWork",
+    "build_task_repository",
+]
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import base64
+import binascii
+from collections.abc import Iterator
+from contextlib import AbstractContextManager
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+from app.models import serializer
+from app.models.schemas import ListingTask, TaskStatus
+
+MAX_PAGE_SIZE = 500
+
+
+@dataclass
+class TaskPage:
+    """一页任务列表；next_after 为 None 表示已到末尾。"""
+
+    items: list[ListingTask]
+    next_after: str | None
+
+
+def encode_cursor(updated_at: str, task_id: str) -> str:
+    raw = serializer.dumps_bytes([updated_at, task_id])
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(after: str) -> tuple[str, str]:
+    try:
+        updated_at, task_id = serializer.loads(base64.urlsafe_b64decode(after.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError, TypeError) as exc:
+        raise ValueError(f"无效的分页游标: {after!r}") from exc
+    return str(updated_at), str(task_id)
+
+
+def check_page_limit(limit: int) -> None:
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit 需在 1~{MAX_PAGE_SIZE} 之间，当前为 {limit}")
+
+
+@dataclass(frozen=True, slots=True)
+class StepTiming:
+    """一次步骤尝试的起止时间（UTC ISO 字符串）与耗时（毫秒，取自单调时钟）。"""
+
+    started_at: str
+    finished_at: str
+    duration_ms: float
+
+
+def step_dict(row: tuple[Any, ...]) -> dict[str, Any]:
+    return {
+        "step_name": row[0],
+        "status": row[1],
+        "retry_count": row[2],
+        "artifact_path": row[3],
+        "error": row[4],
+        "updated_at": row[5],
+        "started_at": row[6],
+        "finished_at": row[7],
+        "duration_ms": row[8],
+        "device_id": row[9],
+    }
+
+
+def summary_dict(row: tuple[Any, ...]) -> dict[str, Any]:
+    """按 listing_tasks 列顺序的行构造不含 input_snapshot/output 的任务字典。"""
+    return {
+        "task_id": row[0],
+        "product_id": row[1],
+        "status": row[2],
+        "listing_pack_version": row[3],
+        "channel": row[5],
+        "created_at": row[6],
+        "updated_at": row[7],
+        "priority": row[9],
+        "fair_key": row[10],
+    }
+
+
+class TaskUnitOfWork(Protocol):
+    """一次提交内的写入集合：调用时只缓冲，由 TaskRepository.transaction() 退出时原子提交。"""
+
+    def save_task(self, task: ListingTask) -> None: ...
+
+    def save_step(
+        self,
+        task_id: str,
+        step_name: str,
+        status: str,
+        updated_at: str,
+        retry_count: int = 0,
+        artifact_path: str | None = None,
+        error: str | None = None,
+        timing: StepTiming | None = None,
+        device_id: str | None = None,
+    ) -> None: ...
+
+    def log_step(self, task_id: str, step_name: str, success: bool, message: str, payload: dict, created_at: str) -> None: ...
+
+
+class TaskRepository(Protocol):
+    """任务持久化契约；执行器、产品管理与保留策略只依赖这里声明的方法。"""
+
+    def close(self) -> None: ...
+
+    def transaction(self) -> AbstractContextManager[TaskUnitOfWork]: ...
+
+    def save_task(self, task: ListingTask) -> None: ...
+
+    def save_step(
+        self,
+        task_id: str,
+        step_name: str,
+        status: str,
+        updated_at: str,
+        retry_count: int = 0,
+        artifact_path: str | None = None,
+        error: str | None = None,
+        timing: StepTiming | None = None,
+        device_id: str | None = None,
+    ) -> None: ...
+
+    def log_step(self, task_id: str, step_name: str, success: bool, message: str, payload: dict, created_at: str) -> None: ...
+
+    def get_task(self, task_id: str) -> ListingTask | None: ...
+
+    def get_task_detail(self, task_id: str, include_payload: bool = True) -> dict[str, Any] | None: ...
+
+    def get_tasks(self, task_ids: list[str]) -> dict[str, ListingTask]:
+        """一次 IN 查询按 id 批量读取任务，不存在的 id 不出现在结果中。"""
+        ...
+
+    def list_steps(self, task_id: str) -> list[dict]: ...
+
+    def list_steps_many(self, task_ids: list[str]) -> dict[str, list[dict]]:
+        """一次 IN 查询读取多个任务的步骤记录，按任务分组、组内按写入顺序。"""
+        ...
+
+    def list_logs(self, task_id: str) -> list[dict]: ...
+
+    def list_logs_many(self, task_ids: list[str]) -> dict[str, list[dict]]:
+        """一次 IN 查询读取多个任务的日志，按任务分组、组内按写入顺序。"""
+        ...
+
+    def list_tasks(
+        self,
+        status: TaskStatus | None = None,
+        channel: str | None = None,
+        after: str | None = None,
+        limit: int = 100,
+    ) -> TaskPage: ...
+
+    def iter_tasks(
+        self,
+        status: TaskStatus | None = None,
+        channel: str | None = None,
+        page_size: int = 100,
+    ) -> Iterator[ListingTask]: ...
+
+    def list_expired_task_ids(self, status: TaskStatus, before: str, limit: int) -> list[str]: ...
+
+    def iter_step_durations(self, since: str, until: str) -> Iterator[tuple[str, str, str | None, float]]:
+        """流式返回 finished_at 落在 [since, until) 内的步骤尝试 (step_name, channel, device_id, duration_ms)。"""
+        ...
+
+    def touch_task(self, task_id: str, status: TaskStatus, expected_updated_at: str, updated_at: str) -> bool:
+        """仅当任务仍为 status 且 updated_at 未变时把 updated_at 改为新值（比较并交换），返回是否成功。"""
+        ...
+
+    def delete_tasks(self, task_ids: list[str]) -> dict[str, int]: ...
+
+    def delete_orphans(self, before: str) -> dict[str, int]:
+        """删除所属任务已不存在、且写入时间早于 before 的步骤与日志行，返回各表删除行数。"""
+        ...
+
+    def compact(self, vacuum_pages: int = 2000) -> int:
+        """回收不再被引用的 blob 并整理存储空间，返回删除的 blob 数量。"""
+        ...
+
+
+def iter_task_pages(
+    repo: TaskRepository,
+    status: TaskStatus | None,
+    channel: str | None,
+    page_size: int,
+) -> Iterator[ListingTask]:
+    """各实现共用的 iter_tasks：逐页遍历，内存中同时最多只保留一页。"""
+    after: str | None = None
+    while True:
+        page = repo.list_tasks(status=status, channel=channel, after=after, limit=page_size)
+        yield from page.items
+        if page.next_after is None:
+            return
+        after = page.next_after
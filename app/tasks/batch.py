@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import ExitStack, contextmanager
+from typing import Any
+
+from app.models.schemas import TaskStatus
+from app.tasks.base import TaskRepository, TaskUnitOfWork
+
+logger = logging.getLogger(__name__)
+
+# 任务进入这些状态后不会很快再有写入：所在批次立即提交，不等凑满或定时器。
+_SETTLED_STATUSES = frozenset({TaskStatus.done, TaskStatus.failed, TaskStatus.wait_manual_confirm})
+
+
+class _RecordingUnitOfWork:
+    """记录一个逻辑步骤内的写入调用，块正常结束后再整体转交给批量写入器。"""
+
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, tuple[Any, ...], dict[str, Any]]] = []
+
+    def save_task(self, *args: Any, **kwargs: Any) -> None:
+        self.calls.append(("save_task", args, kwargs))
+
+    def save_step(self, *args: Any, **kwargs: Any) -> None:
+        self.calls.append(("save_step", args, kwargs))
+
+    def log_step(self, *args: Any, **kwargs: Any) -> None:
+        self.calls.append(("log_step", args, kwargs))
+
+    def replay(self, uow: TaskUnitOfWork) -> None:
+        for name, args, kwargs in self.calls:
+            getattr(uow, name)(*args, **kwargs)
+
+    @property
+    def settles_task(self) -> bool:
+        """本组是否把某个任务写成终态或等待人工确认。"""
+        return any(
+            name == "save_task" and getattr(args[0] if args else kwargs.get("task"), "status", None) in _SETTLED_STATUSES
+            for name, args, kwargs in self.calls
+        )
+
+
+class BatchWriter:
+    """把多个任务的步骤写入合并为少量事务（group commit）。
+
+    transaction() 与 TaskRepository.transaction() 用法一致：块内写入先记录，
+    块正常退出时在锁内转交给一个持续打开的仓储工作单元（此刻完成序列化，之后修改 task 不受影响），
+    块内异常则整体丢弃。累计 flush_size 个步骤时立即提交；否则第一个待提交步骤到达后由常驻的提交线程在
+    flush_interval 秒后提交，即使之后没有新的步骤到达（长时间的设备操作期间已完成的写入不会一直悬而未决）；
+    某一组把任务写成 done/failed/wait_manual_confirm 时也立即提交。同一步骤的写入总是落在同一个事务里。
+    提交线程的提交失败会记日志，并在下一次 transaction()/flush()/close() 时重新抛出；用完需调用 close()。
+    """
+
+    def __init__(
+        self,
+        repo: TaskRepository,
+        flush_size: int = 50,
+        flush_interval: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.repo = repo
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stack: ExitStack | None = None
+        self._uow: TaskUnitOfWork | None = None
+        self._groups = 0
+        self._last_flush = clock()
+        # 定时提交的截止时刻；None 表示没有等待定时提交的写入。
+        self._deadline: float | None = None
+        self._flusher: threading.Thread | None = None
+        self._closed = False
+        self._error: Exception | None = None
+
+    @contextmanager
+    def transaction(self) -> Iterator[TaskUnitOfWork]:
+        with self._lock:
+            self._raise_error_locked()
+        group = _RecordingUnitOfWork()
+        yield group
+        with self._lock:
+            if self._uow is None:
+                self._stack = ExitStack()
+                self._uow = self._stack.enter_context(self.repo.transaction())
+            group.replay(self._uow)
+            self._groups += 1
+            if (
+                self._groups >= self.flush_size
+                or self._clock() - self._last_flush >= self.flush_interval
+                or group.settles_task
+                or self._closed
+            ):
+                self._flush_locked()
+            elif self._deadline is None and math.isfinite(self.flush_interval):
+                self._deadline = self._clock() + self.flush_interval
+                if self._flusher is None:
+                    self._flusher = threading.Thread(target=self._flush_loop, name="batch-writer", daemon=True)
+                    self._flusher.start()
+                self._wakeup.notify()
+
+    def flush(self) -> None:
+        with self._lock:
+            try:
+                self._flush_locked()
+            finally:
+                self._raise_error_locked()
+
+    def close(self) -> None:
+        """停止提交线程并提交剩余写入；之后的写入在块退出时直接提交。"""
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+            flusher, self._flusher = self._flusher, None
+        if flusher is not None:
+            flusher.join()
+        self.flush()
+
+    def _flush_loop(self) -> None:
+        # 所有定时提交都在这一个线程上执行，仓储只为它建一条线程本地连接，close() 时随线程退出释放。
+        with self._lock:
+            while not self._closed:
+                if self._deadline is None:
+                    self._wakeup.wait()
+                    continue
+                remaining = self._deadline - self._clock()
+                if remaining > 0:
+                    self._wakeup.wait(remaining)
+                    continue
+                try:
+                    self._flush_locked()
+                except Exception as exc:  # noqa: BLE001
+                    logger.exception("批量写入定时提交失败，将在下一次写入时抛出")
+                    self._error = self._error or exc
+
+    def _raise_error_locked(self) -> None:
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _flush_locked(self) -> None:
+        self._deadline = None
+        stack, self._stack, self._uow = self._stack, None, None
+        self._groups = 0
+        self._last_flush = self._clock()
+        if stack is not None:
+            stack.close()
+
+
+class ChannelLimiter:
+    """按通道限制同时在执行的任务数；limits 未列出的通道使用 default_limit。"""
+
+    def __init__(self, default_limit: int, limits: Mapping[str, int] | None = None) -> None:
+        if default_limit < 1 or any(limit < 1 for limit in (limits or {}).values()):
+            raise ValueError(f"通道并发上限需 >= 1: default={default_limit}, limits={limits}")
+        self.default_limit = default_limit
+        self.limits = dict(limits or {})
+        self._semaphores: dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, channel: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            semaphore = self._semaphores.get(channel)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.limits.get(channel, self.default_limit))
+                self._semaphores[channel] = semaphore
+            return semaphore
+
+    @contextmanager
+    def slot(self, channel: str) -> Iterator[None]:
+        with self._semaphore(channel):
+            yield
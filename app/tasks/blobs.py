@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+from app.models import serializer
+
+BLOB_REF_KEY = "$blob"
+# 用户数据中恰好只有 $blob（或本键）一个键的对象编码时包一层 {"$blob_escaped": <原对象>}，解码时还原，
+# 不会被误当成 blob 引用。键名以 BLOB_REF_KEY 开头，decode 的子串快速判断同样覆盖它。
+BLOB_ESCAPE_KEY = "$blob_escaped"
+
+# 清除阶段复查用：文本中任何 32 位十六进制串都视为可能的引用（宁可少删，不会误删）。
+_DIGEST_TOKEN_RE = re.compile(r"[0-9a-f]{32}")
+
+# 可能包含 blob 引用的 (表, 列)。
+BLOB_REF_COLUMNS: tuple[tuple[str, str], ...] = (
+    ("listing_tasks", "input_snapshot"),
+    ("listing_tasks", "output"),
+    ("task_logs", "payload"),
+)
+
+
+@dataclass(frozen=True)
+class BlobRow:
+    hash: str
+    codec: str
+    raw_size: int
+    data: bytes
+
+
+# 按哈希取回 (codec, data)；不存在时返回 None。由各仓储实现提供。
+BlobFetcher = Callable[[str], "tuple[str, bytes] | None"]
+
+_dumps = serializer.dumps
+
+
+def _inflate(codec: str, data: bytes) -> str:
+    raw = zlib.decompress(data) if codec == "zlib" else bytes(data)
+    return raw.decode("utf-8")
+
+
+def _blob_ref(value: Any) -> str | None:
+    if isinstance(value, dict) and len(value) == 1:
+        ref = value.get(BLOB_REF_KEY)
+        if isinstance(ref, str):
+            return ref
+    return None
+
+
+def _needs_escape(value: Mapping[str, Any]) -> bool:
+    return len(value) == 1 and (BLOB_REF_KEY in value or BLOB_ESCAPE_KEY in value)
+
+
+def _escaped(value: Any) -> dict | None:
+    """编码时包过一层的用户对象；不是转义包装时返回 None。"""
+    if isinstance(value, dict) and len(value) == 1:
+        inner = value.get(BLOB_ESCAPE_KEY)
+        if isinstance(inner, dict):
+            return inner
+    return None
+
+
+def _refs(value: Any) -> Iterator[str]:
+    """解码前的 JSON 结构中直接出现的 blob 引用（不展开引用本身）。"""
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, list):
+            stack.extend(item)
+        elif isinstance(item, dict):
+            ref = _blob_ref(item)
+            if ref is not None:
+                yield ref
+            else:
+                stack.extend((_escaped(item) or item).values())
+
+
+class BlobStore:
+    """内容寻址的 JSON 片段存储。
+
+    编码时自底向上遍历 JSON 文档，序列化后不小于 threshold_bytes 的对象/数组
+    以其哈希存入 task_blobs（zlib 压缩），原位置替换为 {"$blob": <hash>} 引用。
+    同一个 ListingPack 出现在 input_snapshot、日志 payload 与任务 output 中时只存一份。
+    用户数据里形如 {"$blob": ...} 的单键对象会被转义（见 BLOB_ESCAPE_KEY），解码后原样还原。
+
+    BlobStore 本身不访问数据库：encode 产出的 BlobRow 由仓储在同一事务中写入，
+    避免在设备操作期间持有写事务；读取与垃圾回收通过仓储提供的 BlobFetcher 取数。
+    """
+
+    def __init__(self, threshold_bytes: int = 512, cache_size: int = 256, compress_level: int = 6) -> None:
+        self.threshold_bytes = threshold_bytes
+        self.compress_level = compress_level
+        self._cache: OrderedDict[str, str] = OrderedDict()
+        self._encoded: OrderedDict[str, BlobRow] = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_lock = threading.Lock()
+
+    def encode(self, value: Any) -> tuple[str, list[BlobRow]]:
+        rows: list[BlobRow] = []
+        return self._dedupe(value, rows), rows
+
+    def _dedupe(self, value: Any, rows: list[BlobRow]) -> str:
+        text = _dumps(value)
+        if not isinstance(value, (Mapping, list)):
+            return text
+        large = self._is_large(text)
+        if not large and BLOB_REF_KEY not in text:
+            return text
+
+        # 只对超过阈值（或可能含需转义对象）的容器逐层下钻：先替换其中的大子文档，再把自身作为一个 blob。
+        if isinstance(value, Mapping):
+            text = "{" + ",".join(f"{_dumps(str(key))}:{self._dedupe(item, rows)}" for key, item in value.items()) + "}"
+            if _needs_escape(value):
+                text = f'{{"{BLOB_ESCAPE_KEY}":{text}}}'
+        else:
+            text = "[" + ",".join(self._dedupe(item, rows) for item in value) + "]"
+        if not large:
+            return text
+        raw = text.encode("utf-8")
+        if len(raw) < self.threshold_bytes:
+            return text
+        digest = hashlib.blake2b(raw, digest_size=16).hexdigest()
+        rows.append(self._blob_row(digest, raw))
+        self._remember(digest, text)
+        return f'{{"{BLOB_REF_KEY}":"{digest}"}}'
+
+    def _blob_row(self, digest: str, raw: bytes) -> BlobRow:
+        # 同一快照在一次执行中会被编码多次（snapshot/日志/output），复用压缩结果；
+        # 行仍由调用方 INSERT OR IGNORE 写入，不假设库中已存在。
+        with self._cache_lock:
+            row = self._encoded.get(digest)
+            if row is not None:
+                self._encoded.move_to_end(digest)
+                return row
+        compressed = zlib.compress(raw, self.compress_level)
+        if len(compressed) < len(raw):
+            row = BlobRow(digest, "zlib", len(raw), compressed)
+        else:
+            row = BlobRow(digest, "raw", len(raw), raw)
+        with self._cache_lock:
+            self._encoded[digest] = row
+            while len(self._encoded) > self._cache_size:
+                self._encoded.popitem(last=False)
+        return row
+
+    def _is_large(self, text: str) -> bool:
+        if len(text) >= self.threshold_bytes:
+            return True
+        return len(text) * 4 >= self.threshold_bytes and len(text.encode("utf-8")) >= self.threshold_bytes
+
+    def decode(self, text: str, fetch: BlobFetcher) -> Any:
+        value = serializer.loads(text)
+        if BLOB_REF_KEY not in text:
+            return value
+        return self._resolve(value, fetch)
+
+    def _resolve(self, value: Any, fetch: BlobFetcher) -> Any:
+        ref = _blob_ref(value)
+        if ref is not None:
+            return self._resolve(serializer.loads(self._load(ref, fetch)), fetch)
+        inner = _escaped(value)
+        if inner is not None:
+            return {key: self._resolve(item, fetch) for key, item in inner.items()}
+        if isinstance(value, dict):
+            return {key: self._resolve(item, fetch) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._resolve(item, fetch) for item in value]
+        return value
+
+    def live_refs(self, texts: Iterable[str], fetch: BlobFetcher) -> set[str]:
+        """标记阶段：从引用列文本出发，沿 blob 内的嵌套引用求出全部仍被引用的哈希。
+
+        引用从解析后的 JSON 结构中提取，不依赖序列化格式（空格、键顺序），转义的用户对象不计为引用。
+        """
+        live: set[str] = set()
+        pending = [digest for text in texts if BLOB_REF_KEY in text for digest in _refs(serializer.loads(text))]
+        while pending:
+            digest = pending.pop()
+            if digest in live:
+                continue
+            live.add(digest)
+            row = fetch(digest)
+            if row is not None:
+                pending.extend(_refs(serializer.loads(_inflate(row[0], row[1]))))
+        return live
+
+    def rereferenced(
+        self, candidates: set[str], texts: Iterable[str], new_digests: Iterable[str], fetch: BlobFetcher
+    ) -> set[str]:
+        """清除阶段的复查：返回标记之后又被引用的候选哈希。
+
+        texts 为持写锁后重新读出的引用列，new_digests 为标记之后新写入的 blob；被它们（直接或经其他
+        blob 嵌套）引用的候选都保留。只做子串级匹配，只解压新 blob 与被保留的候选，写锁内的耗时远小于完整标记。
+        """
+        keep = {token for text in texts for token in _DIGEST_TOKEN_RE.findall(text) if token in candidates}
+        pending = [*new_digests, *keep]
+        seen: set[str] = set()
+        while pending:
+            digest = pending.pop()
+            if digest in seen:
+                continue
+            seen.add(digest)
+            row = fetch(digest)
+            if row is None:
+                continue
+            for token in _DIGEST_TOKEN_RE.findall(_inflate(row[0], row[1])):
+                if token in candidates and token not in keep:
+                    keep.add(token)
+                    pending.append(token)
+        return keep
+
+    def forget(self, digests: Iterable[str]) -> None:
+        with self._cache_lock:
+            for digest in digests:
+                self._cache.pop(digest, None)
+                self._encoded.pop(digest, None)
+
+    def _load(self, digest: str, fetch: BlobFetcher) -> str:
+        # 缓存解压后的文本而不是对象：调用方会原地修改解码结果（如 task.output）。
+        with self._cache_lock:
+            text = self._cache.get(digest)
+            if text is not None:
+                self._cache.move_to_end(digest)
+                return text
+        row = fetch(digest)
+        if row is None:
+            raise LookupError(f"blob 不存在: {digest}")
+        text = _inflate(row[0], row[1])
+        self._remember(digest, text)
+        return text
+
+    def _remember(self, digest: str, text: str) -> None:
+        with self._cache_lock:
+            self._cache[digest] = text
+            self._cache.move_to_end(digest)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
@@ -1,92 +1,511 @@
 from __future__ import annotations
 
+import os
+import random
+import threading
+import time
+from collections.abc import Callable, Collection, Iterable, Mapping
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import AbstractContextManager, nullcontext
+from dataclasses import replace
 from datetime import datetime, timezone
 from typing import Any
 
+from app.channels.artifacts import artifact_scope
 from app.channels.base import CommerceChannel
-from app.models.schemas import ListingPack, ListingTask, TaskStatus
-from app.tasks.repository import TaskRepository
+from app.channels.device_pool import DeviceLease, DevicePool
+from app.models.schemas import FrozenListingPack, ListingPack, ListingTask, TaskStatus
+from app.tasks.base import StepTiming, TaskRepository, TaskUnitOfWork
+from app.tasks.batch import BatchWriter, ChannelLimiter
+from app.tasks.retry import CircuitBreaker, CircuitOpenError, RetryPolicy
+from app.tasks.scheduling import FairShareScheduler
+from app.tasks.steps import (
+    EXCLUSIVE_RESOURCES,
+    RESOURCE_CPU,
+    RESOURCE_DEVICE,
+    RESOURCE_NETWORK,
+    ResourceLimiter,
+    StepOutcome,
+    StepRegistry,
+    StepSpec,
+)
+
+TransactionFactory = Callable[[], AbstractContextManager[TaskUnitOfWork]]
+
+
+class _StepFailed(Exception):
+    """步骤在重试耗尽（或不可重试、熔断）后最终失败。"""
+
+    def __init__(
+        self, error: Exception, retries: int, timing: StepTiming | None = None, device_id: str | None = None
+    ) -> None:
+        super().__init__(str(error))
+        self.error = error
+        self.retries = retries
+        self.timing = timing
+        self.device_id = device_id
 
 
 class ListingTaskExecutor:
-    """模块化任务执行器：可扩展步骤、自动执行、失败可审计。"""
+    """模块化任务执行器：按步骤状态机推进，可从失败步骤续跑，失败可审计。"""
 
-    def __init__(self, channel: CommerceChannel, repo: TaskRepository, final_confirm_required: bool = True) -> None:
+    def __init__(
+        self,
+        channel: CommerceChannel,
+        repo: TaskRepository,
+        final_confirm_required: bool = True,
+        max_workers: int = 8,
+        channel_limit: int = 4,
+        channel_limits: Mapping[str, int] | None = None,
+        retry_policy: RetryPolicy | None = None,
+        step_retry_policies: Mapping[str, RetryPolicy] | None = None,
+        breaker_threshold: int = 5,
+        breaker_reset_seconds: float = 60.0,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+        rng: random.Random | None = None,
+        registry: StepRegistry | None = None,
+        resource_limits: Mapping[str, int] | None = None,
+        scheduler: FairShareScheduler | None = None,
+        device_pool: DevicePool | None = None,
+    ) -> None:
         self.channel = channel
         self.repo = repo
         self.final_confirm_required = final_confirm_required
+        self.max_workers = max_workers
+        self.limiter = ChannelLimiter(channel_limit, channel_limits)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.step_retry_policies = dict(step_retry_policies or {})
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset_seconds = breaker_reset_seconds
+        self._sleep = sleep
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._breakers: dict[tuple[str, str | None], CircuitBreaker] = {}
+        self._breakers_lock = threading.Lock()
+        # 默认的上架流程；插件步骤可通过 registry.register 追加，或整体传入自定义 registry。
+        self.registry = registry or StepRegistry(
+            [
+                StepSpec("create_product", self._create_product),
+                StepSpec(
+                    "set_product_online",
+                    self._set_product_online,
+                    depends_on=("create_product",),
+                    confirm_gated=True,
+                    device_affinity=True,
+                ),
+            ]
+        )
+        self.resources = ResourceLimiter(
+            resource_limits if resource_limits is not None else {RESOURCE_CPU: os.cpu_count() or 1, RESOURCE_NETWORK: 8}
+        )
+        self._step_pool: ThreadPoolExecutor | None = None
+        self._step_pool_lock = threading.Lock()
+        # 任务开始执行前按优先级与 fair_key 排队准入；None 时不排队（先到先得）。
+        self.scheduler = scheduler
+        # 多设备时每个设备步骤从池中租用一台设备（同一任务优先沿用上一步的设备，device_affinity 的步骤只用该设备）；
+        # None 时使用通道的默认设备。
+        self.device_pool = device_pool
 
     def _now(self) -> str:
         return datetime.now(timezone.utc).isoformat()
 
-    def _save_step(self, task_id: str, step_name: str, status: str, payload: dict[str, Any], error: str | None = None) -> None:
+    def _save_step(
+        self,
+        uow: TaskUnitOfWork,
+        task_id: str,
+        step_name: str,
+        status: str,
+        payload: dict[str, Any],
+        error: str | None = None,
+        retry_count: int = 0,
+        timing: StepTiming | None = None,
+        device_id: str | None = None,
+    ) -> None:
         artifact = None
         artifacts = payload.get("artifacts") if isinstance(payload, dict) else None
         if isinstance(artifacts, list) and artifacts:
             artifact = str(artifacts[0])
-        self.repo.save_step(
+        uow.save_step(
             task_id=task_id,
             step_name=step_name,
             status=status,
-            retry_count=0,
+            retry_count=retry_count,
             artifact_path=artifact,
             error=error,
             updated_at=self._now(),
+            timing=timing,
+            device_id=device_id or (getattr(self.channel, "device_id", None) if self._uses_device(step_name) else None),
         )
 
-    def execute(self, task: ListingTask, listing_pack: ListingPack) -> ListingTask:
-        task.status = TaskStatus.running
-        task.updated_at = self._now()
-        self.repo.save_task(task)
+    def execute(self, task: ListingTask, listing_pack: ListingPack | FrozenListingPack) -> ListingTask:
+        with self._admitted(task):
+            return self._execute(task, listing_pack, self.repo.transaction)
 
-        try:
-            create_res = self.channel.create_product(listing_pack.model_dump())
-            self.repo.log_step(
-                task.task_id,
-                "create_product",
-                bool(create_res.get("success", False)),
-                "商品创建完成",
-                create_res,
-                self._now(),
-            )
-            self._save_step(task.task_id, "create_product", "done", create_res)
+    def _admitted(self, task: ListingTask) -> AbstractContextManager[None]:
+        if self.scheduler is None:
+            return nullcontext()
+        return self.scheduler.slot(task.priority, task.fair_key)
+
+    def execute_many(
+        self,
+        items: Iterable[tuple[ListingTask, ListingPack | FrozenListingPack]],
+        flush_size: int = 50,
+        flush_interval: float = 1.0,
+    ) -> list[ListingTask]:
+        """并发执行一批任务，返回结果与输入顺序一致。
+
+        任务在 max_workers 个线程上执行，配置了 scheduler 时先按优先级排队准入，同一通道（task.channel）同时在执行的任务不超过其上限；
+        各任务的步骤写入经 BatchWriter 合并提交，返回前全部落库。
+        """
+        writer = BatchWriter(self.repo, flush_size=flush_size, flush_interval=flush_interval)
+        return self._run_many([(task, listing_pack, frozenset()) for task, listing_pack in items], writer)
 
-            item_id = str(create_res.get("data", {}).get("item_id", ""))
-            task.output = {"create": create_res, "item_id": item_id}
+    def confirm_many(self, task_ids: Iterable[str]) -> list[dict[str, Any]]:
+        """批量人工确认并发布，返回与输入顺序一致的逐任务结果（重复的 id 只处理一次）。
 
-            if self.final_confirm_required:
-                task.status = TaskStatus.wait_manual_confirm
-                task.output["manual_confirm_required"] = True
+        任务与步骤记录各用一次 IN 查询读出并校验；通过校验的任务并发执行剩余步骤（同一通道受并发上限约束）。
+        发布是外部副作用，每个步骤在外部调用返回后立即单独提交：中途崩溃时已发布的任务不会在续跑时被重复发布。
+        不存在或不在待确认状态的任务不执行，只在结果中给出原因。
+        """
+        ids = list(dict.fromkeys(task_ids))
+        tasks = self.repo.get_tasks(ids)
+        outcomes: dict[str, dict[str, Any]] = {}
+        confirmable: list[ListingTask] = []
+        for task_id in ids:
+            task = tasks.get(task_id)
+            if task is None:
+                outcomes[task_id] = {"task_id": task_id, "ok": False, "status": None, "error": "任务不存在"}
+            elif task.status != TaskStatus.wait_manual_confirm:
+                outcomes[task_id] = {"task_id": task_id, "ok": False, "status": task.status.value, "error": "当前任务不在待人工确认状态"}
             else:
-                online_res = self.channel.set_product_online(item_id)
-                self.repo.log_step(
-                    task.task_id,
-                    "set_product_online",
-                    bool(online_res.get("success", False)),
-                    "商品自动上架完成",
-                    online_res,
-                    self._now(),
-                )
-                self._save_step(task.task_id, "set_product_online", "done", online_res)
-                task.status = TaskStatus.done
-                task.output["online"] = online_res
-        except Exception as exc:  # noqa: BLE001
-            task.status = TaskStatus.failed
-            task.output = {"error": str(exc)}
-            self.repo.log_step(
-                task.task_id,
-                "task_failed",
-                False,
-                "自动化任务失败",
-                {"error": str(exc)},
-                self._now(),
+                task.output["manual_confirmed"] = True
+                confirmable.append(task)
+
+        steps = self.repo.list_steps_many([task.task_id for task in confirmable])
+        jobs = [
+            (
+                task,
+                self._snapshot_pack(task),
+                frozenset(step["step_name"] for step in steps.get(task.task_id, []) if step["status"] == "done"),
             )
-            self._save_step(task.task_id, "task_failed", "failed", {}, error=str(exc))
+            for task in confirmable
+        ]
+        writer = BatchWriter(self.repo, flush_size=1)
+        for task in self._run_many(jobs, writer):
+            outcomes[task.task_id] = {
+                "task_id": task.task_id,
+                "ok": task.status == TaskStatus.done,
+                "status": task.status.value,
+                "error": task.output.get("error"),
+            }
+        return [outcomes[task_id] for task_id in ids]
+
+    def _run_many(
+        self,
+        jobs: list[tuple[ListingTask, ListingPack | FrozenListingPack, frozenset[str]]],
+        writer: BatchWriter,
+    ) -> list[ListingTask]:
+        def run(task: ListingTask, listing_pack: ListingPack | FrozenListingPack, done: frozenset[str]) -> ListingTask:
+            with self._admitted(task), self.limiter.slot(task.channel):
+                return self._execute(task, listing_pack, writer.transaction, done)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="listing-task") as pool:
+                futures = [pool.submit(run, *job) for job in jobs]
+                return [future.result() for future in futures]
+        finally:
+            writer.close()
+
+    def _execute(
+        self,
+        task: ListingTask,
+        listing_pack: ListingPack | FrozenListingPack,
+        transaction: TransactionFactory,
+        done: frozenset[str] = frozenset(),
+    ) -> ListingTask:
+        """DAG 调度主循环：前置步骤均已完成的步骤即可开始，互不依赖的步骤并行执行。
+
+        同一任务内占用独占资源（device）的步骤串行，cpu/network 步骤与之并行（受 resources 的全局上限约束）；
+        需人工确认的步骤在放行前不会开始。每一步完成后，其结果、步骤状态与任务状态在同一个事务里提交；
+        某一步失败（含步骤中或提交结果时的非预期异常）后不再启动新步骤，排队未开始的步骤被取消，
+        等已在执行的步骤结束后把任务记为失败，已完成步骤的输出保留供 resume 使用。
+        """
+        task.output.pop("error", None)
+        done = set(done)
+        status = self._next_status(task, done, ())
+        if status != TaskStatus.running:
+            return self._settle(task, status, transaction)
+        self._settle(task, TaskStatus.running, transaction)
+
+        running: dict[Future, str] = {}
+        failure: tuple[str, _StepFailed] | None = None
+        while True:
+            if failure is None:
+                launch = self._launchable(task, done, running.values())
+                for step_name in launch:
+                    # 只有一个可执行步骤时在当前线程执行，线性流程不经过步骤线程池。
+                    inline = len(launch) == 1 and not running
+                    running[self._submit(inline, task, step_name, listing_pack, transaction)] = step_name
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                step_name = running.pop(future)
+                if future.cancelled():
+                    continue
+                try:
+                    outcome, retries, timing = future.result()
+                except Exception as exc:  # noqa: BLE001
+                    # 步骤内部的非预期异常（如写 retrying 记录时数据库出错）同样让任务失败，而不是冒泡出执行器。
+                    failure = failure or (step_name, exc if isinstance(exc, _StepFailed) else _StepFailed(exc, 0))
+                    self._cancel_pending(running)
+                    continue
+                task.output.update(outcome.output)
+                done.add(step_name)
+                if failure is None:
+                    task.status = self._next_status(task, done, running.values())
+                    if task.status == TaskStatus.wait_manual_confirm:
+                        task.output["manual_confirm_required"] = True
+                task.updated_at = self._now()
+                result = outcome.result
+                device_id = outcome.output.get("device_id") if self.device_pool is not None else None
+                try:
+                    with transaction() as uow:
+                        uow.log_step(task.task_id, step_name, bool(result.get("success", False)), outcome.message, result, self._now())
+                        self._save_step(
+                            uow,
+                            task.task_id,
+                            step_name,
+                            "done",
+                            result,
+                            retry_count=retries,
+                            timing=timing,
+                            device_id=device_id,
+                        )
+                        uow.save_task(task)
+                except Exception as exc:  # noqa: BLE001
+                    done.discard(step_name)
+                    failure = failure or (step_name, _StepFailed(exc, retries, timing, device_id))
+                    self._cancel_pending(running)
 
+        if failure is not None:
+            step_name, exc = failure
+            return self._fail(task, step_name, exc.error, transaction, exc.retries, exc.timing, exc.device_id)
+        return task
+
+    @staticmethod
+    def _cancel_pending(running: Mapping[Future, str]) -> None:
+        """取消已提交但尚未开始的步骤；已在执行的步骤无法取消，照常等其结束。"""
+        for future in running:
+            future.cancel()
+
+    def _launchable(self, task: ListingTask, done: Collection[str], running: Collection[str]) -> list[str]:
+        """可立即开始的步骤：依赖已满足、未被人工确认闸口拦住，且不与执行中的步骤争用独占资源。"""
+        held = {resource for name in running for resource in self.registry[name].resources & EXCLUSIVE_RESOURCES}
+        launch: list[str] = []
+        for step_name in self.registry.ready(done, running):
+            exclusive = self.registry[step_name].resources & EXCLUSIVE_RESOURCES
+            if self._awaits_confirm(task, step_name) or exclusive & held:
+                continue
+            held |= exclusive
+            launch.append(step_name)
+        return launch
+
+    def _next_status(self, task: ListingTask, done: Collection[str], running: Collection[str]) -> TaskStatus:
+        if all(name in done for name in self.registry.names):
+            return TaskStatus.done
+        if running or any(not self._awaits_confirm(task, name) for name in self.registry.ready(done, running)):
+            return TaskStatus.running
+        return TaskStatus.wait_manual_confirm
+
+    def _submit(
+        self,
+        inline: bool,
+        task: ListingTask,
+        step_name: str,
+        listing_pack: ListingPack | FrozenListingPack,
+        transaction: TransactionFactory,
+    ) -> Future:
+        if not inline:
+            return self._steps_pool().submit(self._run_step, task, step_name, listing_pack, transaction)
+        future: Future = Future()
+        try:
+            future.set_result(self._run_step(task, step_name, listing_pack, transaction))
+        except Exception as exc:  # noqa: BLE001
+            future.set_exception(exc)
+        return future
+
+    def close(self) -> None:
+        """关闭步骤线程池并等待执行中的步骤结束（批量执行的任务线程池在每次调用结束时已关闭）；之后的调用会按需重建。"""
+        with self._step_pool_lock:
+            pool, self._step_pool = self._step_pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def _steps_pool(self) -> ThreadPoolExecutor:
+        with self._step_pool_lock:
+            if self._step_pool is None:
+                self._step_pool = ThreadPoolExecutor(max_workers=self.max_workers * 2, thread_name_prefix="listing-step")
+            return self._step_pool
+
+    def _run_step(
+        self,
+        task: ListingTask,
+        step_name: str,
+        listing_pack: ListingPack | FrozenListingPack,
+        transaction: TransactionFactory,
+    ) -> tuple[StepOutcome, int, StepTiming]:
+        """按重试策略执行一步，返回 (步骤结果, 重试次数, 本次尝试计时)；最终失败时抛 _StepFailed。
+
+        每次失败的尝试都以 retrying 状态写入步骤表（含本次 retry_count、错误与耗时）。
+        占用设备的步骤都经过熔断器：熔断打开时直接失败，不再等待设备超时。
+        配置了设备池时每次尝试各自租用设备，失败计入该设备，重试可落到另一台健康设备上；熔断器按
+        (通道, 设备) 区分，租到的设备熔断中时本次尝试失败并换设备重试，不影响池中其他设备。
+        租到的设备写入 output["device_id"]。
+        """
+        spec = self.registry[step_name]
+        policy = self.step_retry_policies.get(step_name, self.retry_policy)
+        uses_device = RESOURCE_DEVICE in spec.resources
+        channel_breaker = self.breaker(task.channel) if uses_device and self.device_pool is None else None
+        attempt = 0
+        while True:
+            attempt += 1
+            breaker = channel_breaker
+            try:
+                if breaker is not None:
+                    breaker.before_call()
+            except CircuitOpenError as exc:
+                raise _StepFailed(exc, attempt - 1) from exc
+            started_at, started = self._now(), self._clock()
+            device_id = None
+            rejection: CircuitOpenError | None = None
+            try:
+                with (
+                    self.resources.acquire(spec.resources),
+                    self._device_lease(task, spec) as lease,
+                    artifact_scope(task.task_id, step_name),
+                ):
+                    device_id = lease.device_id if lease is not None else None
+                    if lease is not None:
+                        breaker = self.breaker(task.channel, lease.device_id)
+                        # 熔断拒绝不是设备故障：不在租约内抛出，免得计入设备池的连续失败、把设备隔离。
+                        try:
+                            breaker.before_call()
+                        except CircuitOpenError as exc:
+                            rejection = exc
+                    if rejection is None:
+                        outcome = spec.handler(task, listing_pack)
+                if rejection is not None:
+                    raise rejection
+            except Exception as exc:  # noqa: BLE001
+                timing = self._timing(started_at, started)
+                rejected = isinstance(exc, CircuitOpenError)
+                if breaker is not None and not rejected:
+                    breaker.record_failure()
+                if not (policy.should_retry(exc, attempt) or (rejected and attempt < policy.max_attempts)):
+                    raise _StepFailed(exc, attempt - 1, timing, device_id) from exc
+                with transaction() as uow:
+                    self._save_step(
+                        uow,
+                        task.task_id,
+                        step_name,
+                        "retrying",
+                        {},
+                        error=str(exc),
+                        retry_count=attempt - 1,
+                        timing=timing,
+                        device_id=device_id,
+                    )
+                self._sleep(policy.delay(attempt, self._rng))
+                continue
+            if breaker is not None:
+                breaker.record_success()
+            if device_id is not None:
+                outcome = replace(outcome, output={**outcome.output, "device_id": device_id})
+            return outcome, attempt - 1, self._timing(started_at, started)
+
+    def _device_lease(self, task: ListingTask, spec: StepSpec) -> AbstractContextManager[DeviceLease | None]:
+        if self.device_pool is None or RESOURCE_DEVICE not in spec.resources:
+            return nullcontext()
+        previous = task.output.get("device_id")
+        if spec.device_affinity and previous:
+            return self.device_pool.lease(task.task_id, require=previous)
+        return self.device_pool.lease(task.task_id, prefer=previous)
+
+    def _timing(self, started_at: str, started: float) -> StepTiming:
+        return StepTiming(started_at, self._now(), round((self._clock() - started) * 1000, 3))
+
+    def breaker(self, channel: str, device_id: str | None = None) -> CircuitBreaker:
+        key = (channel, device_id)
+        with self._breakers_lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                name = channel if device_id is None else f"{channel}/{device_id}"
+                breaker = CircuitBreaker(name, self.breaker_threshold, self.breaker_reset_seconds, clock=self._clock)
+                self._breakers[key] = breaker
+            return breaker
+
+    def _awaits_confirm(self, task: ListingTask, step_name: str) -> bool:
+        gated = self.registry[step_name].confirm_gated
+        return gated and self.final_confirm_required and not task.output.get("manual_confirmed")
+
+    def _uses_device(self, step_name: str) -> bool:
+        return step_name in self.registry and RESOURCE_DEVICE in self.registry[step_name].resources
+
+    def _settle(self, task: ListingTask, status: TaskStatus, transaction: TransactionFactory) -> ListingTask:
+        task.status = status
+        if status == TaskStatus.wait_manual_confirm:
+            task.output["manual_confirm_required"] = True
+        task.updated_at = self._now()
+        with transaction() as uow:
+            uow.save_task(task)
+        return task
+
+    def _fail(
+        self,
+        task: ListingTask,
+        step_name: str,
+        exc: Exception,
+        transaction: TransactionFactory,
+        retries: int = 0,
+        timing: StepTiming | None = None,
+        device_id: str | None = None,
+    ) -> ListingTask:
+        task.status = TaskStatus.failed
+        task.output["error"] = str(exc)
         task.updated_at = self._now()
-        self.repo.save_task(task)
+        with transaction() as uow:
+            uow.log_step(task.task_id, "task_failed", False, "自动化任务失败", {"step": step_name, "error": str(exc)}, self._now())
+            self._save_step(
+                uow, task.task_id, step_name, "failed", {}, error=str(exc), retry_count=retries, timing=timing, device_id=device_id
+            )
+            uow.save_task(task)
         return task
 
+    def _create_product(self, task: ListingTask, listing_pack: ListingPack | FrozenListingPack) -> StepOutcome:
+        result = self.channel.create_product(listing_pack.model_dump())
+        item_id = str(result.get("data", {}).get("item_id", ""))
+        return StepOutcome(result, "商品创建完成", {"create": result, "item_id": item_id})
+
+    def _set_product_online(self, task: ListingTask, listing_pack: ListingPack | FrozenListingPack) -> StepOutcome:
+        result = self.channel.set_product_online(str(task.output.get("item_id", "")))
+        message = "人工确认后发布完成" if task.output.get("manual_confirmed") else "商品自动上架完成"
+        return StepOutcome(result, message, {"online": result})
+
+    def resume(self, task_id: str) -> ListingTask:
+        """从持久化的步骤记录继续执行：跳过已 done 的步骤，从第一个未完成的步骤开始。
+
+        已完成或仍在等待人工确认的任务原样返回。调用方需保证同一任务没有其他执行者正在运行。
+        """
+        task = self.repo.get_task(task_id)
+        if task is None:
+            raise ValueError(f"任务不存在: {task_id}")
+        if task.status in (TaskStatus.done, TaskStatus.wait_manual_confirm):
+            return task
+        with self._admitted(task):
+            return self._execute(task, self._snapshot_pack(task), self.repo.transaction, self._done_steps(task_id))
+
     def confirm_and_publish(self, task_id: str) -> ListingTask:
         task = self.repo.get_task(task_id)
         if task is None:
@@ -94,24 +513,16 @@ class ListingTaskExecutor:
         if task.status != TaskStatus.wait_manual_confirm:
             raise ValueError("当前任务不在待人工确认状态")
 
-        item_id = str(task.output.get("item_id", ""))
-        online_res = self.channel.set_product_online(item_id)
-        self.repo.log_step(
-            task.task_id,
-            "set_product_online",
-            bool(online_res.get("success", False)),
-            "人工确认后发布完成",
-            online_res,
-            self._now(),
-        )
-        self._save_step(task.task_id, "set_product_online", "done", online_res)
-
-        task.status = TaskStatus.done
-        task.output["online"] = online_res
         task.output["manual_confirmed"] = True
-        task.updated_at = self._now()
-        self.repo.save_task(task)
-        return task
+        with self._admitted(task):
+            return self._execute(task, self._snapshot_pack(task), self.repo.transaction, self._done_steps(task_id))
+
+    def _done_steps(self, task_id: str) -> frozenset[str]:
+        return frozenset(step["step_name"] for step in self.repo.list_steps(task_id) if step["status"] == "done")
+
+    @staticmethod
+    def _snapshot_pack(task: ListingTask) -> FrozenListingPack:
+        return FrozenListingPack.from_snapshot(task.input_snapshot)
 
     @staticmethod
     def build_pack(product_id: str, payload: dict[str, Any]) -> ListingPack:
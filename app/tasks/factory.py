@@ -0,0 +1,40 @@
+import logging
+
+import redis
+
+from app.tasks.base import TaskRepository
+from app.tasks.idempotency import IdempotencyStore, InMemoryIdempotencyStore, SQLiteIdempotencyStore
+from app.tasks.queue import RedisTaskQueue, SQLiteTaskQueue, TaskQueue
+from app.tasks.repository import SQLiteTaskRepository
+from app.tasks.sqlalchemy_repository import SQLAlchemyTaskRepository
+
+logger = logging.getLogger(__name__)
+
+
+def build_task_repository(db_path: str) -> TaskRepository:
+    """`task_db_path` 为文件路径时使用 sqlite3 实现，为数据库 URL（如 postgresql+psycopg://...）时使用 SQLAlchemy 实现。"""
+    if "://" in db_path:
+        return SQLAlchemyTaskRepository(db_path)
+    return SQLiteTaskRepository(db_path)
+
+
+def build_task_queue(backend: str, repo: TaskRepository, redis_url: str = "") -> TaskQueue:
+    """`sqlite` 队列与任务表同库，仅支持 sqlite3 仓储；使用数据库 URL（如 Postgres）时请选 `redis`。"""
+    if backend == "redis":
+        return RedisTaskQueue(redis.Redis.from_url(redis_url))
+    if backend == "sqlite":
+        if not isinstance(repo, SQLiteTaskRepository):
+            raise ValueError(f"sqlite 队列需要 SQLiteTaskRepository，当前为 {type(repo).__name__}，请改用 redis 队列")
+        return SQLiteTaskQueue(repo)
+    raise ValueError(f"未知的任务队列后端: {backend}")
+
+
+def build_idempotency_store(repo: TaskRepository) -> IdempotencyStore:
+    """sqlite3 仓储使用同库的 idempotency_keys 表；其他后端退化为进程内存储（仅在单进程内去重）。"""
+    if isinstance(repo, SQLiteTaskRepository):
+        return SQLiteIdempotencyStore(repo)
+    logger.warning(
+        "%s 没有共享的幂等键存储，退化为进程内存储：多个进程/实例之间不会去重，同一幂等键的请求可能被重复执行",
+        type(repo).__name__,
+    )
+    return InMemoryIdempotencyStore()
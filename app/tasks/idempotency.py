@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+from app.models import serializer
+from app.tasks.repository import SQLiteTaskRepository
+
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+
+
+class IdempotencyKeyConflict(ValueError):
+    """同一个幂等键被用于内容不同的请求。"""
+
+
+class IdempotencyKeyInProgress(RuntimeError):
+    """同一个幂等键的请求仍在执行，等待超时。"""
+
+
+@dataclass(frozen=True, slots=True)
+class IdempotencyRecord:
+    key: str
+    request_hash: str
+    status: str
+    response: Any = None
+
+
+def request_fingerprint(payload: Any) -> str:
+    """请求体的稳定摘要，用于识别“同一个键、不同请求”的误用。"""
+    return hashlib.sha256(serializer.dumps_bytes(payload)).hexdigest()
+
+
+class IdempotencyStore(Protocol):
+    """幂等键记录表。
+
+    begin 原子地为 key 写入 in_progress 记录并返回 None（调用方获得执行权）；
+    key 已存在时返回现有记录。已过期（expires_at）的记录与执行者疑似崩溃（locked_until 已过）
+    的 in_progress 记录可以被重新占用。
+    """
+
+    def begin(self, key: str, request_hash: str, lock_seconds: float, ttl_seconds: float) -> IdempotencyRecord | None: ...
+
+    def complete(self, key: str, response: Any) -> None: ...
+
+    def abandon(self, key: str) -> None: ...
+
+    def purge_expired(self) -> int: ...
+
+
+class InMemoryIdempotencyStore:
+    """进程内实现：语义与持久化实现一致，用于测试与非 sqlite3 仓储。"""
+
+    def __init__(self, clock: Callable[[], float] = time.time) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (record, locked_until, expires_at)
+        self._records: dict[str, tuple[IdempotencyRecord, float, float]] = {}
+
+    def begin(self, key: str, request_hash: str, lock_seconds: float, ttl_seconds: float) -> IdempotencyRecord | None:
+        with self._lock:
+            now = self._clock()
+            entry = self._records.get(key)
+            if entry is not None:
+                record, locked_until, expires_at = entry
+                if expires_at > now and (record.status == COMPLETED or locked_until > now):
+                    return record
+            self._records[key] = (IdempotencyRecord(key, request_hash, IN_PROGRESS), now + lock_seconds, now + ttl_seconds)
+            return None
+
+    def complete(self, key: str, response: Any) -> None:
+        with self._lock:
+            entry = self._records.get(key)
+            if entry is not None and entry[0].status == IN_PROGRESS:
+                record, _, expires_at = entry
+                # 与持久化实现一致：返回的是序列化后再解析的副本。
+                response = serializer.loads(serializer.dumps(response))
+                self._records[key] = (IdempotencyRecord(key, record.request_hash, COMPLETED, response), 0.0, expires_at)
+
+    def abandon(self, key: str) -> None:
+        with self._lock:
+            entry = self._records.get(key)
+            if entry is not None and entry[0].status == IN_PROGRESS:
+                del self._records[key]
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            now = self._clock()
+            expired = [key for key, (_, _, expires_at) in self._records.items() if expires_at <= now]
+            for key in expired:
+                del self._records[key]
+            return len(expired)
+
+
+# 冲突时只在记录已过期或执行者租约已过时覆盖；rowcount == 0 表示 key 被他人持有。
+_BEGIN_SQL = """
+INSERT INTO idempotency_keys (key, request_hash, status, response, locked_until, expires_at)
+VALUES (?, ?, 'in_progress', NULL, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    request_hash = excluded.request_hash,
+    status = 'in_progress',
+    response = NULL,
+    locked_until = excluded.locked_until,
+    expires_at = excluded.expires_at
+WHERE idempotency_keys.expires_at <= ?
+   OR (idempotency_keys.status = 'in_progress' AND idempotency_keys.locked_until <= ?)
+"""
+
+_SELECT_SQL = "SELECT request_hash, status, response FROM idempotency_keys WHERE key = ?"
+_COMPLETE_SQL = """
+UPDATE idempotency_keys SET status = 'completed', response = ?, locked_until = 0
+WHERE key = ? AND status = 'in_progress'
+"""
+_ABANDON_SQL = "DELETE FROM idempotency_keys WHERE key = ? AND status = 'in_progress'"
+_PURGE_SQL = "DELETE FROM idempotency_keys WHERE expires_at <= ?"
+
+
+class SQLiteIdempotencyStore:
+    """与 listing_tasks 同库的 idempotency_keys 表，多进程共享；写入与读取在同一事务内完成。"""
+
+    def __init__(self, repo: SQLiteTaskRepository, clock: Callable[[], float] = time.time) -> None:
+        self.repo = repo
+        self._clock = clock
+
+    def begin(self, key: str, request_hash: str, lock_seconds: float, ttl_seconds: float) -> IdempotencyRecord | None:
+        now = self._clock()
+        with self.repo._connect() as conn:
+            cursor = conn.execute(_BEGIN_SQL, (key, request_hash, now + lock_seconds, now + ttl_seconds, now, now))
+            if cursor.rowcount == 1:
+                return None
+            stored_hash, status, response = conn.execute(_SELECT_SQL, (key,)).fetchone()
+        return IdempotencyRecord(key, stored_hash, status, serializer.loads(response) if response is not None else None)
+
+    def complete(self, key: str, response: Any) -> None:
+        with self.repo._connect() as conn:
+            conn.execute(_COMPLETE_SQL, (serializer.dumps(response), key))
+
+    def abandon(self, key: str) -> None:
+        with self.repo._connect() as conn:
+            conn.execute(_ABANDON_SQL, (key,))
+
+    def purge_expired(self) -> int:
+        with self.repo._connect() as conn:
+            return conn.execute(_PURGE_SQL, (self._clock(),)).rowcount
+
+
+class IdempotencyGuard:
+    """按幂等键执行一次：首个请求执行并保存响应，重试直接返回保存的响应。
+
+    并发的重复请求不会再次执行，而是等待进行中的那次完成（同进程内由事件唤醒，跨进程轮询记录表），
+    最多等待 wait_seconds；执行抛异常时释放该键，允许客户端重试。lock_seconds 是进行中记录的租期，
+    应不短于一次执行（含设备步骤与重试）的上限，否则执行未完的请求会被重复执行；wait_seconds 不设置时
+    等于 lock_seconds，重复请求要么拿到结果，要么等到租期过期后自行接手执行。
+    """
+
+    def __init__(
+        self,
+        store: IdempotencyStore,
+        ttl_seconds: float = 86400.0,
+        lock_seconds: float = 900.0,
+        wait_seconds: float | None = None,
+        poll_interval: float = 0.5,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.lock_seconds = lock_seconds
+        self.wait_seconds = lock_seconds if wait_seconds is None else wait_seconds
+        self.poll_interval = poll_interval
+        self._sleep = sleep
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._inflight: dict[str, threading.Event] = {}
+
+    def run(self, key: str, request: Any, func: Callable[[], Any]) -> Any:
+        request_hash = request_fingerprint(request)
+        deadline = self._clock() + self.wait_seconds
+        while True:
+            record = self.store.begin(key, request_hash, self.lock_seconds, self.ttl_seconds)
+            if record is None:
+                return self._execute(key, func)
+            if record.request_hash != request_hash:
+                raise IdempotencyKeyConflict(f"幂等键 {key} 已用于内容不同的请求")
+            if record.status == COMPLETED:
+                return record.response
+            remaining = deadline - self._clock()
+            if remaining <= 0:
+                raise IdempotencyKeyInProgress(f"幂等键 {key} 对应的请求仍在执行，请稍后重试")
+            with self._lock:
+                event = self._inflight.get(key)
+            if event is not None:
+                event.wait(min(remaining, self.poll_interval * 10))
+            else:
+                self._sleep(min(remaining, self.poll_interval))
+
+    def _execute(self, key: str, func: Callable[[], Any]) -> Any:
+        event = threading.Event()
+        with self._lock:
+            self._inflight[key] = event
+        try:
+            response = func()
+        except BaseException:
+            self.store.abandon(key)
+            raise
+        else:
+            self.store.complete(key, response)
+            return response
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+
+@dataclass(frozen=True)
+class Migration:
+    """一次有序的 schema 变更；version 严格递增，已应用的版本不可再修改。"""
+
+    version: int
+    name: str
+    statements: tuple[str, ...]
+
+
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(
+        version=1,
+        name="create_task_tables",
+        statements=(
+            """
+            CREATE TABLE IF NOT EXISTS listing_tasks (
+                task_id TEXT PRIMARY KEY,
+                product_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                listing_pack_version TEXT NOT NULL,
+                input_snapshot TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                output TEXT NOT NULL
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS task_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                task_id TEXT NOT NULL,
+                step_name TEXT NOT NULL,
+                success INTEGER NOT NULL,
+                message TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS listing_task_steps (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                task_id TEXT NOT NULL,
+                step_name TEXT NOT NULL,
+                status TEXT NOT NULL,
+                retry_count INTEGER NOT NULL DEFAULT 0,
+                artifact_path TEXT,
+                error TEXT,
+                updated_at TEXT NOT NULL
+            )
+            """,
+        ),
+    ),
+    Migration(
+        version=2,
+        name="add_task_indexes",
+        statements=(
+            "CREATE INDEX IF NOT EXISTS idx_task_logs_task_id ON task_logs (task_id, id)",
+            "CREATE INDEX IF NOT EXISTS idx_listing_task_steps_task_id ON listing_task_steps (task_id, id)",
+            "CREATE INDEX IF NOT EXISTS idx_listing_tasks_status_updated ON listing_tasks (status, updated_at)",
+            "CREATE INDEX IF NOT EXISTS idx_listing_tasks_product_id ON listing_tasks (product_id)",
+        ),
+    ),
+    Migration(
+        version=3,
+        name="add_task_keyset_indexes",
+        statements=(
+            # (status, updated_at) 是新索引的前缀，保留会让写入多维护一棵 B-tree。
+            "DROP INDEX IF EXISTS idx_listing_tasks_status_updated",
+            "CREATE INDEX IF NOT EXISTS idx_listing_tasks_status_keyset ON listing_tasks (status, updated_at, task_id)",
+            "CREATE INDEX IF NOT EXISTS idx_listing_tasks_keyset ON listing_tasks (updated_at, task_id)",
+        ),
+    ),
+    Migration(
+        version=4,
+        name="create_task_blobs",
+        statements=(
+            """
+            CREATE TABLE IF NOT EXISTS task_blobs (
+                hash TEXT PRIMARY KEY,
+                codec TEXT NOT NULL,
+                raw_size INTEGER NOT NULL,
+                data BLOB NOT NULL
+            )
+            """,
+        ),
+    ),
+    Migration(
+        version=5,
+        name="create_task_queue",
+        statements=(
+            """
+            CREATE TABLE IF NOT EXISTS task_queue (
+                task_id TEXT PRIMARY KEY,
+                available_at REAL NOT NULL,
+                enqueued_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_token TEXT
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_task_queue_available ON task_queue (available_at)",
+        ),
+    ),
+    Migration(
+        version=6,
+        name="add_step_timings",
+        statements=(
+            "ALTER TABLE listing_task_steps ADD COLUMN started_at TEXT",
+            "ALTER TABLE listing_task_steps ADD COLUMN finished_at TEXT",
+            "ALTER TABLE listing_task_steps ADD COLUMN duration_ms REAL",
+            "ALTER TABLE listing_task_steps ADD COLUMN device_id TEXT",
+            # 延迟统计按时间窗口范围扫描；未计时的行（NULL）不进入统计。
+            "CREATE INDEX IF NOT EXISTS idx_listing_task_steps_finished ON listing_task_steps (finished_at)",
+        ),
+    ),
+    Migration(
+        version=7,
+        name="create_idempotency_keys",
+        statements=(
+            """
+            CREATE TABLE IF NOT EXISTS idempotency_keys (
+                key TEXT PRIMARY KEY,
+                request_hash TEXT NOT NULL,
+                status TEXT NOT NULL,
+                response TEXT,
+                locked_until REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires ON idempotency_keys (expires_at)",
+        ),
+    ),
+    Migration(
+        version=8,
+        name="add_task_priority",
+        statements=(
+            "ALTER TABLE listing_tasks ADD COLUMN priority TEXT NOT NULL DEFAULT 'normal'",
+            "ALTER TABLE listing_tasks ADD COLUMN fair_key TEXT NOT NULL DEFAULT ''",
+        ),
+    ),
+)
+
+_CREATE_VERSION_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_at TEXT NOT NULL
+)
+"""
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return int(row[0] or 0)
+
+
+def apply_migrations(conn: sqlite3.Connection, migrations: tuple[Migration, ...] = MIGRATIONS) -> list[int]:
+    """按版本顺序应用尚未执行的迁移，返回本次应用的版本号。
+
+    每个迁移在独立的 BEGIN IMMEDIATE 事务中执行并写入 schema_version；
+    多进程同时启动时写锁保证同一版本只会被应用一次。
+    """
+    ordered = sorted(migrations, key=lambda migration: migration.version)
+    versions = [migration.version for migration in ordered]
+    if len(set(versions)) != len(versions):
+        raise ValueError(f"迁移版本号重复: {versions}")
+
+    conn.execute(_CREATE_VERSION_TABLE_SQL)
+    conn.commit()
+    applied: list[int] = []
+    for migration in ordered:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if migration.version <= current_version(conn):
+                conn.rollback()
+                continue
+            for statement in migration.statements:
+                conn.execute(statement)
+            conn.execute(
+                "INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)",
+                (migration.version, migration.name, datetime.now(timezone.utc).isoformat()),
+            )
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        conn.commit()
+        applied.append(migration.version)
+    return applied
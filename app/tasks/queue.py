@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import heapq
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, Protocol
+from uuid import uuid4
+
+from app.tasks.repository import SQLiteTaskRepository
+
+
+@dataclass(frozen=True, slots=True)
+class Lease:
+    """一次领取：token 用于隔离过期后被他人重新领取的情况，attempts 为累计投递次数。"""
+
+    task_id: str
+    token: str
+    attempts: int
+    lease_until: float
+
+
+class TaskQueue(Protocol):
+    """带租约的任务队列。
+
+    claim 原子地领取一个到期任务，并把它对其他 worker 隐藏 lease_seconds 秒（可见性超时）；
+    持有者需在到期前 heartbeat 续租，执行完 ack 删除，失败可 release 放回。
+    租约过期未续的任务会被其他 worker 重新领取，因此同一任务可能被投递多次，执行需可续跑（resume）。
+    """
+
+    def enqueue(self, task_id: str, delay: float = 0.0) -> None: ...
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Lease | None: ...
+
+    def heartbeat(self, lease: Lease, lease_seconds: float) -> bool: ...
+
+    def ack(self, lease: Lease) -> bool: ...
+
+    def release(self, lease: Lease, delay: float = 0.0) -> bool: ...
+
+    def depth(self) -> int: ...
+
+    def is_queued(self, task_id: str) -> bool:
+        """任务仍在队列中（等待领取或租约中），即尚未被 ack。"""
+        ...
+
+
+def _new_token(worker_id: str) -> str:
+    return f"{worker_id}:{uuid4().hex}"
+
+
+class InMemoryTaskQueue:
+    """进程内队列：语义与持久化实现一致，用于测试与单进程试跑，重启即丢失。"""
+
+    def __init__(self, clock: Callable[[], float] = time.time) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._available: dict[str, float] = {}
+        self._tokens: dict[str, str] = {}
+        self._attempts: dict[str, int] = {}
+        self._heap: list[tuple[float, str]] = []
+
+    def enqueue(self, task_id: str, delay: float = 0.0) -> None:
+        with self._lock:
+            if task_id in self._available:
+                return
+            self._schedule(task_id, self._clock() + delay)
+            self._attempts[task_id] = 0
+
+    def _schedule(self, task_id: str, available_at: float) -> None:
+        self._available[task_id] = available_at
+        heapq.heappush(self._heap, (available_at, task_id))
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Lease | None:
+        with self._lock:
+            now = self._clock()
+            while self._heap and self._heap[0][0] <= now:
+                available_at, task_id = heapq.heappop(self._heap)
+                # 堆中可能残留被续租/放回前的旧条目，以 _available 为准。
+                if self._available.get(task_id) != available_at:
+                    continue
+                lease = Lease(task_id, _new_token(worker_id), self._attempts[task_id] + 1, now + lease_seconds)
+                self._attempts[task_id] = lease.attempts
+                self._tokens[task_id] = lease.token
+                self._schedule(task_id, lease.lease_until)
+                return lease
+            return None
+
+    def heartbeat(self, lease: Lease, lease_seconds: float) -> bool:
+        with self._lock:
+            if self._tokens.get(lease.task_id) != lease.token:
+                return False
+            self._schedule(lease.task_id, self._clock() + lease_seconds)
+            return True
+
+    def ack(self, lease: Lease) -> bool:
+        with self._lock:
+            if self._tokens.get(lease.task_id) != lease.token:
+                return False
+            del self._tokens[lease.task_id], self._available[lease.task_id], self._attempts[lease.task_id]
+            return True
+
+    def release(self, lease: Lease, delay: float = 0.0) -> bool:
+        with self._lock:
+            if self._tokens.pop(lease.task_id, None) != lease.token:
+                return False
+            self._schedule(lease.task_id, self._clock() + delay)
+            return True
+
+    def depth(self) -> int:
+        with self._lock:
+            return len(self._available)
+
+    def is_queued(self, task_id: str) -> bool:
+        with self._lock:
+            return task_id in self._available
+
+
+_ENQUEUE_SQL = """
+INSERT INTO task_queue (task_id, available_at, enqueued_at) VALUES (?, ?, ?)
+ON CONFLICT (task_id) DO NOTHING
+"""
+
+# 单条 UPDATE ... RETURNING 在 SQLite 写锁下原子执行，多个 worker 进程不会领到同一行。
+_CLAIM_SQL = """
+UPDATE task_queue
+SET available_at = ?, attempts = attempts + 1, lease_owner = ?, lease_token = ?
+WHERE task_id = (
+    SELECT task_id FROM task_queue WHERE available_at <= ? ORDER BY available_at LIMIT 1
+)
+RETURNING task_id, attempts
+"""
+
+_HEARTBEAT_SQL = "UPDATE task_queue SET available_at = ? WHERE task_id = ? AND lease_token = ?"
+_ACK_SQL = "DELETE FROM task_queue WHERE task_id = ? AND lease_token = ?"
+_RELEASE_SQL = """
+UPDATE task_queue SET available_at = ?, lease_owner = NULL, lease_token = NULL
+WHERE task_id = ? AND lease_token = ?
+"""
+
+
+class SQLiteTaskQueue:
+    """与 listing_tasks 同库的持久化队列（task_queue 表），复用仓储的按线程连接。"""
+
+    def __init__(self, repo: SQLiteTaskRepository, clock: Callable[[], float] = time.time) -> None:
+        self.repo = repo
+        self._clock = clock
+
+    def enqueue(self, task_id: str, delay: float = 0.0) -> None:
+        now = self._clock()
+        with self.repo._connect() as conn:
+            conn.execute(_ENQUEUE_SQL, (task_id, now + delay, now))
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Lease | None:
+        now = self._clock()
+        token = _new_token(worker_id)
+        with self.repo._connect() as conn:
+            rows = conn.execute(_CLAIM_SQL, (now + lease_seconds, worker_id, token, now)).fetchall()
+        if not rows:
+            return None
+        task_id, attempts = rows[0]
+        return Lease(task_id, token, attempts, now + lease_seconds)
+
+    def heartbeat(self, lease: Lease, lease_seconds: float) -> bool:
+        with self.repo._connect() as conn:
+            return conn.execute(_HEARTBEAT_SQL, (self._clock() + lease_seconds, lease.task_id, lease.token)).rowcount == 1
+
+    def ack(self, lease: Lease) -> bool:
+        with self.repo._connect() as conn:
+            return conn.execute(_ACK_SQL, (lease.task_id, lease.token)).rowcount == 1
+
+    def release(self, lease: Lease, delay: float = 0.0) -> bool:
+        with self.repo._connect() as conn:
+            return conn.execute(_RELEASE_SQL, (self._clock() + delay, lease.task_id, lease.token)).rowcount == 1
+
+    def depth(self) -> int:
+        return self.repo._connect().execute("SELECT COUNT(*) FROM task_queue").fetchone()[0]
+
+    def is_queued(self, task_id: str) -> bool:
+        return self.repo._connect().execute("SELECT 1 FROM task_queue WHERE task_id = ?", (task_id,)).fetchone() is not None
+
+
+def _text(value: Any) -> str | None:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+class RedisTaskQueue:
+    """Redis 实现：ZSET 按可领取时间排序，租约为带 PX 过期的 lease 键（SET NX 保证只有一个 worker 领到）。
+
+    时间取自 Redis 服务器的 TIME，多台机器上的 worker 不受本机时钟偏差影响。
+    续租/确认先比对 token 再写入，两步之间不是原子的：极端情况下租约恰好过期并被他人领取时，
+    旧持有者可能多续一次租，但 ack 仍以 token 为准，不会删掉别人的租约。
+    """
+
+    def __init__(self, client: Any, prefix: str = "rednote:tasks", scan_size: int = 16) -> None:
+        self.client = client
+        self.scan_size = scan_size
+        self._ready = f"{prefix}:ready"
+        self._attempts = f"{prefix}:attempts"
+        self._lease_prefix = f"{prefix}:lease:"
+
+    def _now(self) -> float:
+        seconds, micros = self.client.time()
+        return seconds + micros / 1_000_000
+
+    def _lease_key(self, task_id: str) -> str:
+        return self._lease_prefix + task_id
+
+    def _holds(self, lease: Lease) -> bool:
+        return _text(self.client.get(self._lease_key(lease.task_id))) == lease.token
+
+    def enqueue(self, task_id: str, delay: float = 0.0) -> None:
+        self.client.zadd(self._ready, {task_id: self._now() + delay}, nx=True)
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Lease | None:
+        now = self._now()
+        lease_until = now + lease_seconds
+        for raw in self.client.zrangebyscore(self._ready, "-inf", now, start=0, num=self.scan_size):
+            task_id = _text(raw)
+            token = _new_token(worker_id)
+            if not self.client.set(self._lease_key(task_id), token, nx=True, px=int(lease_seconds * 1000)):
+                continue
+            # 领取与 ack 之间被他人确认删除时，ZADD XX 不会生效，撤回租约继续找下一个。
+            if not self.client.zadd(self._ready, {task_id: lease_until}, xx=True, ch=True):
+                self.client.delete(self._lease_key(task_id))
+                continue
+            attempts = int(self.client.hincrby(self._attempts, task_id, 1))
+            return Lease(task_id, token, attempts, lease_until)
+        return None
+
+    def heartbeat(self, lease: Lease, lease_seconds: float) -> bool:
+        if not self._holds(lease):
+            return False
+        if not self.client.pexpire(self._lease_key(lease.task_id), int(lease_seconds * 1000)):
+            return False
+        self.client.zadd(self._ready, {lease.task_id: self._now() + lease_seconds}, xx=True)
+        return True
+
+    def ack(self, lease: Lease) -> bool:
+        if not self._holds(lease):
+            return False
+        self.client.zrem(self._ready, lease.task_id)
+        self.client.hdel(self._attempts, lease.task_id)
+        self.client.delete(self._lease_key(lease.task_id))
+        return True
+
+    def release(self, lease: Lease, delay: float = 0.0) -> bool:
+        if not self._holds(lease):
+            return False
+        self.client.zadd(self._ready, {lease.task_id: self._now() + delay}, xx=True)
+        self.client.delete(self._lease_key(lease.task_id))
+        return True
+
+    def depth(self) -> int:
+        return int(self.client.zcard(self._ready))
+
+    def is_queued(self, task_id: str) -> bool:
+        return self.client.zscore(self._ready, task_id) is not None
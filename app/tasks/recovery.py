@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+from app.models.schemas import ListingTask, TaskStatus
+from app.tasks.base import TaskRepository
+from app.tasks.executor import ListingTaskExecutor
+from app.tasks.queue import TaskQueue
+from app.tasks.scheduling import queue_delay
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RecoveryReport:
+    scanned: int = 0
+    requeued: list[str] = field(default_factory=list)
+    resumed: list[str] = field(default_factory=list)
+    failed: list[str] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)
+
+    def model_dump(self) -> dict:
+        return {
+            "scanned": self.scanned,
+            "requeued": self.requeued,
+            "resumed": self.resumed,
+            "failed": self.failed,
+            "skipped": self.skipped,
+        }
+
+
+class TaskRecovery:
+    """回收进程崩溃/重启后遗留在 running 状态的孤儿任务。
+
+    按 (status, updated_at, task_id) 索引取出 updated_at 超过 stale_after_seconds 未更新的 running 任务：
+    仍在队列中（等待领取或租约中）的交给队列的可见性超时处理；其余先以比较并交换方式刷新 updated_at
+    认领，避免多个巡检者重复处理，再按最后持久化的步骤决定续跑位置——有队列时重新入队，否则就地 resume。
+    同一任务被回收超过 max_recoveries 次的，标记为失败等待人工处理。
+    """
+
+    def __init__(
+        self,
+        repo: TaskRepository,
+        executor: ListingTaskExecutor,
+        queue: TaskQueue | None = None,
+        stale_after_seconds: float = 900.0,
+        max_recoveries: int = 3,
+        batch_size: int = 200,
+        now: Callable[[], datetime] | None = None,
+    ) -> None:
+        self.repo = repo
+        self.executor = executor
+        self.queue = queue
+        self.stale_after_seconds = stale_after_seconds
+        self.max_recoveries = max_recoveries
+        self.batch_size = batch_size
+        self._now = now or (lambda: datetime.now(timezone.utc))
+
+    def run(self) -> RecoveryReport:
+        now = self._now()
+        cutoff = (now - timedelta(seconds=self.stale_after_seconds)).isoformat()
+        report = RecoveryReport()
+
+        for task_id in self.repo.list_expired_task_ids(TaskStatus.running, cutoff, self.batch_size):
+            report.scanned += 1
+            if self.queue is not None and self.queue.is_queued(task_id):
+                report.skipped.append(task_id)
+                continue
+            task = self.repo.get_task(task_id)
+            if task is None or not self.repo.touch_task(task_id, TaskStatus.running, task.updated_at, now.isoformat()):
+                report.skipped.append(task_id)
+                continue
+            task.updated_at = now.isoformat()
+            self._recover(task, report)
+        return report
+
+    def _recover(self, task: ListingTask, report: RecoveryReport) -> None:
+        steps = self.repo.list_steps(task.task_id)
+        done = {step["step_name"] for step in steps if step["status"] == "done"}
+        pending = next((name for name in self.executor.registry.names if name not in done), None)
+        last = steps[-1] if steps else None
+        recoveries = int(task.output.get("recoveries", 0))
+        payload = {
+            "last_step": last["step_name"] if last else None,
+            "last_status": last["status"] if last else None,
+            "resume_from": pending,
+            "recoveries": recoveries,
+        }
+
+        if recoveries >= self.max_recoveries:
+            error = f"任务已被中断回收 {recoveries} 次，停止自动续跑"
+            task.status = TaskStatus.failed
+            task.output["error"] = error
+            with self.repo.transaction() as uow:
+                uow.log_step(task.task_id, "task_recovery", False, "孤儿任务标记失败", payload, task.updated_at)
+                if pending is not None:
+                    uow.save_step(task_id=task.task_id, step_name=pending, status="failed", updated_at=task.updated_at, error=error)
+                uow.save_task(task)
+            report.failed.append(task.task_id)
+            return
+
+        task.output["recoveries"] = recoveries + 1
+        with self.repo.transaction() as uow:
+            uow.log_step(task.task_id, "task_recovery", True, "孤儿任务重新调度", payload, task.updated_at)
+            uow.save_task(task)
+
+        if self.queue is not None:
+            self.queue.enqueue(task.task_id, delay=queue_delay(task.priority))
+            report.requeued.append(task.task_id)
+            return
+        try:
+            self.executor.resume(task.task_id)
+        except Exception:
+            logger.exception("续跑孤儿任务失败 task_id=%s", task.task_id)
+        report.resumed.append(task.task_id)
@@ -1,86 +1,205 @@
 from __future__ import annotations
 
-import json
 import sqlite3
+import threading
+import weakref
+from collections.abc import Iterator
+from contextlib import contextmanager
+from itertools import groupby
 from pathlib import Path
+from typing import Any
 
-from app.models.schemas import ListingTask, TaskStatus
+from app.models import serializer
+from app.models.schemas import ListingTask, TaskPriority, TaskStatus
+from app.tasks.base import (
+    StepTiming,
+    TaskPage,
+    check_page_limit,
+    decode_cursor,
+    encode_cursor,
+    iter_task_pages,
+    step_dict,
+    summary_dict,
+)
+from app.tasks.blobs import BLOB_REF_COLUMNS, BlobRow, BlobStore
+from app.tasks.migrations import apply_migrations
 
+# SQL 保持为模块级常量：sqlite3 按语句文本缓存预编译语句，同一连接上重复调用不会重新 prepare。
+_INSERT_TASK_SQL = """
+INSERT OR REPLACE INTO listing_tasks
+(task_id, product_id, status, listing_pack_version, input_snapshot, channel, created_at, updated_at, output,
+ priority, fair_key)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
 
-class TaskRepository:
-    def __init__(self, db_path: str = "data/autopilot.db") -> None:
-        self.db_path = Path(db_path)
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self._init_db()
+_INSERT_STEP_SQL = """
+INSERT INTO listing_task_steps
+(task_id, step_name, status, retry_count, artifact_path, error, updated_at,
+ started_at, finished_at, duration_ms, device_id)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
 
-    def _connect(self) -> sqlite3.Connection:
-        return sqlite3.connect(self.db_path)
+_INSERT_LOG_SQL = """
+INSERT INTO task_logs (task_id, step_name, success, message, payload, created_at)
+VALUES (?, ?, ?, ?, ?, ?)
+"""
 
-    def _init_db(self) -> None:
-        with self._connect() as conn:
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS listing_tasks (
-                    task_id TEXT PRIMARY KEY,
-                    product_id TEXT NOT NULL,
-                    status TEXT NOT NULL,
-                    listing_pack_version TEXT NOT NULL,
-                    input_snapshot TEXT NOT NULL,
-                    channel TEXT NOT NULL,
-                    created_at TEXT NOT NULL,
-                    updated_at TEXT NOT NULL,
-                    output TEXT NOT NULL
-                )
-                """
-            )
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS task_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    task_id TEXT NOT NULL,
-                    step_name TEXT NOT NULL,
-                    success INTEGER NOT NULL,
-                    message TEXT NOT NULL,
-                    payload TEXT NOT NULL,
-                    created_at TEXT NOT NULL
-                )
-                """
-            )
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS listing_task_steps (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    task_id TEXT NOT NULL,
-                    step_name TEXT NOT NULL,
-                    status TEXT NOT NULL,
-                    retry_count INTEGER NOT NULL DEFAULT 0,
-                    artifact_path TEXT,
-                    error TEXT,
-                    updated_at TEXT NOT NULL
-                )
-                """
-            )
+_SELECT_STEPS_SQL = """
+SELECT step_name, status, retry_count, artifact_path, error, updated_at,
+       started_at, finished_at, duration_ms, device_id
+FROM listing_task_steps
+WHERE task_id = ?
+ORDER BY id ASC
+"""
+
+_SELECT_STEPS_MANY_SQL = """
+SELECT task_id, step_name, status, retry_count, artifact_path, error, updated_at,
+       started_at, finished_at, duration_ms, device_id
+FROM listing_task_steps
+WHERE task_id IN ({placeholders})
+ORDER BY task_id ASC, id ASC
+"""
+
+_SELECT_LOGS_SQL = """
+SELECT step_name, success, message, payload, created_at
+FROM task_logs
+WHERE task_id = ?
+ORDER BY id ASC
+"""
+
+_SELECT_LOGS_MANY_SQL = """
+SELECT task_id, step_name, success, message, payload, created_at
+FROM task_logs
+WHERE task_id IN ({placeholders})
+ORDER BY task_id ASC, id ASC
+"""
+
+_DELETE_ORPHAN_LOGS_SQL = """
+DELETE FROM task_logs
+WHERE created_at < ? AND NOT EXISTS (SELECT 1 FROM listing_tasks AS t WHERE t.task_id = task_logs.task_id)
+"""
+
+_DELETE_ORPHAN_STEPS_SQL = """
+DELETE FROM listing_task_steps
+WHERE updated_at < ? AND NOT EXISTS (SELECT 1 FROM listing_tasks AS t WHERE t.task_id = listing_task_steps.task_id)
+"""
+
+_SELECT_TASK_SQL = """
+SELECT task_id, product_id, status, listing_pack_version, input_snapshot, channel,
+       created_at, updated_at, output, priority, fair_key
+FROM listing_tasks WHERE task_id = ?
+"""
+
+# 任务与步骤一次 LEFT JOIN 读出；summary 投影用 NULL 占位，跳过大 JSON 列的读取与解码。
+_DETAIL_SQL_TEMPLATE = """
+SELECT t.task_id, t.product_id, t.status, t.listing_pack_version, {input_snapshot}, t.channel,
+       t.created_at, t.updated_at, {output}, t.priority, t.fair_key,
+       s.step_name, s.status, s.retry_count, s.artifact_path, s.error, s.updated_at,
+       s.started_at, s.finished_at, s.duration_ms, s.device_id
+FROM listing_tasks AS t
+LEFT JOIN listing_task_steps AS s ON s.task_id = t.task_id
+WHERE t.task_id = ?
+ORDER BY s.id ASC
+"""
+_SELECT_TASK_DETAIL_SQL = _DETAIL_SQL_TEMPLATE.format(input_snapshot="t.input_snapshot", output="t.output")
+_SELECT_TASK_SUMMARY_SQL = _DETAIL_SQL_TEMPLATE.format(input_snapshot="NULL", output="NULL")
+
+_SELECT_TASKS_PREFIX = """
+SELECT task_id, product_id, status, listing_pack_version, input_snapshot, channel,
+       created_at, updated_at, output, priority, fair_key
+FROM listing_tasks
+"""
+
+_SELECT_EXPIRED_TASK_IDS_SQL = """
+SELECT task_id FROM listing_tasks
+WHERE status = ? AND updated_at < ?
+ORDER BY updated_at ASC, task_id ASC
+LIMIT ?
+"""
+
+_TOUCH_TASK_SQL = """
+UPDATE listing_tasks SET updated_at = ?
+WHERE task_id = ? AND status = ? AND updated_at = ?
+"""
+
+_SELECT_STEP_DURATIONS_SQL = """
+SELECT s.step_name, t.channel, s.device_id, s.duration_ms
+FROM listing_task_steps AS s
+JOIN listing_tasks AS t ON t.task_id = s.task_id
+WHERE s.finished_at >= ? AND s.finished_at < ? AND s.duration_ms IS NOT NULL
+"""
+
+_INSERT_BLOB_SQL = """
+INSERT OR IGNORE INTO task_blobs (hash, codec, raw_size, data)
+VALUES (?, ?, ?, ?)
+"""
+
+_SELECT_BLOB_SQL = "SELECT codec, data FROM task_blobs WHERE hash = ?"
+
+
+def _step_params(
+    task_id: str,
+    step_name: str,
+    status: str,
+    updated_at: str,
+    retry_count: int,
+    artifact_path: str | None,
+    error: str | None,
+    timing: StepTiming | None,
+    device_id: str | None,
+) -> tuple[Any, ...]:
+    started_at, finished_at, duration_ms = (
+        (timing.started_at, timing.finished_at, timing.duration_ms) if timing is not None else (None, None, None)
+    )
+    return (task_id, step_name, status, retry_count, artifact_path, error, updated_at, started_at, finished_at, duration_ms, device_id)
+
+
+def _blob_ref_texts(conn: sqlite3.Connection) -> Iterator[str]:
+    for table, column in BLOB_REF_COLUMNS:
+        for (text,) in conn.execute(f"SELECT {column} FROM {table} WHERE {column} LIKE '%$blob%'"):
+            yield text
+
+
+class _ConnectionHolder:
+    """线程本地连接的持有者；线程退出时随 threading.local 一起回收并关闭连接。"""
+
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+
+
+class SQLiteUnitOfWork:
+    """缓冲同一逻辑步骤内的日志、步骤与任务写入，由 SQLiteTaskRepository.transaction() 一次提交。
+
+    写入参数在调用时即序列化，之后再修改 task 不影响已缓冲的内容。
+    """
+
+    def __init__(self, repo: SQLiteTaskRepository) -> None:
+        self._repo = repo
+        self._pending: list[tuple[str, tuple[Any, ...]]] = []
+        self._blobs: list[BlobRow] = []
 
     def save_task(self, task: ListingTask) -> None:
-        with self._connect() as conn:
-            conn.execute(
-                """
-                INSERT OR REPLACE INTO listing_tasks
-                (task_id, product_id, status, listing_pack_version, input_snapshot, channel, created_at, updated_at, output)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
+        encode = self._repo._encode_json
+        self._pending.append(
+            (
+                _INSERT_TASK_SQL,
                 (
                     task.task_id,
                     task.product_id,
                     task.status.value,
                     task.listing_pack_version,
-                    json.dumps(task.input_snapshot, ensure_ascii=False),
+                    encode(task.input_snapshot, self._blobs),
                     task.channel,
                     task.created_at,
                     task.updated_at,
-                    json.dumps(task.output, ensure_ascii=False),
+                    encode(task.output, self._blobs),
+                    task.priority.value,
+                    task.fair_key,
                 ),
             )
+        )
 
     def save_step(
         self,
@@ -91,70 +210,339 @@ class TaskRepository:
         retry_count: int = 0,
         artifact_path: str | None = None,
         error: str | None = None,
+        timing: StepTiming | None = None,
+        device_id: str | None = None,
     ) -> None:
-        with self._connect() as conn:
-            conn.execute(
-                """
-                INSERT INTO listing_task_steps
-                (task_id, step_name, status, retry_count, artifact_path, error, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
-                (task_id, step_name, status, retry_count, artifact_path, error, updated_at),
-            )
-
-    def list_steps(self, task_id: str) -> list[dict]:
-        with self._connect() as conn:
-            rows = conn.execute(
-                """
-                SELECT step_name, status, retry_count, artifact_path, error, updated_at
-                FROM listing_task_steps
-                WHERE task_id = ?
-                ORDER BY id ASC
-                """,
-                (task_id,),
-            ).fetchall()
-        return [
-            {
-                "step_name": row[0],
-                "status": row[1],
-                "retry_count": row[2],
-                "artifact_path": row[3],
-                "error": row[4],
-                "updated_at": row[5],
-            }
-            for row in rows
-        ]
+        self._pending.append(
+            (_INSERT_STEP_SQL, _step_params(task_id, step_name, status, updated_at, retry_count, artifact_path, error, timing, device_id))
+        )
 
     def log_step(self, task_id: str, step_name: str, success: bool, message: str, payload: dict, created_at: str) -> None:
-        with self._connect() as conn:
-            conn.execute(
-                """
-                INSERT INTO task_logs (task_id, step_name, success, message, payload, created_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-                """,
-                (task_id, step_name, int(success), message, json.dumps(payload, ensure_ascii=False), created_at),
+        self._pending.append(
+            (
+                _INSERT_LOG_SQL,
+                (task_id, step_name, int(success), message, self._repo._encode_json(payload, self._blobs), created_at),
             )
+        )
 
-    def get_task(self, task_id: str) -> ListingTask | None:
-        with self._connect() as conn:
-            row = conn.execute(
-                """
-                SELECT task_id, product_id, status, listing_pack_version, input_snapshot, channel,
-                       created_at, updated_at, output
-                FROM listing_tasks WHERE task_id = ?
-                """,
-                (task_id,),
-            ).fetchone()
-        if row is None:
-            return None
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        with self._repo._connect() as conn:
+            if self._blobs:
+                conn.executemany(_INSERT_BLOB_SQL, [(b.hash, b.codec, b.raw_size, b.data) for b in self._blobs])
+            # 相邻的同类语句（如一批步骤行）合并为一次 executemany。
+            for sql, group in groupby(self._pending, key=lambda op: op[0]):
+                conn.executemany(sql, [params for _, params in group])
+        self.discard()
+
+    def discard(self) -> None:
+        self._pending.clear()
+        self._blobs.clear()
+
+
+class SQLiteTaskRepository:
+    """基于标准库 sqlite3 的 TaskRepository 实现：每个线程复用一条 WAL 模式的长连接。
+
+    blob_threshold_bytes 为 None 时关闭 BlobStore 去重，JSON 列按原文存储。
+    """
+
+    def __init__(
+        self,
+        db_path: str = "data/autopilot.db",
+        busy_timeout_ms: int = 5000,
+        statement_cache_size: int = 128,
+        blob_threshold_bytes: int | None = 512,
+    ) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.busy_timeout_ms = busy_timeout_ms
+        self.statement_cache_size = statement_cache_size
+        self.blobs = BlobStore(threshold_bytes=blob_threshold_bytes) if blob_threshold_bytes is not None else None
+        self._local = threading.local()
+        self._holders: weakref.WeakSet[_ConnectionHolder] = weakref.WeakSet()
+        self._holders_lock = threading.Lock()
+        self._init_db()
+
+    def _open_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=self.statement_cache_size,
+        )
+        # 仅对新建库生效（已有表的库需 VACUUM 才能切换），使保留策略删除后可以增量回收空间。
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL 下 NORMAL 只在 checkpoint 时 fsync，掉电最多丢最后几个事务，但不会损坏库文件。
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        holder: _ConnectionHolder | None = getattr(self._local, "holder", None)
+        if holder is None:
+            conn = self._open_connection()
+            holder = _ConnectionHolder(conn)
+            weakref.finalize(holder, conn.close)
+            self._local.holder = holder
+            with self._holders_lock:
+                self._holders.add(holder)
+        return holder.conn
+
+    def close(self) -> None:
+        """关闭所有线程持有的连接；之后的调用会按需重新建连。"""
+        with self._holders_lock:
+            holders = list(self._holders)
+            self._holders.clear()
+        for holder in holders:
+            holder.conn.close()
+        self._local = threading.local()
+
+    def _init_db(self) -> None:
+        apply_migrations(self._connect())
+
+    def _encode_json(self, value: Any, blobs: list[BlobRow]) -> str:
+        if self.blobs is None:
+            return serializer.dumps(value)
+        text, rows = self.blobs.encode(value)
+        blobs.extend(rows)
+        return text
+
+    def _decode_json(self, conn: sqlite3.Connection, text: str) -> Any:
+        if self.blobs is None:
+            return serializer.loads(text)
+        return self.blobs.decode(text, lambda digest: conn.execute(_SELECT_BLOB_SQL, (digest,)).fetchone())
+
+    def _row_to_task(self, conn: sqlite3.Connection, row: tuple[Any, ...]) -> ListingTask:
         return ListingTask(
             task_id=row[0],
             product_id=row[1],
             status=TaskStatus(row[2]),
             listing_pack_version=row[3],
-            input_snapshot=json.loads(row[4]),
+            input_snapshot=self._decode_json(conn, row[4]),
             channel=row[5],
             created_at=row[6],
             updated_at=row[7],
-            output=json.loads(row[8]),
+            output=self._decode_json(conn, row[8]),
+            priority=TaskPriority(row[9]),
+            fair_key=row[10],
         )
+
+    @contextmanager
+    def transaction(self) -> Iterator[SQLiteUnitOfWork]:
+        """打开一个工作单元：块内写入先缓冲，正常退出时单事务提交，异常时整体丢弃。"""
+        uow = SQLiteUnitOfWork(self)
+        try:
+            yield uow
+        except BaseException:
+            uow.discard()
+            raise
+        uow.flush()
+
+    def save_task(self, task: ListingTask) -> None:
+        with self.transaction() as uow:
+            uow.save_task(task)
+
+    def save_step(
+        self,
+        task_id: str,
+        step_name: str,
+        status: str,
+        updated_at: str,
+        retry_count: int = 0,
+        artifact_path: str | None = None,
+        error: str | None = None,
+        timing: StepTiming | None = None,
+        device_id: str | None = None,
+    ) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                _INSERT_STEP_SQL,
+                _step_params(task_id, step_name, status, updated_at, retry_count, artifact_path, error, timing, device_id),
+            )
+
+    def list_steps(self, task_id: str) -> list[dict]:
+        return [step_dict(row) for row in self._connect().execute(_SELECT_STEPS_SQL, (task_id,))]
+
+    def log_step(self, task_id: str, step_name: str, success: bool, message: str, payload: dict, created_at: str) -> None:
+        with self.transaction() as uow:
+            uow.log_step(task_id, step_name, success, message, payload, created_at)
+
+    def list_logs(self, task_id: str) -> list[dict]:
+        conn = self._connect()
+        rows = conn.execute(_SELECT_LOGS_SQL, (task_id,)).fetchall()
+        return [self._log_dict(conn, row) for row in rows]
+
+    def list_logs_many(self, task_ids: list[str]) -> dict[str, list[dict]]:
+        if not task_ids:
+            return {}
+        placeholders = ",".join("?" * len(task_ids))
+        conn = self._connect()
+        rows = conn.execute(_SELECT_LOGS_MANY_SQL.format(placeholders=placeholders), task_ids).fetchall()
+        return {
+            task_id: [self._log_dict(conn, row[1:]) for row in group] for task_id, group in groupby(rows, key=lambda row: row[0])
+        }
+
+    def _log_dict(self, conn: sqlite3.Connection, row: tuple[Any, ...]) -> dict:
+        return {
+            "step_name": row[0],
+            "success": bool(row[1]),
+            "message": row[2],
+            "payload": self._decode_json(conn, row[3]),
+            "created_at": row[4],
+        }
+
+    def get_task(self, task_id: str) -> ListingTask | None:
+        conn = self._connect()
+        row = conn.execute(_SELECT_TASK_SQL, (task_id,)).fetchone()
+        if row is None:
+            return None
+        return self._row_to_task(conn, row)
+
+    def get_tasks(self, task_ids: list[str]) -> dict[str, ListingTask]:
+        if not task_ids:
+            return {}
+        placeholders = ",".join("?" * len(task_ids))
+        conn = self._connect()
+        rows = conn.execute(f"{_SELECT_TASKS_PREFIX} WHERE task_id IN ({placeholders})", task_ids).fetchall()
+        return {row[0]: self._row_to_task(conn, row) for row in rows}
+
+    def list_steps_many(self, task_ids: list[str]) -> dict[str, list[dict]]:
+        if not task_ids:
+            return {}
+        placeholders = ",".join("?" * len(task_ids))
+        rows = self._connect().execute(_SELECT_STEPS_MANY_SQL.format(placeholders=placeholders), task_ids)
+        return {task_id: [step_dict(row[1:]) for row in group] for task_id, group in groupby(rows, key=lambda row: row[0])}
+
+    def get_task_detail(self, task_id: str, include_payload: bool = True) -> dict[str, Any] | None:
+        """一次查询返回 {"task": ..., "steps": [...]}。
+
+        include_payload=False 时任务字典不含 input_snapshot/output，适合高频轮询状态。
+        """
+        sql = _SELECT_TASK_DETAIL_SQL if include_payload else _SELECT_TASK_SUMMARY_SQL
+        conn = self._connect()
+        rows = conn.execute(sql, (task_id,)).fetchall()
+        if not rows:
+            return None
+
+        head = rows[0]
+        if include_payload:
+            task = self._row_to_task(conn, head[:11]).model_dump()
+        else:
+            task = summary_dict(head)
+        steps = [step_dict(row[11:]) for row in rows if row[11] is not None]
+        return {"task": task, "steps": steps}
+
+    def list_expired_task_ids(self, status: TaskStatus, before: str, limit: int) -> list[str]:
+        """按 (status, updated_at, task_id) 索引取出 updated_at 早于 before 的任务 id。"""
+        rows = self._connect().execute(_SELECT_EXPIRED_TASK_IDS_SQL, (TaskStatus(status).value, before, limit))
+        return [row[0] for row in rows]
+
+    def iter_step_durations(self, since: str, until: str) -> Iterator[tuple[str, str, str | None, float]]:
+        """按 finished_at 索引范围扫描，逐行产出而不一次性读入内存。"""
+        yield from self._connect().execute(_SELECT_STEP_DURATIONS_SQL, (since, until))
+
+    def touch_task(self, task_id: str, status: TaskStatus, expected_updated_at: str, updated_at: str) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute(_TOUCH_TASK_SQL, (updated_at, task_id, TaskStatus(status).value, expected_updated_at))
+            return cursor.rowcount == 1
+
+    def delete_tasks(self, task_ids: list[str]) -> dict[str, int]:
+        """在一个事务内删除任务及其步骤、日志，返回各表删除行数。"""
+        if not task_ids:
+            return {"tasks": 0, "steps": 0, "logs": 0}
+        placeholders = ",".join("?" * len(task_ids))
+        with self._connect() as conn:
+            logs = conn.execute(f"DELETE FROM task_logs WHERE task_id IN ({placeholders})", task_ids).rowcount
+            steps = conn.execute(f"DELETE FROM listing_task_steps WHERE task_id IN ({placeholders})", task_ids).rowcount
+            tasks = conn.execute(f"DELETE FROM listing_tasks WHERE task_id IN ({placeholders})", task_ids).rowcount
+        return {"tasks": tasks, "steps": steps, "logs": logs}
+
+    def delete_orphans(self, before: str) -> dict[str, int]:
+        with self._connect() as conn:
+            logs = conn.execute(_DELETE_ORPHAN_LOGS_SQL, (before,)).rowcount
+            steps = conn.execute(_DELETE_ORPHAN_STEPS_SQL, (before,)).rowcount
+        return {"steps": steps, "logs": logs}
+
+    def list_tasks(
+        self,
+        status: TaskStatus | None = None,
+        channel: str | None = None,
+        after: str | None = None,
+        limit: int = 100,
+    ) -> TaskPage:
+        """按 (updated_at, task_id) 升序做 keyset 分页，不使用 OFFSET。
+
+        有 status 时走 (status, updated_at, task_id) 索引，否则走 (updated_at, task_id) 索引；
+        channel 作为索引扫描上的附加过滤条件。
+        """
+        check_page_limit(limit)
+
+        clauses: list[str] = []
+        params: list[Any] = []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(TaskStatus(status).value)
+        if after is not None:
+            clauses.append("(updated_at, task_id) > (?, ?)")
+            params.extend(decode_cursor(after))
+        if channel is not None:
+            clauses.append("channel = ?")
+            params.append(channel)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"{_SELECT_TASKS_PREFIX}{where}\nORDER BY updated_at ASC, task_id ASC\nLIMIT ?"
+        params.append(limit + 1)
+
+        items: list[ListingTask] = []
+        has_more = False
+        conn = self._connect()
+        for row in conn.execute(sql, params).fetchmany(limit + 1):
+            if len(items) == limit:
+                has_more = True
+                break
+            items.append(self._row_to_task(conn, row))
+        next_after = encode_cursor(items[-1].updated_at, items[-1].task_id) if has_more else None
+        return TaskPage(items=items, next_after=next_after)
+
+    def iter_tasks(
+        self,
+        status: TaskStatus | None = None,
+        channel: str | None = None,
+        page_size: int = 100,
+    ) -> Iterator[ListingTask]:
+        """逐页遍历全部匹配任务，内存中同时最多只保留一页。"""
+        return iter_task_pages(self, status, channel, page_size)
+
+    def compact(self, vacuum_pages: int = 2000) -> int:
+        conn = self._connect()
+        deleted = self._collect_blob_garbage(conn, self.blobs) if self.blobs is not None else 0
+        conn.execute(f"PRAGMA incremental_vacuum({int(vacuum_pages)})").fetchall()
+        return deleted
+
+    @staticmethod
+    def _collect_blob_garbage(conn: sqlite3.Connection, blobs: BlobStore, batch_size: int = 500) -> int:
+        """标记-清除未被任何行引用的 blob，返回删除数量。
+
+        标记阶段（扫描引用列、解压存活 blob）不持写锁，写入方不受影响；随后 BEGIN IMMEDIATE 取得写锁，
+        复查候选是否被标记期间新写入的行或 blob 引用，只删除仍未被引用的候选，不会留下悬空引用。
+        """
+        fetch = lambda digest: conn.execute(_SELECT_BLOB_SQL, (digest,)).fetchone()  # noqa: E731
+        known = {digest for (digest,) in conn.execute("SELECT hash FROM task_blobs")}
+        candidates = known - blobs.live_refs(_blob_ref_texts(conn), fetch)
+        if not candidates:
+            return 0
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current = {digest for (digest,) in conn.execute("SELECT hash FROM task_blobs")}
+            keep = blobs.rereferenced(candidates, _blob_ref_texts(conn), current - known, fetch)
+            dead = sorted((candidates & current) - keep)
+            for start in range(0, len(dead), batch_size):
+                conn.executemany("DELETE FROM task_blobs WHERE hash = ?", [(d,) for d in dead[start : start + batch_size]])
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        blobs.forget(dead)
+        return len(dead)
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import gzip
+import os
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+from app.models import serializer
+from app.models.schemas import TaskStatus
+from app.tasks.base import TaskRepository
+
+TERMINAL_STATUSES: tuple[TaskStatus, ...] = (TaskStatus.done, TaskStatus.failed)
+
+
+@dataclass
+class RetentionReport:
+    archived_tasks: int = 0
+    deleted_steps: int = 0
+    deleted_logs: int = 0
+    deleted_blobs: int = 0
+    orphan_steps: int = 0
+    orphan_logs: int = 0
+    segments: list[str] = field(default_factory=list)
+
+    def model_dump(self) -> dict:
+        return {
+            "archived_tasks": self.archived_tasks,
+            "deleted_steps": self.deleted_steps,
+            "deleted_logs": self.deleted_logs,
+            "deleted_blobs": self.deleted_blobs,
+            "orphan_steps": self.orphan_steps,
+            "orphan_logs": self.orphan_logs,
+            "segments": self.segments,
+        }
+
+
+class TaskRetention:
+    """把超期的终态任务归档为按日期分区的 gzip JSONL 段文件，再分批从热表删除。
+
+    每批先写归档并 fsync，再在一个事务内删除该批任务的日志、步骤与任务行，
+    中途崩溃最多导致同一任务被重复归档，不会丢数据。每批的任务、步骤与日志各用一次 IN 查询读取。
+    最后清扫所属任务已不存在、且早于截止时间的步骤与日志行（如任务行被单独删除后残留的记录）。
+    """
+
+    def __init__(
+        self,
+        repo: TaskRepository,
+        archive_dir: str = "data/archive",
+        max_age_days: int = 30,
+        batch_size: int = 500,
+        vacuum_pages: int = 2000,
+        now: Callable[[], datetime] | None = None,
+    ) -> None:
+        self.repo = repo
+        self.archive_dir = Path(archive_dir)
+        self.max_age_days = max_age_days
+        self.batch_size = batch_size
+        self.vacuum_pages = vacuum_pages
+        self._now = now or (lambda: datetime.now(timezone.utc))
+
+    def run(self) -> RetentionReport:
+        cutoff = (self._now() - timedelta(days=self.max_age_days)).isoformat()
+        run_stamp = self._now().strftime("%Y%m%dT%H%M%S")
+        report = RetentionReport()
+
+        for status in TERMINAL_STATUSES:
+            while task_ids := self.repo.list_expired_task_ids(status, cutoff, self.batch_size):
+                self._archive_batch(task_ids, run_stamp, report)
+                deleted = self.repo.delete_tasks(task_ids)
+                report.archived_tasks += deleted["tasks"]
+                report.deleted_steps += deleted["steps"]
+                report.deleted_logs += deleted["logs"]
+
+        orphans = self.repo.delete_orphans(cutoff)
+        report.orphan_steps, report.orphan_logs = orphans["steps"], orphans["logs"]
+        if report.archived_tasks or report.orphan_logs:
+            report.deleted_blobs = self.repo.compact(self.vacuum_pages)
+        return report
+
+    def _archive_batch(self, task_ids: list[str], run_stamp: str, report: RetentionReport) -> None:
+        tasks = self.repo.get_tasks(task_ids)
+        steps = self.repo.list_steps_many(task_ids)
+        logs = self.repo.list_logs_many(task_ids)
+        by_day: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        for task_id in task_ids:
+            task = tasks.get(task_id)
+            if task is None:
+                continue
+            detail = {"task": task.model_dump(), "steps": steps.get(task_id, []), "logs": logs.get(task_id, [])}
+            by_day[task.updated_at[:10]].append(detail)
+
+        for day, records in sorted(by_day.items()):
+            segment = self.archive_dir / day / f"segment-{run_stamp}.jsonl.gz"
+            segment.parent.mkdir(parents=True, exist_ok=True)
+            # 追加为新的 gzip member；gzip.open 读取时会自动拼接多个 member。
+            with segment.open("ab") as raw:
+                with gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+                    for record in records:
+                        gz.write(serializer.dumps_bytes(record) + b"\n")
+                raw.flush()
+                os.fsync(raw.fileno())
+            if str(segment) not in report.segments:
+                report.segments.append(str(segment))
+
+
+def read_segment(path: str | Path) -> list[dict[str, Any]]:
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        return [serializer.loads(line) for line in fh if line.strip()]
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import random
+import subprocess
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+# 设备/网络类的瞬时故障；业务异常（ValueError 等）重试也不会成功，默认不在其中。
+DEFAULT_RETRYABLE: tuple[type[BaseException], ...] = (TimeoutError, ConnectionError, subprocess.TimeoutExpired)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """单个步骤的重试策略：指数退避 + 抖动，只重试 retry_on 中的异常类型。
+
+    第 n 次重试前等待 min(max_delay, base_delay * multiplier ** (n - 1))，
+    其中 jitter 比例的部分随机化，避免一批任务在同一时刻集中重试。
+    """
+
+    max_attempts: int = 3
+    base_delay: float = 2.0
+    max_delay: float = 30.0
+    multiplier: float = 2.0
+    jitter: float = 0.5
+    retry_on: tuple[type[BaseException], ...] = DEFAULT_RETRYABLE
+
+    def __post_init__(self) -> None:
+        if self.max_attempts < 1:
+            raise ValueError(f"max_attempts 需 >= 1，当前为 {self.max_attempts}")
+        if not 0 <= self.jitter <= 1:
+            raise ValueError(f"jitter 需在 0~1 之间，当前为 {self.jitter}")
+
+    def should_retry(self, exc: BaseException, attempt: int) -> bool:
+        """attempt 为已失败的尝试次数（从 1 开始）。"""
+        return attempt < self.max_attempts and isinstance(exc, self.retry_on)
+
+    def delay(self, attempt: int, rng: random.Random | None = None) -> float:
+        backoff = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        spread = backoff * self.jitter
+        return backoff - spread + (rng or random).uniform(0, spread)
+
+
+class CircuitOpenError(RuntimeError):
+    """通道熔断中，调用被直接拒绝。"""
+
+
+class CircuitBreaker:
+    """按通道的熔断器：连续失败 failure_threshold 次后打开，reset_timeout 秒内的调用直接失败；
+    超时后放行一次探测调用（半开），成功则关闭，失败则重新计时。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._clock() - self._opened_at >= self.reset_timeout:
+                return "half_open"
+            return "open"
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self.reset_timeout - (self._clock() - self._opened_at)
+            if remaining > 0 or self._probing:
+                raise CircuitOpenError(
+                    f"通道 {self.name} 熔断中（连续失败 {self._failures} 次），约 {max(remaining, 0):.0f}s 后重试"
+                )
+            self._probing = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+            self._probing = False
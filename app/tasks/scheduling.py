@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.analytics.latency import QuantileSketch
+from app.models.schemas import TaskPriority
+
+# 各类都有任务排队时，urgent:normal:bulk 获得执行机会的比例约为 8:4:1。
+DEFAULT_PRIORITY_WEIGHTS: dict[TaskPriority, float] = {
+    TaskPriority.urgent: 8.0,
+    TaskPriority.normal: 4.0,
+    TaskPriority.bulk: 1.0,
+}
+
+# 队列模式下按类提前任务的可领取时间（秒）。worker 按 available_at 领取，urgent 会排在最近 10 分钟内入队的
+# bulk 之前；更早入队的任务照常先被领取——等待时间本身就是老化，低优先级任务不会被饿死。
+QUEUE_HEAD_START_SECONDS: dict[TaskPriority, float] = {
+    TaskPriority.urgent: 600.0,
+    TaskPriority.normal: 60.0,
+    TaskPriority.bulk: 0.0,
+}
+
+
+def queue_delay(priority: TaskPriority) -> float:
+    """入队时传给 TaskQueue.enqueue 的 delay（负数表示提前可领取）。"""
+    return -QUEUE_HEAD_START_SECONDS[priority]
+
+
+@dataclass(eq=False)
+class _Ticket:
+    priority: TaskPriority
+    fair_key: str
+    enqueued_at: float
+    granted: threading.Event = field(default_factory=threading.Event)
+
+
+@dataclass
+class _ClassStats:
+    running: int = 0
+    granted: int = 0
+    aged: int = 0
+    wait_ms: QuantileSketch = field(default_factory=QuantileSketch)
+
+
+class FairShareScheduler:
+    """按优先级类别与店铺/类目分组做加权公平排队（WFQ）的执行准入。
+
+    同时执行的任务不超过 slots 个；有空位时分两级挑选下一个等待者：先在有任务排队的优先级类别中
+    按权重选（start-time fair queuing，每次放行该类的虚拟时间前进 1/weight），再在该类内的各
+    fair_key 之间轮流选，同一 fair_key 内先到先得。因此一次导入 2000 个 bulk 任务时，新来的 urgent
+    任务在下一个空位即可执行，同类内某个店铺的大批量任务也不会挡住其他店铺。
+    刚开始排队的类别/分组从当前虚拟时间起算，空闲期间不积累额度。
+
+    防饿死：任一等待者排队超过 max_wait_seconds 时，下一个空位直接给等待最久的任务（计入 aged）。
+    """
+
+    def __init__(
+        self,
+        slots: int = 4,
+        weights: Mapping[TaskPriority, float] | None = None,
+        max_wait_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if slots < 1:
+            raise ValueError(f"slots 需 >= 1，当前为 {slots}")
+        self.weights = {**DEFAULT_PRIORITY_WEIGHTS, **(weights or {})}
+        if any(weight <= 0 for weight in self.weights.values()):
+            raise ValueError(f"优先级权重需 > 0: {self.weights}")
+        self.slots = slots
+        self.max_wait_seconds = max_wait_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._running = 0
+        self._queues: dict[TaskPriority, dict[str, deque[_Ticket]]] = {p: {} for p in TaskPriority}
+        # 虚拟时间：类别级一份，各类别内的分组级各一份；_pass 为下一次放行时的起始标签。
+        self._vtime = 0.0
+        self._class_pass: dict[TaskPriority, float] = {p: 0.0 for p in TaskPriority}
+        self._flow_vtime: dict[TaskPriority, float] = {p: 0.0 for p in TaskPriority}
+        self._flow_pass: dict[TaskPriority, dict[str, float]] = {p: {} for p in TaskPriority}
+        self._stats: dict[TaskPriority, _ClassStats] = {p: _ClassStats() for p in TaskPriority}
+
+    @contextmanager
+    def slot(self, priority: TaskPriority, fair_key: str = "") -> Iterator[None]:
+        """排队直到获得执行准入，退出时归还；等待被中断时撤回排队。"""
+        ticket = self._enter(priority, fair_key)
+        try:
+            ticket.granted.wait()
+            yield
+        finally:
+            self._leave(ticket)
+
+    def _enter(self, priority: TaskPriority, fair_key: str) -> _Ticket:
+        ticket = _Ticket(priority, fair_key, self._clock())
+        with self._lock:
+            flows = self._queues[priority]
+            if not flows:
+                self._class_pass[priority] = max(self._class_pass[priority], self._vtime)
+            queue = flows.get(fair_key)
+            if queue is None:
+                queue = flows[fair_key] = deque()
+                passes = self._flow_pass[priority]
+                passes[fair_key] = max(passes.get(fair_key, 0.0), self._flow_vtime[priority])
+            queue.append(ticket)
+            self._dispatch()
+        return ticket
+
+    def _leave(self, ticket: _Ticket) -> None:
+        with self._lock:
+            if ticket.granted.is_set():
+                self._running -= 1
+                self._stats[ticket.priority].running -= 1
+            else:
+                flows = self._queues[ticket.priority]
+                queue = flows[ticket.fair_key]
+                queue.remove(ticket)
+                if not queue:
+                    del flows[ticket.fair_key]
+                    del self._flow_pass[ticket.priority][ticket.fair_key]
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._running < self.slots:
+            ticket = self._pick()
+            if ticket is None:
+                return
+            stats = self._stats[ticket.priority]
+            stats.running += 1
+            stats.granted += 1
+            stats.wait_ms.add(max(0.0, (self._clock() - ticket.enqueued_at) * 1000))
+            self._running += 1
+            ticket.granted.set()
+
+    def _pick(self) -> _Ticket | None:
+        heads = [(queue[0], priority) for priority, flows in self._queues.items() for queue in flows.values()]
+        if not heads:
+            return None
+        oldest, priority = min(heads, key=lambda head: head[0].enqueued_at)
+        if self._clock() - oldest.enqueued_at >= self.max_wait_seconds:
+            self._stats[priority].aged += 1
+            fair_key = oldest.fair_key
+        else:
+            # 同一虚拟时间下按 urgent、normal、bulk 的顺序。
+            priority = min((p for p in TaskPriority if self._queues[p]), key=lambda p: self._class_pass[p])
+            passes = self._flow_pass[priority]
+            fair_key = min(self._queues[priority], key=lambda key: (passes[key], key))
+
+        self._vtime = max(self._vtime, self._class_pass[priority])
+        self._class_pass[priority] += 1 / self.weights[priority]
+        passes = self._flow_pass[priority]
+        self._flow_vtime[priority] = max(self._flow_vtime[priority], passes[fair_key])
+        passes[fair_key] += 1
+
+        flows = self._queues[priority]
+        ticket = flows[fair_key].popleft()
+        if not flows[fair_key]:
+            del flows[fair_key]
+            del passes[fair_key]
+        return ticket
+
+    def metrics(self) -> dict[str, Any]:
+        """按优先级类别的排队深度、执行中数量、累计放行/老化放行次数与排队等待时间分位数（毫秒）。"""
+        with self._lock:
+            now = self._clock()
+            classes: dict[str, dict[str, Any]] = {}
+            for priority, flows in self._queues.items():
+                stats = self._stats[priority]
+                oldest = min((queue[0].enqueued_at for queue in flows.values()), default=None)
+                classes[priority.value] = {
+                    "queued": sum(len(queue) for queue in flows.values()),
+                    "flows": len(flows),
+                    "running": stats.running,
+                    "granted": stats.granted,
+                    "aged": stats.aged,
+                    "oldest_wait_seconds": round(now - oldest, 3) if oldest is not None else None,
+                    "wait_ms": stats.wait_ms.summary(),
+                }
+            return {"slots": self.slots, "running": self._running, "classes": classes}
@@ -0,0 +1,673 @@
+from __future__ import annotations
+
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from itertools import groupby
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import (
+    Column,
+    Float,
+    Index,
+    Integer,
+    LargeBinary,
+    MetaData,
+    Table,
+    Text,
+    create_engine,
+    delete,
+    event,
+    exists,
+    null,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection, Engine, make_url
+from sqlalchemy.pool import StaticPool
+
+from app.models import serializer
+from app.models.schemas import ListingTask, TaskPriority, TaskStatus
+from app.tasks.base import (
+    StepTiming,
+    TaskPage,
+    check_page_limit,
+    decode_cursor,
+    encode_cursor,
+    iter_task_pages,
+    step_dict,
+    summary_dict,
+)
+from app.tasks.blobs import BLOB_REF_COLUMNS, BlobRow, BlobStore
+from app.tasks.migrations import MIGRATIONS, apply_migrations
+
+# 表结构需与 app/tasks/migrations.py 的最新版本保持一致：
+# SQLite 仍走版本化迁移，其他数据库（Postgres）由 metadata.create_all 建表并补记 schema_version。
+metadata = MetaData()
+
+listing_tasks = Table(
+    "listing_tasks",
+    metadata,
+    Column("task_id", Text, primary_key=True),
+    Column("product_id", Text, nullable=False),
+    Column("status", Text, nullable=False),
+    Column("listing_pack_version", Text, nullable=False),
+    Column("input_snapshot", Text, nullable=False),
+    Column("channel", Text, nullable=False),
+    Column("created_at", Text, nullable=False),
+    Column("updated_at", Text, nullable=False),
+    Column("output", Text, nullable=False),
+    Column("priority", Text, nullable=False, server_default="normal"),
+    Column("fair_key", Text, nullable=False, server_default=""),
+    Index("idx_listing_tasks_product_id", "product_id"),
+    Index("idx_listing_tasks_status_keyset", "status", "updated_at", "task_id"),
+    Index("idx_listing_tasks_keyset", "updated_at", "task_id"),
+)
+
+task_logs = Table(
+    "task_logs",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("task_id", Text, nullable=False),
+    Column("step_name", Text, nullable=False),
+    Column("success", Integer, nullable=False),
+    Column("message", Text, nullable=False),
+    Column("payload", Text, nullable=False),
+    Column("created_at", Text, nullable=False),
+    Index("idx_task_logs_task_id", "task_id", "id"),
+    sqlite_autoincrement=True,
+)
+
+listing_task_steps = Table(
+    "listing_task_steps",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("task_id", Text, nullable=False),
+    Column("step_name", Text, nullable=False),
+    Column("status", Text, nullable=False),
+    Column("retry_count", Integer, nullable=False, default=0),
+    Column("artifact_path", Text),
+    Column("error", Text),
+    Column("updated_at", Text, nullable=False),
+    Column("started_at", Text),
+    Column("finished_at", Text),
+    Column("duration_ms", Float),
+    Column("device_id", Text),
+    Index("idx_listing_task_steps_task_id", "task_id", "id"),
+    Index("idx_listing_task_steps_finished", "finished_at"),
+    sqlite_autoincrement=True,
+)
+
+task_blobs = Table(
+    "task_blobs",
+    metadata,
+    Column("hash", Text, primary_key=True),
+    Column("codec", Text, nullable=False),
+    Column("raw_size", Integer, nullable=False),
+    Column("data", LargeBinary, nullable=False),
+)
+
+task_queue = Table(
+    "task_queue",
+    metadata,
+    Column("task_id", Text, primary_key=True),
+    Column("available_at", Float, nullable=False),
+    Column("enqueued_at", Float, nullable=False),
+    Column("attempts", Integer, nullable=False, default=0),
+    Column("lease_owner", Text),
+    Column("lease_token", Text),
+    Index("idx_task_queue_available", "available_at"),
+)
+
+idempotency_keys = Table(
+    "idempotency_keys",
+    metadata,
+    Column("key", Text, primary_key=True),
+    Column("request_hash", Text, nullable=False),
+    Column("status", Text, nullable=False),
+    Column("response", Text),
+    Column("locked_until", Float, nullable=False),
+    Column("expires_at", Float, nullable=False),
+    Index("idx_idempotency_keys_expires", "expires_at"),
+)
+
+schema_version = Table(
+    "schema_version",
+    metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", Text, nullable=False),
+    Column("applied_at", Text, nullable=False),
+)
+
+_TASK_COLUMNS = (
+    listing_tasks.c.task_id,
+    listing_tasks.c.product_id,
+    listing_tasks.c.status,
+    listing_tasks.c.listing_pack_version,
+    listing_tasks.c.input_snapshot,
+    listing_tasks.c.channel,
+    listing_tasks.c.created_at,
+    listing_tasks.c.updated_at,
+    listing_tasks.c.output,
+    listing_tasks.c.priority,
+    listing_tasks.c.fair_key,
+)
+
+_STEP_COLUMNS = (
+    listing_task_steps.c.step_name,
+    listing_task_steps.c.status,
+    listing_task_steps.c.retry_count,
+    listing_task_steps.c.artifact_path,
+    listing_task_steps.c.error,
+    listing_task_steps.c.updated_at,
+    listing_task_steps.c.started_at,
+    listing_task_steps.c.finished_at,
+    listing_task_steps.c.duration_ms,
+    listing_task_steps.c.device_id,
+)
+
+_LOG_COLUMNS = (
+    task_logs.c.step_name,
+    task_logs.c.success,
+    task_logs.c.message,
+    task_logs.c.payload,
+    task_logs.c.created_at,
+)
+
+_DIALECT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+
+def create_task_engine(url: str, pool_size: int = 5, busy_timeout_ms: int = 5000) -> Engine:
+    """按 URL 创建带连接池的引擎；SQLite 文件库沿用 WAL 等 PRAGMA，内存库共享单连接。"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        return create_engine(url, pool_size=pool_size, pool_pre_ping=True)
+    if _is_memory_sqlite(url):
+        return create_engine(url, poolclass=StaticPool, connect_args={"check_same_thread": False})
+
+    Path(parsed.database).parent.mkdir(parents=True, exist_ok=True)
+    engine = create_engine(
+        url,
+        pool_size=pool_size,
+        connect_args={"timeout": busy_timeout_ms / 1000, "check_same_thread": False},
+    )
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_conn: Any, _record: Any) -> None:
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        cursor.close()
+
+    return engine
+
+
+class SQLAlchemyUnitOfWork:
+    """缓冲一次提交内的写入；flush 时相邻同类行合并为 executemany 批量写入。"""
+
+    def __init__(self, repo: SQLAlchemyTaskRepository) -> None:
+        self._repo = repo
+        self._pending: list[tuple[str, dict[str, Any]]] = []
+        self._blobs: list[BlobRow] = []
+
+    def save_task(self, task: ListingTask) -> None:
+        encode = self._repo._encode_json
+        self._pending.append(
+            (
+                "task",
+                {
+                    "task_id": task.task_id,
+                    "product_id": task.product_id,
+                    "status": task.status.value,
+                    "listing_pack_version": task.listing_pack_version,
+                    "input_snapshot": encode(task.input_snapshot, self._blobs),
+                    "channel": task.channel,
+                    "created_at": task.created_at,
+                    "updated_at": task.updated_at,
+                    "output": encode(task.output, self._blobs),
+                    "priority": task.priority.value,
+                    "fair_key": task.fair_key,
+                },
+            )
+        )
+
+    def save_step(
+        self,
+        task_id: str,
+        step_name: str,
+        status: str,
+        updated_at: str,
+        retry_count: int = 0,
+        artifact_path: str | None = None,
+        error: str | None = None,
+        timing: StepTiming | None = None,
+        device_id: str | None = None,
+    ) -> None:
+        self._pending.append(
+            (
+                "step",
+                {
+                    "task_id": task_id,
+                    "step_name": step_name,
+                    "status": status,
+                    "retry_count": retry_count,
+                    "artifact_path": artifact_path,
+                    "error": error,
+                    "updated_at": updated_at,
+                    "started_at": timing.started_at if timing is not None else None,
+                    "finished_at": timing.finished_at if timing is not None else None,
+                    "duration_ms": timing.duration_ms if timing is not None else None,
+                    "device_id": device_id,
+                },
+            )
+        )
+
+    def log_step(self, task_id: str, step_name: str, success: bool, message: str, payload: dict, created_at: str) -> None:
+        self._pending.append(
+            (
+                "log",
+                {
+                    "task_id": task_id,
+                    "step_name": step_name,
+                    "success": int(success),
+                    "message": message,
+                    "payload": self._repo._encode_json(payload, self._blobs),
+                    "created_at": created_at,
+                },
+            )
+        )
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        with self._repo._begin() as conn:
+            if self._blobs:
+                conn.execute(
+                    self._repo._blob_insert,
+                    [{"hash": b.hash, "codec": b.codec, "raw_size": b.raw_size, "data": b.data} for b in self._blobs],
+                )
+            for kind, group in groupby(self._pending, key=lambda op: op[0]):
+                conn.execute(self._repo._statements[kind], [params for _, params in group])
+        self.discard()
+
+    def discard(self) -> None:
+        self._pending.clear()
+        self._blobs.clear()
+
+
+class SQLAlchemyTaskRepository:
+    """基于 SQLAlchemy Core 的 TaskRepository 实现，支持 SQLite（文件/内存）与 Postgres。
+
+    内存 SQLite 只有一条共享连接，访问通过锁串行化，仅用于测试与本地试跑。
+    """
+
+    def __init__(
+        self,
+        url: str,
+        pool_size: int = 5,
+        busy_timeout_ms: int = 5000,
+        blob_threshold_bytes: int | None = 512,
+    ) -> None:
+        self.url = url
+        self.engine = create_task_engine(url, pool_size=pool_size, busy_timeout_ms=busy_timeout_ms)
+        self.dialect = self.engine.dialect.name
+        if self.dialect not in _DIALECT_INSERTS:
+            raise ValueError(f"暂不支持的数据库方言: {self.dialect}（url={url}）")
+        self.blobs = BlobStore(threshold_bytes=blob_threshold_bytes) if blob_threshold_bytes is not None else None
+        self._lock = threading.RLock() if _is_memory_sqlite(url) else None
+
+        insert = _DIALECT_INSERTS[self.dialect]
+        task_insert = insert(listing_tasks)
+        self._statements = {
+            "task": task_insert.on_conflict_do_update(
+                index_elements=[listing_tasks.c.task_id],
+                set_={col.name: task_insert.excluded[col.name] for col in listing_tasks.c if col.name != "task_id"},
+            ),
+            "step": listing_task_steps.insert(),
+            "log": task_logs.insert(),
+        }
+        self._blob_insert = insert(task_blobs).on_conflict_do_nothing(index_elements=[task_blobs.c.hash])
+        self._init_db()
+
+    @contextmanager
+    def _begin(self) -> Iterator[Connection]:
+        if self._lock is None:
+            with self.engine.begin() as conn:
+                yield conn
+            return
+        with self._lock, self.engine.begin() as conn:
+            yield conn
+
+    @contextmanager
+    def _connect(self) -> Iterator[Connection]:
+        if self._lock is None:
+            with self.engine.connect() as conn:
+                yield conn
+            return
+        with self._lock, self.engine.connect() as conn:
+            yield conn
+
+    def _init_db(self) -> None:
+        if self.dialect == "sqlite":
+            raw = self.engine.raw_connection()
+            try:
+                apply_migrations(raw.driver_connection)
+            finally:
+                raw.close()
+            return
+
+        metadata.create_all(self.engine)
+        with self._begin() as conn:
+            applied = set(conn.execute(select(schema_version.c.version)).scalars())
+            missing = [
+                {"version": m.version, "name": m.name, "applied_at": datetime.now(timezone.utc).isoformat()}
+                for m in MIGRATIONS
+                if m.version not in applied
+            ]
+            if missing:
+                conn.execute(schema_version.insert(), missing)
+
+    def close(self) -> None:
+        self.engine.dispose()
+
+    def _encode_json(self, value: Any, blobs: list[BlobRow]) -> str:
+        if self.blobs is None:
+            return serializer.dumps(value)
+        text, rows = self.blobs.encode(value)
+        blobs.extend(rows)
+        return text
+
+    def _fetch_blob(self, conn: Connection, digest: str) -> tuple[str, bytes] | None:
+        row = conn.execute(select(task_blobs.c.codec, task_blobs.c.data).where(task_blobs.c.hash == digest)).first()
+        return None if row is None else (row[0], row[1])
+
+    def _decode_json(self, conn: Connection, text: str) -> Any:
+        if self.blobs is None:
+            return serializer.loads(text)
+        return self.blobs.decode(text, lambda digest: self._fetch_blob(conn, digest))
+
+    def _row_to_task(self, conn: Connection, row: Any) -> ListingTask:
+        return ListingTask(
+            task_id=row[0],
+            product_id=row[1],
+            status=TaskStatus(row[2]),
+            listing_pack_version=row[3],
+            input_snapshot=self._decode_json(conn, row[4]),
+            channel=row[5],
+            created_at=row[6],
+            updated_at=row[7],
+            output=self._decode_json(conn, row[8]),
+            priority=TaskPriority(row[9]),
+            fair_key=row[10],
+        )
+
+    @contextmanager
+    def transaction(self) -> Iterator[SQLAlchemyUnitOfWork]:
+        """打开一个工作单元：块内写入先缓冲，正常退出时单事务提交，异常时整体丢弃。"""
+        uow = SQLAlchemyUnitOfWork(self)
+        try:
+            yield uow
+        except BaseException:
+            uow.discard()
+            raise
+        uow.flush()
+
+    def save_task(self, task: ListingTask) -> None:
+        with self.transaction() as uow:
+            uow.save_task(task)
+
+    def save_step(
+        self,
+        task_id: str,
+        step_name: str,
+        status: str,
+        updated_at: str,
+        retry_count: int = 0,
+        artifact_path: str | None = None,
+        error: str | None = None,
+        timing: StepTiming | None = None,
+        device_id: str | None = None,
+    ) -> None:
+        with self.transaction() as uow:
+            uow.save_step(task_id, step_name, status, updated_at, retry_count, artifact_path, error, timing, device_id)
+
+    def log_step(self, task_id: str, step_name: str, success: bool, message: str, payload: dict, created_at: str) -> None:
+        with self.transaction() as uow:
+            uow.log_step(task_id, step_name, success, message, payload, created_at)
+
+    def list_steps(self, task_id: str) -> list[dict]:
+        stmt = (
+            select(*_STEP_COLUMNS)
+            .where(listing_task_steps.c.task_id == task_id)
+            .order_by(listing_task_steps.c.id)
+        )
+        with self._connect() as conn:
+            return [step_dict(row) for row in conn.execute(stmt)]
+
+    def list_logs(self, task_id: str) -> list[dict]:
+        stmt = select(*_LOG_COLUMNS).where(task_logs.c.task_id == task_id).order_by(task_logs.c.id)
+        with self._connect() as conn:
+            return [self._log_dict(conn, row) for row in conn.execute(stmt).all()]
+
+    def list_logs_many(self, task_ids: list[str]) -> dict[str, list[dict]]:
+        if not task_ids:
+            return {}
+        stmt = (
+            select(task_logs.c.task_id, *_LOG_COLUMNS)
+            .where(task_logs.c.task_id.in_(task_ids))
+            .order_by(task_logs.c.task_id, task_logs.c.id)
+        )
+        with self._connect() as conn:
+            rows = conn.execute(stmt).all()
+            return {
+                task_id: [self._log_dict(conn, row[1:]) for row in group]
+                for task_id, group in groupby(rows, key=lambda row: row[0])
+            }
+
+    def _log_dict(self, conn: Connection, row: Any) -> dict:
+        return {
+            "step_name": row[0],
+            "success": bool(row[1]),
+            "message": row[2],
+            "payload": self._decode_json(conn, row[3]),
+            "created_at": row[4],
+        }
+
+    def get_task(self, task_id: str) -> ListingTask | None:
+        with self._connect() as conn:
+            row = conn.execute(select(*_TASK_COLUMNS).where(listing_tasks.c.task_id == task_id)).first()
+            return None if row is None else self._row_to_task(conn, row)
+
+    def get_tasks(self, task_ids: list[str]) -> dict[str, ListingTask]:
+        if not task_ids:
+            return {}
+        with self._connect() as conn:
+            rows = conn.execute(select(*_TASK_COLUMNS).where(listing_tasks.c.task_id.in_(task_ids))).all()
+            return {row[0]: self._row_to_task(conn, row) for row in rows}
+
+    def list_steps_many(self, task_ids: list[str]) -> dict[str, list[dict]]:
+        if not task_ids:
+            return {}
+        stmt = (
+            select(listing_task_steps.c.task_id, *_STEP_COLUMNS)
+            .where(listing_task_steps.c.task_id.in_(task_ids))
+            .order_by(listing_task_steps.c.task_id, listing_task_steps.c.id)
+        )
+        with self._connect() as conn:
+            rows = conn.execute(stmt).all()
+        return {task_id: [step_dict(row[1:]) for row in group] for task_id, group in groupby(rows, key=lambda row: row[0])}
+
+    def get_task_detail(self, task_id: str, include_payload: bool = True) -> dict[str, Any] | None:
+        """一次 LEFT JOIN 返回任务与步骤；include_payload=False 时跳过大 JSON 列。"""
+        task_columns = list(_TASK_COLUMNS)
+        if not include_payload:
+            task_columns[4] = null()
+            task_columns[8] = null()
+        stmt = (
+            select(*task_columns, *_STEP_COLUMNS)
+            .select_from(
+                listing_tasks.outerjoin(listing_task_steps, listing_task_steps.c.task_id == listing_tasks.c.task_id)
+            )
+            .where(listing_tasks.c.task_id == task_id)
+            .order_by(listing_task_steps.c.id)
+        )
+        with self._connect() as conn:
+            rows = conn.execute(stmt).all()
+            if not rows:
+                return None
+            head = rows[0]
+            task = self._row_to_task(conn, head[:11]).model_dump() if include_payload else summary_dict(head)
+        steps = [step_dict(row[11:]) for row in rows if row[11] is not None]
+        return {"task": task, "steps": steps}
+
+    def list_tasks(
+        self,
+        status: TaskStatus | None = None,
+        channel: str | None = None,
+        after: str | None = None,
+        limit: int = 100,
+    ) -> TaskPage:
+        check_page_limit(limit)
+        stmt = select(*_TASK_COLUMNS)
+        if status is not None:
+            stmt = stmt.where(listing_tasks.c.status == TaskStatus(status).value)
+        if after is not None:
+            stmt = stmt.where(
+                tuple_(listing_tasks.c.updated_at, listing_tasks.c.task_id) > tuple_(*decode_cursor(after))
+            )
+        if channel is not None:
+            stmt = stmt.where(listing_tasks.c.channel == channel)
+        stmt = stmt.order_by(listing_tasks.c.updated_at, listing_tasks.c.task_id).limit(limit + 1)
+
+        with self._connect() as conn:
+            rows = conn.execute(stmt).all()
+            items = [self._row_to_task(conn, row) for row in rows[:limit]]
+        next_after = encode_cursor(items[-1].updated_at, items[-1].task_id) if len(rows) > limit else None
+        return TaskPage(items=items, next_after=next_after)
+
+    def iter_tasks(
+        self,
+        status: TaskStatus | None = None,
+        channel: str | None = None,
+        page_size: int = 100,
+    ) -> Iterator[ListingTask]:
+        return iter_task_pages(self, status, channel, page_size)
+
+    def list_expired_task_ids(self, status: TaskStatus, before: str, limit: int) -> list[str]:
+        stmt = (
+            select(listing_tasks.c.task_id)
+            .where(listing_tasks.c.status == TaskStatus(status).value, listing_tasks.c.updated_at < before)
+            .order_by(listing_tasks.c.updated_at, listing_tasks.c.task_id)
+            .limit(limit)
+        )
+        with self._connect() as conn:
+            return list(conn.execute(stmt).scalars())
+
+    def iter_step_durations(self, since: str, until: str) -> Iterator[tuple[str, str, str | None, float]]:
+        stmt = (
+            select(
+                listing_task_steps.c.step_name,
+                listing_tasks.c.channel,
+                listing_task_steps.c.device_id,
+                listing_task_steps.c.duration_ms,
+            )
+            .join(listing_tasks, listing_tasks.c.task_id == listing_task_steps.c.task_id)
+            .where(
+                listing_task_steps.c.finished_at >= since,
+                listing_task_steps.c.finished_at < until,
+                listing_task_steps.c.duration_ms.is_not(None),
+            )
+        )
+        with self._connect() as conn:
+            for row in conn.execution_options(yield_per=1000).execute(stmt):
+                yield tuple(row)
+
+    def touch_task(self, task_id: str, status: TaskStatus, expected_updated_at: str, updated_at: str) -> bool:
+        stmt = (
+            update(listing_tasks)
+            .where(
+                listing_tasks.c.task_id == task_id,
+                listing_tasks.c.status == TaskStatus(status).value,
+                listing_tasks.c.updated_at == expected_updated_at,
+            )
+            .values(updated_at=updated_at)
+        )
+        with self._begin() as conn:
+            return conn.execute(stmt).rowcount == 1
+
+    def delete_tasks(self, task_ids: list[str]) -> dict[str, int]:
+        if not task_ids:
+            return {"tasks": 0, "steps": 0, "logs": 0}
+        with self._begin() as conn:
+            logs = conn.execute(delete(task_logs).where(task_logs.c.task_id.in_(task_ids))).rowcount
+            steps = conn.execute(delete(listing_task_steps).where(listing_task_steps.c.task_id.in_(task_ids))).rowcount
+            tasks = conn.execute(delete(listing_tasks).where(listing_tasks.c.task_id.in_(task_ids))).rowcount
+        return {"tasks": tasks, "steps": steps, "logs": logs}
+
+    def delete_orphans(self, before: str) -> dict[str, int]:
+        with self._begin() as conn:
+            logs = conn.execute(
+                delete(task_logs).where(
+                    task_logs.c.created_at < before,
+                    ~exists().where(listing_tasks.c.task_id == task_logs.c.task_id),
+                )
+            ).rowcount
+            steps = conn.execute(
+                delete(listing_task_steps).where(
+                    listing_task_steps.c.updated_at < before,
+                    ~exists().where(listing_tasks.c.task_id == listing_task_steps.c.task_id),
+                )
+            ).rowcount
+        return {"steps": steps, "logs": logs}
+
+    def compact(self, vacuum_pages: int = 2000) -> int:
+        deleted = self._collect_blob_garbage(self.blobs) if self.blobs is not None else 0
+        if self.dialect == "sqlite":
+            with self._begin() as conn:
+                conn.exec_driver_sql(f"PRAGMA incremental_vacuum({int(vacuum_pages)})")
+        return deleted
+
+    def _collect_blob_garbage(self, blobs: BlobStore, batch_size: int = 500) -> int:
+        """标记-清除未被引用的 blob：标记阶段不持锁，再取得写锁复查候选并删除（同 sqlite3 实现）。"""
+        with self._connect() as conn:
+            known = set(conn.execute(select(task_blobs.c.hash)).scalars())
+            live = blobs.live_refs(self._blob_ref_texts(conn), lambda digest: self._fetch_blob(conn, digest))
+        candidates = known - live
+        if not candidates:
+            return 0
+
+        with self._begin() as conn:
+            if self.dialect == "postgresql":
+                conn.exec_driver_sql("LOCK TABLE task_blobs IN EXCLUSIVE MODE")
+            else:
+                # SQLite 的首条写语句会在 DEFERRED 事务中立即取得 RESERVED 锁。
+                conn.execute(delete(task_blobs).where(task_blobs.c.hash.is_(None)))
+            current = set(conn.execute(select(task_blobs.c.hash)).scalars())
+            keep = blobs.rereferenced(
+                candidates, self._blob_ref_texts(conn), current - known, lambda digest: self._fetch_blob(conn, digest)
+            )
+            dead = sorted((candidates & current) - keep)
+            for start in range(0, len(dead), batch_size):
+                conn.execute(delete(task_blobs).where(task_blobs.c.hash.in_(dead[start : start + batch_size])))
+        blobs.forget(dead)
+        return len(dead)
+
+    @staticmethod
+    def _blob_ref_texts(conn: Connection) -> list[str]:
+        tables = {"listing_tasks": listing_tasks, "task_logs": task_logs}
+        return [
+            text
+            for table, column in BLOB_REF_COLUMNS
+            for text in conn.execute(select(tables[table].c[column]).where(tables[table].c[column].like("%$blob%"))).scalars()
+        ]
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import threading
+from collections.abc import Callable, Collection, Iterable, Iterator, Mapping
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.models.schemas import FrozenListingPack, ListingPack, ListingTask
+
+RESOURCE_DEVICE = "device"
+RESOURCE_NETWORK = "network"
+RESOURCE_CPU = "cpu"
+
+# 独占资源：同一任务内同时最多一个步骤持有（一台手机同一时刻只能操作一个界面）。
+EXCLUSIVE_RESOURCES = frozenset({RESOURCE_DEVICE})
+
+
+@dataclass(frozen=True, slots=True)
+class StepOutcome:
+    """步骤结果：result 写入日志，output 由执行器合并进 task.output（步骤本身不直接修改任务）。"""
+
+    result: dict[str, Any]
+    message: str
+    output: dict[str, Any] = field(default_factory=dict)
+
+
+# 执行一个步骤：读取 task/listing_pack，返回 StepOutcome。并行的步骤会在不同线程上调用。
+StepHandler = Callable[[ListingTask, "ListingPack | FrozenListingPack"], StepOutcome]
+
+
+@dataclass(frozen=True)
+class StepSpec:
+    """一个上架步骤的声明：依赖的前置步骤、占用的资源、是否需要人工确认放行，
+    以及是否必须在任务上一个设备步骤所用的同一台设备上执行（依赖设备上已有的界面状态）。"""
+
+    name: str
+    handler: StepHandler
+    depends_on: tuple[str, ...] = ()
+    resources: frozenset[str] = frozenset({RESOURCE_DEVICE})
+    confirm_gated: bool = False
+    device_affinity: bool = False
+
+
+class StepRegistry:
+    """可插拔的步骤注册表，按依赖关系组成 DAG。
+
+    names 为稳定的拓扑序（无依赖关系的步骤按注册顺序）；依赖未注册的步骤或存在环时抛 ValueError。
+    """
+
+    def __init__(self, specs: Iterable[StepSpec] = ()) -> None:
+        self._specs: dict[str, StepSpec] = {}
+        self._order: tuple[str, ...] | None = None
+        for spec in specs:
+            self.register(spec)
+
+    def register(self, spec: StepSpec) -> StepSpec:
+        if spec.name in self._specs:
+            raise ValueError(f"步骤重复注册: {spec.name}")
+        self._specs[spec.name] = spec
+        self._order = None
+        return spec
+
+    def step(
+        self,
+        name: str,
+        depends_on: tuple[str, ...] = (),
+        resources: Collection[str] = (RESOURCE_DEVICE,),
+        confirm_gated: bool = False,
+        device_affinity: bool = False,
+    ) -> Callable[[StepHandler], StepHandler]:
+        """以装饰器形式注册步骤处理函数。"""
+
+        def decorator(handler: StepHandler) -> StepHandler:
+            self.register(StepSpec(name, handler, tuple(depends_on), frozenset(resources), confirm_gated, device_affinity))
+            return handler
+
+        return decorator
+
+    def __getitem__(self, name: str) -> StepSpec:
+        return self._specs[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._specs
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+    @property
+    def names(self) -> tuple[str, ...]:
+        if self._order is None:
+            self._order = self._topological_order()
+        return self._order
+
+    def _topological_order(self) -> tuple[str, ...]:
+        for spec in self._specs.values():
+            missing = [dep for dep in spec.depends_on if dep not in self._specs]
+            if missing:
+                raise ValueError(f"步骤 {spec.name} 依赖未注册的步骤: {missing}")
+        order: list[str] = []
+        placed: set[str] = set()
+        while len(order) < len(self._specs):
+            batch = [
+                name
+                for name, spec in self._specs.items()
+                if name not in placed and all(dep in placed for dep in spec.depends_on)
+            ]
+            if not batch:
+                cycle = sorted(set(self._specs) - placed)
+                raise ValueError(f"步骤依赖存在环: {cycle}")
+            order.extend(batch)
+            placed.update(batch)
+        return tuple(order)
+
+    def ready(self, done: Collection[str], started: Collection[str]) -> list[str]:
+        """前置步骤均已完成、且自身尚未完成或开始的步骤，按拓扑序。"""
+        return [
+            name
+            for name in self.names
+            if name not in done and name not in started and all(dep in done for dep in self._specs[name].depends_on)
+        ]
+
+
+class ResourceLimiter:
+    """执行器范围内按资源类型限制同时执行的步骤数（如 cpu 不超过核数）；未配置上限的资源不受限。
+
+    一个步骤占用多个资源时按名称顺序获取，避免步骤之间互相等待造成死锁。
+    """
+
+    def __init__(self, limits: Mapping[str, int] | None = None) -> None:
+        if any(limit < 1 for limit in (limits or {}).values()):
+            raise ValueError(f"资源并发上限需 >= 1: {limits}")
+        self.limits = dict(limits or {})
+        self._semaphores = {name: threading.BoundedSemaphore(limit) for name, limit in self.limits.items()}
+
+    @contextmanager
+    def acquire(self, resources: Iterable[str]) -> Iterator[None]:
+        with ExitStack() as stack:
+            for name in sorted(resources):
+                semaphore = self._semaphores.get(name)
+                if semaphore is not None:
+                    stack.enter_context(semaphore)
+            yield
@@ -0,0 +1,124 @@
+"""
+任务队列 worker：从队列领取任务并续跑执行，可以多进程、多机器同时运行。
+
+用法示例：
+    rednote-worker
+    python -m app.tasks.worker --max-jobs 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import socket
+import threading
+import time
+from collections.abc import Callable
+
+from app.config.settings import get_settings
+from app.tasks.executor import ListingTaskExecutor
+from app.tasks.factory import build_task_queue
+from app.tasks.queue import Lease, TaskQueue
+from app.workflows.auto_ops import AutoOpsWorkflow
+
+logger = logging.getLogger(__name__)
+
+
+class TaskWorker:
+    """领取 -> 心跳续租 -> executor.resume -> ack 的循环。
+
+    resume 会跳过已完成的步骤，因此租约过期导致的重复投递只会重跑未完成的步骤。
+    执行抛出意外异常时按投递次数退避放回，超过 max_deliveries 后丢弃该条队列记录。
+    """
+
+    def __init__(
+        self,
+        queue: TaskQueue,
+        executor: ListingTaskExecutor,
+        worker_id: str | None = None,
+        lease_seconds: float = 300.0,
+        poll_interval: float = 1.0,
+        max_deliveries: int = 5,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.queue = queue
+        self.executor = executor
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_deliveries = max_deliveries
+        self._sleep = sleep
+
+    def run_once(self) -> bool:
+        """处理一个任务；队列中没有到期任务时返回 False。"""
+        lease = self.queue.claim(self.worker_id, self.lease_seconds)
+        if lease is None:
+            return False
+
+        stop = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(lease, stop), daemon=True)
+        beat.start()
+        try:
+            task = self.executor.resume(lease.task_id)
+        except Exception:
+            logger.exception("执行任务失败 task_id=%s attempts=%s", lease.task_id, lease.attempts)
+            if lease.attempts >= self.max_deliveries:
+                self.queue.ack(lease)
+            else:
+                self.queue.release(lease, delay=self.poll_interval * 2**lease.attempts)
+            return True
+        finally:
+            stop.set()
+            beat.join()
+
+        if not self.queue.ack(lease):
+            logger.warning("租约已失效，任务可能被重复执行 task_id=%s", lease.task_id)
+        logger.info("任务执行结束 task_id=%s status=%s", task.task_id, task.status.value)
+        return True
+
+    def _heartbeat(self, lease: Lease, stop: threading.Event) -> None:
+        while not stop.wait(self.lease_seconds / 3):
+            if not self.queue.heartbeat(lease, self.lease_seconds):
+                logger.warning("续租失败 task_id=%s", lease.task_id)
+                return
+
+    def run(self, stop: threading.Event | None = None, max_jobs: int | None = None) -> int:
+        """持续消费直到 stop 被设置或处理满 max_jobs 个任务，返回处理的任务数。"""
+        stop = stop or threading.Event()
+        handled = 0
+        while not stop.is_set() and (max_jobs is None or handled < max_jobs):
+            if self.run_once():
+                handled += 1
+            else:
+                self._sleep(self.poll_interval)
+        return handled
+
+
+def main(argv: list[str] | None = None) -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="RedNote-AutoPilot 任务队列 worker")
+    parser.add_argument("--worker-id", default=None, help="worker 标识，默认 主机名:进程号")
+    parser.add_argument("--max-jobs", type=int, default=None, help="处理满该数量后退出")
+    parser.add_argument("--lease-seconds", type=float, default=settings.task_queue_lease_seconds, help="租约时长（秒）")
+    parser.add_argument("--poll-interval", type=float, default=settings.worker_poll_interval, help="空闲轮询间隔（秒）")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    workflow = AutoOpsWorkflow()
+    worker = TaskWorker(
+        workflow.task_queue or build_task_queue(settings.task_queue_backend, workflow.task_repo, settings.redis_url),
+        workflow.task_executor,
+        worker_id=args.worker_id,
+        lease_seconds=args.lease_seconds,
+        poll_interval=args.poll_interval,
+    )
+    try:
+        handled = worker.run(max_jobs=args.max_jobs)
+    finally:
+        workflow.task_executor.close()
+    logger.info("worker 退出，共处理 %s 个任务", handled)
+
+
+if __name__ == "__main__":
+    main()
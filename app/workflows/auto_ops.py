@@ -1,22 +1,55 @@
+from datetime import datetime, timedelta, timezone
+
 from app.ai_engine.content_generator import AIContentGenerator
+from app.analytics.latency import summarize_step_latency
 from app.analytics.service import AnalyticsService
-from app.channels.factory import build_channel
+from app.channels.factory import build_channel, build_device_pool
 from app.config.settings import get_settings
 from app.order_manager.service import OrderManager
 from app.product_manager.service import ProductManager
 from app.tasks.executor import ListingTaskExecutor
-from app.tasks.repository import TaskRepository
+from app.tasks.factory import build_idempotency_store, build_task_queue, build_task_repository
+from app.tasks.idempotency import IdempotencyGuard
+from app.tasks.recovery import TaskRecovery
+from app.tasks.retention import TaskRetention
+from app.tasks.retry import RetryPolicy
+from app.tasks.scheduling import FairShareScheduler
 
 
 class AutoOpsWorkflow:
     def __init__(self) -> None:
         settings = get_settings()
-        channel = build_channel()
-        task_repo = TaskRepository(settings.task_db_path)
-        task_executor = ListingTaskExecutor(
+        self.channel = channel = build_channel()
+        self.task_repo = task_repo = build_task_repository(settings.task_db_path)
+        self.device_pool = build_device_pool(settings) if settings.operation_mode == "auto_device" else None
+        # 多设备时同时执行的任务数至少与设备数相当，吞吐随设备数线性增长。
+        task_slots = max(settings.batch_channel_limit, len(self.device_pool or ()))
+        self.task_scheduler = FairShareScheduler(
+            slots=task_slots,
+            max_wait_seconds=settings.task_priority_max_wait_seconds,
+        )
+        self.task_executor = task_executor = ListingTaskExecutor(
             channel,
             task_repo,
             final_confirm_required=settings.final_confirm_required,
+            max_workers=max(settings.batch_max_workers, task_slots),
+            channel_limit=task_slots,
+            retry_policy=RetryPolicy(
+                max_attempts=settings.step_max_attempts,
+                base_delay=settings.step_retry_base_delay,
+                max_delay=settings.step_retry_max_delay,
+            ),
+            breaker_threshold=settings.channel_breaker_threshold,
+            breaker_reset_seconds=settings.channel_breaker_reset_seconds,
+            scheduler=self.task_scheduler,
+            device_pool=self.device_pool,
+        )
+
+        # queue 模式下接口只负责建任务并入队，由独立的 worker 进程（rednote-worker）领取执行。
+        self.task_queue = (
+            build_task_queue(settings.task_queue_backend, task_repo, settings.redis_url)
+            if settings.task_execution_mode == "queue"
+            else None
         )
 
         self.product_manager = ProductManager(
@@ -25,6 +58,26 @@ class AutoOpsWorkflow:
             task_repo=task_repo,
             task_executor=task_executor,
             operation_mode=settings.operation_mode,
+            task_queue=self.task_queue,
+            idempotency=IdempotencyGuard(
+                build_idempotency_store(task_repo),
+                ttl_seconds=settings.idempotency_ttl_seconds,
+                # 进行中记录的租期与任务判定为卡死的时长一致，执行中的设备任务不会被重复请求抢先执行。
+                lock_seconds=settings.task_stale_after_seconds,
+                wait_seconds=settings.idempotency_wait_seconds,
+            ),
+        )
+        self.task_retention = TaskRetention(
+            task_repo,
+            archive_dir=settings.task_archive_dir,
+            max_age_days=settings.task_retention_days,
+        )
+        self.task_recovery = TaskRecovery(
+            task_repo,
+            task_executor,
+            queue=self.task_queue,
+            stale_after_seconds=settings.task_stale_after_seconds,
+            max_recoveries=settings.task_max_recoveries,
         )
         self.order_manager = OrderManager(channel)
         self.analytics = AnalyticsService()
@@ -32,3 +85,35 @@ class AutoOpsWorkflow:
     def run_sales_loop(self) -> dict:
         recent_orders = self.order_manager.sync_recent_orders(minutes=60)
         return self.analytics.analyze_sales(recent_orders)
+
+    def latency_report(self, window_minutes: int = 60) -> dict:
+        """最近 window_minutes 分钟内步骤耗时的分位数（毫秒），附带本进程内 ADB 命令的耗时分布
+        （adb 为通道默认设备；多设备时 adb_devices 按 device_id 给出池中各设备的分布）。"""
+        until = datetime.now(timezone.utc)
+        since = until - timedelta(minutes=window_minutes)
+        report: dict = {"since": since.isoformat(), "until": until.isoformat()}
+        report.update(summarize_step_latency(self.task_repo.iter_step_durations(since.isoformat(), until.isoformat())))
+        client = getattr(self.channel, "client", None)
+        if client is not None and hasattr(client, "latency"):
+            report["adb"] = client.latency.summary()
+        if self.device_pool is not None:
+            report["adb_devices"] = self.device_pool.latency()
+        return report
+
+    def device_report(self) -> dict:
+        """设备池中各设备的租用/隔离状态；单设备模式返回通道的默认设备。"""
+        if self.device_pool is None:
+            return {"size": 1, "devices": [{"device_id": getattr(self.channel, "device_id", None), "state": "default"}]}
+        return self.device_pool.metrics()
+
+    def check_devices(self) -> dict:
+        if self.device_pool is None:
+            return {}
+        return self.device_pool.check_health()
+
+    def scheduler_report(self) -> dict:
+        """本进程内按优先级类别的排队/执行指标；queue 模式下附带持久化队列的总深度。"""
+        report = self.task_scheduler.metrics()
+        if self.task_queue is not None:
+            report["queue_depth"] = self.task_queue.depth()
+        return report
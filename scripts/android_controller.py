@@ -12,15 +12,25 @@ Android模拟器控制工具
 import argparse
 import os
 import subprocess
+import sys
 import time
 from pathlib import Path
 from typing import Optional
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.channels.adb_shell import AdbSessionError, AdbShellSession  # noqa: E402
+from app.channels.screencap import PNG_SIGNATURE, ScreencapError, ScreenFrame, parse_raw_screencap  # noqa: E402
+from app.channels.ui_hierarchy import UiDumpError, UiHierarchy  # noqa: E402
+
 
 # ==================== 配置 ====================
 # ADB路径（如果ADB不在PATH中，需要指定完整路径）
 ADB_PATH = "adb"  # 假设ADB已在PATH中
 
+# shell 命令复用一个常驻的 adb shell 会话，省去每次启动 adb 进程与握手的开销
+USE_SHELL_SESSION = True
+
 # 模拟器配置
 DEFAULT_EMULATOR_PORT = 5555  # 雷电默认端口是5555，蓝叠是5554
 
@@ -34,10 +44,28 @@ OUTPUT_DIR = Path("artifacts/android")
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
 
+_shell_session: Optional[AdbShellSession] = None
+
+# 执行后界面可能变化的 shell 命令（点击、滑动、输入、按键、启动APP），界面层级缓存据此失效
+_SCREEN_CHANGING = (["shell", "input"], ["shell", "am"])
+_screen_version = 0
+
+
 def run_adb_command(args: list[str], timeout: int = 30) -> subprocess.CompletedProcess:
-    """执行ADB命令"""
+    """执行ADB命令（shell 命令在会话模式下经常驻会话执行，stderr 合并进 stdout）"""
+    global _shell_session, _screen_version
     cmd = [ADB_PATH] + args
     print(f"执行命令: {' '.join(cmd)}")
+    if args[:2] in _SCREEN_CHANGING:
+        _screen_version += 1
+    if USE_SHELL_SESSION and args[0] == "shell" and len(args) > 1:
+        if _shell_session is None:
+            _shell_session = AdbShellSession(ADB_PATH)
+        try:
+            result = _shell_session.run(args[1:], timeout=timeout)
+        except AdbSessionError as e:
+            return subprocess.CompletedProcess(cmd, 255, e.output, str(e))
+        return subprocess.CompletedProcess(cmd, result.returncode, result.stdout, "")
     return subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
 
 
@@ -114,6 +142,40 @@ def stop_app(package_name: str) -> bool:
     return result.returncode == 0
 
 
+def capture_screen_png(timeout: int = 30) -> bytes:
+    """经 exec-out 直接读取截图 PNG 到内存（不写入模拟器存储）"""
+    cmd = [ADB_PATH, "exec-out", "screencap", "-p"]
+    print(f"执行命令: {' '.join(cmd)}")
+    result = subprocess.run(cmd, capture_output=True, timeout=timeout)
+    if result.returncode != 0 or not result.stdout.startswith(PNG_SIGNATURE):
+        raise ScreencapError(f"截图失败: {result.stderr.decode(errors='replace').strip()}")
+    return result.stdout
+
+
+def capture_screen_frame(timeout: int = 30) -> ScreenFrame:
+    """经 exec-out 读取原始帧缓冲（不做设备端 PNG 压缩），交给截图存储去重与缩略"""
+    cmd = [ADB_PATH, "exec-out", "screencap"]
+    print(f"执行命令: {' '.join(cmd)}")
+    result = subprocess.run(cmd, capture_output=True, timeout=timeout)
+    if result.returncode != 0:
+        raise ScreencapError(f"截图失败: {result.stderr.decode(errors='replace').strip()}")
+    return parse_raw_screencap(result.stdout)
+
+
+def dump_ui_xml(timeout: int = 30) -> bytes:
+    """经 exec-out 读取 uiautomator dump 的界面层级 XML（不写入模拟器存储，也不用 pull）"""
+    cmd = [ADB_PATH, "exec-out", "uiautomator", "dump", "/dev/tty"]
+    print(f"执行命令: {' '.join(cmd)}")
+    result = subprocess.run(cmd, capture_output=True, timeout=timeout)
+    if result.returncode != 0:
+        raise UiDumpError(f"界面层级获取失败: {result.stderr.decode(errors='replace').strip()}")
+    return result.stdout
+
+
+# 当前界面的层级索引：界面未变化时查找元素直接命中缓存，不重新 dump
+UI = UiHierarchy(dump_ui_xml, lambda: _screen_version)
+
+
 def take_screenshot(filename: str = None) -> str:
     """截图"""
     if filename is None:
@@ -121,13 +183,7 @@ def take_screenshot(filename: str = None) -> str:
         filename = f"screenshot_{timestamp}.png"
     
     filepath = OUTPUT_DIR / filename
-    
-    # 在模拟器中截图
-    run_adb_command(["shell", "screencap", "-p", "/sdcard/screenshot.png"])
-    # 拉取到本地
-    run_adb_command(["pull", "/sdcard/screenshot.png", str(filepath)])
-    # 删除模拟器中的截图
-    run_adb_command(["shell", "rm", "/sdcard/screenshot.png"])
+    filepath.write_bytes(capture_screen_png())
     
     print(f"✓ 截图已保存: {filepath}")
     return str(filepath)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+ADB shell 命令延迟基准：每次启动 adb 进程 vs 常驻 shell 会话
+
+默认使用本地的假 adb（Python 脚本 + 本机 /bin/sh 扮演设备端），启动时 sleep --startup-ms 模拟
+adb 客户端启动与 adb server 握手的开销；input 命令为只返回 0 的空脚本。
+也可用 --adb/--device 指向真实的 adb 与设备（此时执行的是真实的 input keyevent，请在空白界面上运行）。
+
+用法示例：
+    python scripts/bench_adb_shell.py --calls 200 --startup-ms 150
+    python scripts/bench_adb_shell.py --adb adb --device emulator-5554 --calls 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import stat
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.analytics.latency import QuantileSketch  # noqa: E402
+from app.channels.android_device_client import AndroidDeviceClient  # noqa: E402
+
+_FAKE_ADB = """#!{python}
+import os, subprocess, sys, time
+time.sleep({startup_ms} / 1000)
+args = sys.argv[1:]
+if args[:1] == ["-s"]:
+    args = args[2:]
+os.environ["PATH"] = {bin_dir!r} + os.pathsep + os.environ["PATH"]
+if args[:1] != ["shell"]:
+    print("device")
+    sys.exit(0)
+if args[1:]:
+    sys.exit(subprocess.call(["/bin/sh", "-c", " ".join(args[1:])]))
+os.execv("/bin/sh", ["/bin/sh"])
+"""
+
+
+def write_fake_adb(directory: Path, startup_ms: float) -> str:
+    bin_dir = directory / "bin"
+    bin_dir.mkdir()
+    scripts = {
+        bin_dir / "input": "#!/bin/sh\nexit 0\n",
+        directory / "adb": _FAKE_ADB.format(python=sys.executable, startup_ms=startup_ms, bin_dir=str(bin_dir)),
+    }
+    for path, content in scripts.items():
+        path.write_text(content)
+        path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return str(directory / "adb")
+
+
+def run_calls(client: AndroidDeviceClient, calls: int) -> tuple[float, QuantileSketch]:
+    sketch = QuantileSketch()
+    started = time.perf_counter()
+    for _ in range(calls):
+        call_started = time.perf_counter()
+        result = client._run(["shell", "input", "keyevent", "0"])
+        if result.returncode != 0:
+            raise SystemExit(f"命令失败: {result.stdout}{result.stderr}")
+        sketch.add((time.perf_counter() - call_started) * 1000)
+    return time.perf_counter() - started, sketch
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ADB shell 命令延迟基准")
+    parser.add_argument("--calls", type=int, default=200, help="每种模式执行的命令数")
+    parser.add_argument("--startup-ms", type=float, default=150.0, help="假 adb 每次启动的模拟开销（毫秒）")
+    parser.add_argument("--adb", default=None, help="真实 adb 路径；不传则使用假 adb")
+    parser.add_argument("--device", default="bench-device", help="设备 ID")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        adb_path = args.adb or write_fake_adb(Path(tmp), args.startup_ms)
+        for label, shell_session in (("one-shot", False), ("session", True)):
+            client = AndroidDeviceClient(args.device, adb_path=adb_path, artifact_dir=tmp, shell_session=shell_session)
+            try:
+                # 会话模式的首次连接单独计时，不计入稳态延迟。
+                connect_started = time.perf_counter()
+                client._run(["shell", "true"])
+                connect_ms = (time.perf_counter() - connect_started) * 1000
+                elapsed, sketch = run_calls(client, args.calls)
+            finally:
+                client.close()
+            summary = sketch.summary()
+            print(
+                f"{label:>8}: {args.calls} 次 / {elapsed:.3f}s = {args.calls / elapsed:,.1f} cmd/s  "
+                f"p50={summary['p50']}ms p95={summary['p95']}ms p99={summary['p99']}ms  首次调用={connect_ms:.1f}ms"
+            )
+    if args.adb is None:
+        print(f"（假 adb，模拟启动开销 {args.startup_ms:g}ms）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+BlobStore 去重压缩的库体积测量
+
+按执行器的真实写入形态生成合成任务（input_snapshot、create_product 日志、
+含 create 结果的任务 output），分别写入关闭/开启 BlobStore 的两个库，VACUUM 后对比文件大小。
+
+用法示例：
+    python scripts/bench_blob_store.py --tasks 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.models.schemas import ListingTask, TaskStatus  # noqa: E402
+from app.tasks.executor import ListingTaskExecutor  # noqa: E402
+from app.tasks.repository import SQLiteTaskRepository  # noqa: E402
+
+BATCH_SIZE = 1000
+
+
+def synthetic_payload(n: int) -> dict:
+    category = ("3C数码", "美妆", "家居", "服饰")[n % 4]
+    return {
+        "title": f"{category} | 合成商品 {n}｜高转化优化版",
+        "desc": f"这是一款面向{category}场景打造的商品（编号 {n}），主打高性价比与稳定品质。" * 3,
+        "tags": ["高性价比", category, f"tag{n % 50}"],
+        "sale_price": 39.9 + n % 10,
+        "cost_price": 19.9,
+        "sku_list": [{"name": "标准版", "stock": 100}, {"name": "升级版", "stock": 100}],
+        "images": [],
+    }
+
+
+def fill(repo: SQLiteTaskRepository, tasks: int) -> None:
+    for start in range(0, tasks, BATCH_SIZE):
+        with repo.transaction() as uow:
+            for n in range(start, min(start + BATCH_SIZE, tasks)):
+                pack = ListingTaskExecutor.build_pack(f"product-{n}", synthetic_payload(n))
+                snapshot = pack.model_dump()
+                task = ListingTask.create(pack.product_id, pack.version, snapshot, "auto_device")
+                create_res = {
+                    "success": True,
+                    "mode": "auto_device",
+                    "action": "create_product",
+                    "status": "done",
+                    "payload": pack.model_dump(),
+                    "data": {"item_id": f"auto_{n}"},
+                }
+                uow.log_step(task.task_id, "create_product", True, "商品创建完成", create_res, task.updated_at)
+                uow.save_step(task_id=task.task_id, step_name="create_product", status="done", updated_at=task.updated_at)
+                task.status = TaskStatus.wait_manual_confirm
+                task.output = {"create": create_res, "item_id": f"auto_{n}", "manual_confirm_required": True}
+                uow.save_task(task)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="BlobStore 去重压缩的库体积测量")
+    parser.add_argument("--tasks", type=int, default=100_000, help="合成任务数")
+    parser.add_argument("--threshold", type=int, default=512, help="BlobStore 阈值（字节）")
+    args = parser.parse_args()
+
+    sizes: dict[str, int] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, threshold in (("plain", None), ("blob", args.threshold)):
+            db_path = Path(tmp) / f"{label}.db"
+            repo = SQLiteTaskRepository(str(db_path), blob_threshold_bytes=threshold)
+            started = time.perf_counter()
+            fill(repo, args.tasks)
+            elapsed = time.perf_counter() - started
+            conn = repo._connect()
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            conn.execute("VACUUM")
+            repo.close()
+            sizes[label] = db_path.stat().st_size
+            print(f"{label:>5}: {args.tasks} 个任务 写入 {elapsed:.1f}s，库大小 {sizes[label] / 1024 / 1024:.1f} MiB")
+
+    print(f"体积缩减: {(1 - sizes['blob'] / sizes['plain']) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+多设备池吞吐基准：同一批上架任务分别在 1/2/4/... 台（模拟）设备上执行
+
+每台模拟设备执行一个设备步骤耗时 --step-ms（模拟真机上填表、截图的耗时），同一设备同一时刻只执行一个步骤；
+执行器按设备数放开任务并发，对比吞吐随设备数的增长。任务数据写入临时 SQLite 库。
+
+用法示例：
+    python scripts/bench_device_pool.py --tasks 48 --step-ms 100 --devices 1 2 4 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.channels.device_auto import DeviceAutoChannel  # noqa: E402
+from app.channels.device_pool import DevicePool, current_device  # noqa: E402
+from app.models.schemas import ListingTask  # noqa: E402
+from app.tasks.executor import ListingTaskExecutor  # noqa: E402
+from app.tasks.repository import SQLiteTaskRepository  # noqa: E402
+
+
+class SimulatedDevice:
+    """只实现设备池用到的接口；busy 用于确认同一设备上没有并发操作。"""
+
+    def __init__(self, device_id: str) -> None:
+        self.device_id = device_id
+        self.busy = threading.Lock()
+
+    def health(self) -> dict:
+        return {"ok": True, "stdout": "device", "stderr": ""}
+
+    def close(self) -> None:
+        pass
+
+
+class SimulatedChannel(DeviceAutoChannel):
+    def __init__(self, step_seconds: float) -> None:
+        super().__init__(device_id="bench-default")
+        self.step_seconds = step_seconds
+
+    def create_product(self, payload: dict) -> dict:
+        lease = current_device()
+        assert lease is not None
+        if not lease.client.busy.acquire(blocking=False):
+            raise RuntimeError(f"设备 {lease.device_id} 被并发使用")
+        try:
+            time.sleep(self.step_seconds)
+        finally:
+            lease.client.busy.release()
+        return super().create_product(payload)
+
+
+def run(devices: int, tasks: int, step_seconds: float, db_path: str) -> float:
+    pool = DevicePool([f"emulator-{5554 + 2 * n}" for n in range(devices)], client_factory=SimulatedDevice)
+    executor = ListingTaskExecutor(
+        SimulatedChannel(step_seconds),
+        SQLiteTaskRepository(db_path),
+        max_workers=devices,
+        channel_limit=devices,
+        device_pool=pool,
+    )
+    items = []
+    for n in range(tasks):
+        pack = ListingTaskExecutor.build_pack(f"p{n}", {"title": f"商品{n}", "desc": "d", "sale_price": 1, "cost_price": 1})
+        items.append((ListingTask.create(pack.product_id, pack.version, pack.model_dump(), "auto_device"), pack.freeze()))
+    started = time.perf_counter()
+    results = executor.execute_many(items)
+    elapsed = time.perf_counter() - started
+    executor.close()
+    failed = [task.task_id for task in results if task.output.get("error")]
+    if failed:
+        raise SystemExit(f"{len(failed)} 个任务失败: {results[0].output.get('error')}")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="多设备池吞吐基准")
+    parser.add_argument("--tasks", type=int, default=48, help="任务数")
+    parser.add_argument("--step-ms", type=float, default=100.0, help="每个设备步骤的模拟耗时（毫秒）")
+    parser.add_argument("--devices", type=int, nargs="+", default=[1, 2, 4, 8], help="依次测试的设备数")
+    args = parser.parse_args()
+
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for devices in args.devices:
+            elapsed = run(devices, args.tasks, args.step_ms / 1000, str(Path(tmp) / f"bench_{devices}.db"))
+            throughput = args.tasks / elapsed
+            baseline = baseline or throughput / devices
+            print(
+                f"{devices:>3} 台设备: {args.tasks} 个任务 / {elapsed:.3f}s = {throughput:,.1f} 任务/s  "
+                f"加速比={throughput / baseline:.2f}x（理想 {devices}x）"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+批量队列中模型对象的内存占用测量
+
+在 deque 中放入 N 个待执行条目（ListingTask + 其 ListingPack），对比：
+  legacy：原先无 __slots__ 的 dataclass，input_snapshot 与通道 payload 各自调用一次 model_dump；
+  slotted：slots=True 的 ListingTask + 冻结的 FrozenListingPack，两处共用同一个缓存的只读 model_dump 视图。
+字符串内容在两组间共享，只测量对象结构本身的开销（tracemalloc 统计）。
+
+用法示例：
+    python scripts/bench_model_memory.py --tasks 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.models.schemas import FrozenListingPack, ListingTask, TaskStatus  # noqa: E402
+
+TITLE = "3C数码 | 便携风扇｜高转化优化版"
+DESC = "这是一款面向3C数码场景打造的商品，主打高性价比与稳定品质。"
+CHECKLIST = ("标题已自动填充", "SKU已自动填充", "库存已自动填充", "价格已自动填充")
+NOW = "2026-01-01T00:00:00+00:00"
+
+
+@dataclass
+class LegacyListingPack:
+    product_id: str
+    title: str
+    desc: str
+    tags: list[str]
+    sale_price: float
+    cost_price: float
+    sku_list: list[dict[str, str | int]]
+    images: list[str] = field(default_factory=list)
+    checklist: list[str] = field(default_factory=list)
+    version: str = "v1"
+
+    def model_dump(self) -> dict:
+        return {
+            "product_id": self.product_id,
+            "title": self.title,
+            "desc": self.desc,
+            "tags": self.tags,
+            "sale_price": self.sale_price,
+            "cost_price": self.cost_price,
+            "sku_list": self.sku_list,
+            "images": self.images,
+            "checklist": self.checklist,
+            "version": self.version,
+        }
+
+
+@dataclass
+class LegacyListingTask:
+    task_id: str
+    product_id: str
+    status: TaskStatus
+    listing_pack_version: str
+    input_snapshot: dict
+    channel: str
+    created_at: str
+    updated_at: str
+    output: dict = field(default_factory=dict)
+
+
+def legacy_entry(n: int) -> Any:
+    pack = LegacyListingPack(f"product-{n}", TITLE, DESC, ["高性价比", "3C数码"], 39.9, 19.9, [{"name": "标准版", "stock": 100}], [], list(CHECKLIST))
+    task = LegacyListingTask(f"task-{n}", pack.product_id, TaskStatus.drafted, pack.version, pack.model_dump(), "auto_device", NOW, NOW)
+    return task, pack, pack.model_dump()
+
+
+def slotted_entry(n: int) -> Any:
+    pack = FrozenListingPack(f"product-{n}", TITLE, DESC, ("高性价比", "3C数码"), 39.9, 19.9, ({"name": "标准版", "stock": 100},), (), CHECKLIST)
+    task = ListingTask(f"task-{n}", pack.product_id, TaskStatus.drafted, pack.version, pack.model_dump(), "auto_device", NOW, NOW)
+    return task, pack, pack.model_dump()
+
+
+def measure(build: Callable[[int], Any], tasks: int) -> tuple[int, float]:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    queue = deque(build(n) for n in range(tasks))
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del queue
+    gc.collect()
+    return current, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="批量队列中模型对象的内存占用测量")
+    parser.add_argument("--tasks", type=int, default=1_000_000, help="队列中的任务数")
+    args = parser.parse_args()
+
+    results: dict[str, int] = {}
+    for label, build in (("legacy", legacy_entry), ("slotted", slotted_entry)):
+        used, elapsed = measure(build, args.tasks)
+        results[label] = used
+        print(f"{label:>7}: {args.tasks} 个任务 占用 {used / 1024 / 1024:.1f} MiB（{used / args.tasks:.0f} B/任务），构造 {elapsed:.1f}s")
+    print(f"内存节省: {(1 - results['slotted'] / results['legacy']) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
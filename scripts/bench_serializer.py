@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+JSON 序列化后端微基准
+
+对比 stdlib json 旧写法（model_dump() + json.dumps(ensure_ascii=False)）与
+app.models.serializer 各已安装后端（直接编码 dataclass）在 ListingTask、ListingPack
+与 create_product 日志 payload 上的编码/解码耗时。
+
+用法示例：
+    python scripts/bench_serializer.py --rounds 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import timeit
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.models.schemas import ListingPack, ListingTask, TaskStatus  # noqa: E402
+from app.models.serializer import available_backends, build_serializer  # noqa: E402
+from app.tasks.executor import ListingTaskExecutor  # noqa: E402
+
+
+def sample_objects() -> dict[str, tuple[Any, Callable[[], Any]]]:
+    """返回 名称 -> (直接编码的对象, 旧写法需要先构造的 dict)。"""
+    pack = ListingTaskExecutor.build_pack(
+        "product-1",
+        {
+            "title": "3C数码 | 便携风扇｜高转化优化版",
+            "desc": "这是一款面向3C数码场景打造的商品，主打高性价比与稳定品质。" * 3,
+            "tags": ["高性价比", "3C数码", "静音"],
+            "sale_price": 39.9,
+            "cost_price": 19.9,
+            "sku_list": [{"name": "标准版", "stock": 100}, {"name": "升级版", "stock": 100}],
+            "images": [],
+        },
+    )
+    create_res = {
+        "success": True,
+        "mode": "auto_device",
+        "action": "create_product",
+        "status": "done",
+        "payload": pack.model_dump(),
+        "data": {"item_id": "auto_1"},
+    }
+    task = ListingTask.create(pack.product_id, pack.version, pack.model_dump(), "auto_device")
+    task.status = TaskStatus.wait_manual_confirm
+    task.output = {"create": create_res, "item_id": "auto_1", "manual_confirm_required": True}
+    return {
+        "ListingPack": (pack, pack.model_dump),
+        "ListingTask": (task, task.model_dump),
+        "log payload": (create_res, lambda: create_res),
+    }
+
+
+def bench(label: str, fn: Callable[[], Any], rounds: int) -> float:
+    seconds = min(timeit.repeat(fn, number=rounds, repeat=3))
+    per_op = seconds / rounds * 1e6
+    print(f"  {label:<28} {per_op:8.2f} µs/op")
+    return per_op
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="JSON 序列化后端微基准")
+    parser.add_argument("--rounds", type=int, default=20_000, help="每项测量的循环次数")
+    args = parser.parse_args()
+
+    objects = sample_objects()
+    backends = available_backends()
+    print(f"已安装后端: {', '.join(backends)}")
+    for name, (value, as_dict) in objects.items():
+        print(f"{name}（{len(json.dumps(as_dict(), ensure_ascii=False).encode('utf-8'))} 字节）")
+        legacy_text = json.dumps(as_dict(), ensure_ascii=False)
+        baseline = bench("legacy dumps", lambda: json.dumps(as_dict(), ensure_ascii=False), args.rounds)
+        bench("legacy loads", lambda: json.loads(legacy_text), args.rounds)
+        for backend in backends:
+            codec = build_serializer(backend)
+            text = codec.dumps(value)
+            per_op = bench(f"{backend} dumps", lambda: codec.dumps(value), args.rounds)
+            bench(f"{backend} loads", lambda: codec.loads(text), args.rounds)
+            print(f"  {'':<28} dumps 加速 {baseline / per_op:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
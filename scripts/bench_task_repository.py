@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+SQLiteTaskRepository 多线程写入基准
+
+对比两种连接策略在多个写线程下的 writes/sec：
+- legacy：每次调用新建连接，默认回滚日志模式（重构前的行为）
+- pooled：按线程复用长连接，WAL + synchronous=NORMAL + busy_timeout
+
+用法示例：
+    python scripts/bench_task_repository.py --threads 4 --writes 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.tasks.repository import SQLiteTaskRepository  # noqa: E402
+
+
+class LegacyTaskRepository(SQLiteTaskRepository):
+    """复刻重构前的连接方式：每次调用 sqlite3.connect，且不设置任何 PRAGMA。"""
+
+    def _open_connection(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000)
+
+    def _connect(self) -> sqlite3.Connection:
+        return self._open_connection()
+
+
+def run_writers(repo: SQLiteTaskRepository, threads: int, writes: int) -> float:
+    now = datetime.now(timezone.utc).isoformat()
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(worker_id: int) -> None:
+        barrier.wait()
+        for i in range(writes):
+            repo.save_step(
+                task_id=f"bench-{worker_id}",
+                step_name=f"step-{i}",
+                status="done",
+                updated_at=now,
+            )
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SQLiteTaskRepository 多线程写入基准")
+    parser.add_argument("--threads", type=int, default=4, help="写线程数")
+    parser.add_argument("--writes", type=int, default=500, help="每个线程的写入次数")
+    args = parser.parse_args()
+
+    total = args.threads * args.writes
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, repo_cls in (("legacy", LegacyTaskRepository), ("pooled", SQLiteTaskRepository)):
+            repo = repo_cls(str(Path(tmp) / f"{label}.db"), busy_timeout_ms=30000)
+            elapsed = run_writers(repo, args.threads, args.writes)
+            repo.close()
+            print(f"{label:>7}: {total} 次写入 / {elapsed:.3f}s = {total / elapsed:,.0f} writes/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+界面层级解析与元素查找耗时基准
+
+生成含 --nodes 个节点的 uiautomator dump（结构与真机输出一致，按 --depth 层嵌套），分别统计
+iterparse 解析并建索引的耗时，以及在缓存的索引上按 text / resource-id 精确查找和按文本子串查找的耗时。
+
+用法示例：
+    python scripts/bench_ui_hierarchy.py --nodes 1500 --lookups 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.analytics.latency import QuantileSketch  # noqa: E402
+from app.channels.ui_hierarchy import extract_hierarchy_xml, parse_hierarchy  # noqa: E402
+
+
+def build_dump(nodes: int, depth: int) -> bytes:
+    lines = ["<?xml version='1.0' encoding='UTF-8' standalone='yes' ?><hierarchy rotation=\"0\">"]
+    open_nodes = 0
+    for n in range(nodes):
+        top = 40 * (n % 50)
+        attrs = (
+            f'index="{n}" text="条目{n}" resource-id="com.xingin.xhs:id/item_{n}" class="android.widget.TextView" '
+            f'package="com.xingin.xhs" content-desc="" clickable="true" enabled="true" bounds="[0,{top}][1080,{top + 40}]"'
+        )
+        if open_nodes < depth and n % 3 == 0:
+            lines.append(f"<node {attrs}>")
+            open_nodes += 1
+        else:
+            lines.append(f"<node {attrs} />")
+        if open_nodes and n % 7 == 6:
+            lines.append("</node>")
+            open_nodes -= 1
+    lines.extend(["</node>"] * open_nodes)
+    lines.append("</hierarchy>\nUI hierchary dumped to: /dev/tty\n")
+    return "\n".join(lines).encode()
+
+
+def timed(label: str, calls: int, func) -> None:
+    sketch = QuantileSketch()
+    for n in range(calls):
+        started = time.perf_counter()
+        func(n)
+        sketch.add((time.perf_counter() - started) * 1000)
+    summary = sketch.summary()
+    print(f"{label:>18}: p50={summary['p50']}ms p95={summary['p95']}ms p99={summary['p99']}ms（{calls} 次）")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="界面层级解析与元素查找耗时基准")
+    parser.add_argument("--nodes", type=int, default=1500, help="dump 中的节点数")
+    parser.add_argument("--depth", type=int, default=20, help="最大嵌套层数")
+    parser.add_argument("--parses", type=int, default=50, help="解析次数")
+    parser.add_argument("--lookups", type=int, default=10000, help="精确查找次数")
+    args = parser.parse_args()
+
+    dump = build_dump(args.nodes, args.depth)
+    print(f"dump 大小 {len(dump) / 1024:.1f} KiB，{args.nodes} 个节点")
+    timed("解析+建索引", args.parses, lambda _: parse_hierarchy(extract_hierarchy_xml(dump)))
+
+    index = parse_hierarchy(extract_hierarchy_xml(dump))
+    nodes = args.nodes
+    timed("按 text 查找", args.lookups, lambda n: index.find(text=f"条目{n % nodes}"))
+    timed("按 resource-id 查找", args.lookups, lambda n: index.find(resource_id=f"com.xingin.xhs:id/item_{n % nodes}"))
+    timed("文本子串查找", max(1, args.lookups // 100), lambda n: index.find(text=f"目{nodes - 1 - n % nodes}", contains=True))
+
+
+if __name__ == "__main__":
+    main()
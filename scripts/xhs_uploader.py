@@ -24,9 +24,11 @@ from typing import Optional
 # 导入android_controller的工具函数
 from android_controller import (
     run_adb_command, get_devices, tap, swipe, input_text, press_key,
-    take_screenshot, start_app, get_screen_size, XHS_PACKAGE, XHS_ACTIVITY,
-    OUTPUT_DIR
+    capture_screen_frame, start_app, get_screen_size, XHS_PACKAGE, XHS_ACTIVITY,
+    OUTPUT_DIR, UI
 )
+from app.channels.artifacts import ArtifactStore
+from app.channels.ui_hierarchy import UiDumpError
 
 
 # ==================== 配置 ====================
@@ -40,6 +42,10 @@ EMULATOR_PORT = 5555
 SCREENSHOT_DIR = OUTPUT_DIR / "uploader"
 SCREENSHOT_DIR.mkdir(parents=True, exist_ok=True)
 
+# 截图存储：本次运行的截图按 RUN_ID 分片，界面无变化的截图去重，只保存缩略图，后台线程写盘
+RUN_ID = time.strftime("%Y%m%d_%H%M%S")
+ARTIFACTS = ArtifactStore(SCREENSHOT_DIR)
+
 
 # ==================== 工具函数 ====================
 
@@ -66,11 +72,10 @@ def wait_for_app_running(package: str, timeout: int = 10) -> bool:
     return False
 
 
-def capture_and_save(name: str) -> str:
-    """截图并保存"""
-    timestamp = time.strftime("%Y%m%d_%H%M%S")
-    filename = f"{name}_{timestamp}.png"
-    return take_screenshot(filename)
+def capture_and_save(name: str, failed: bool = False) -> str:
+    """截图并保存到截图存储（failed=True 时额外保留全分辨率 PNG），返回文件路径"""
+    record = ARTIFACTS.put(capture_screen_frame(), RUN_ID, name, keep_full=failed)
+    return str(ARTIFACTS.absolute(record.path))
 
 
 # ==================== 小红书操作 ====================
@@ -89,23 +94,27 @@ def open_xhs_app() -> bool:
     return True
 
 
-def find_and_click_by_text(text: str, timeout: int = 10) -> bool:
-    """通过文本查找并点击（需要UI Automator）"""
-    # 使用uiautomator查找元素
-    cmd = [
-        "shell", "uiautomator", "dump", "/sdcard/window_dump.xml"
-    ]
-    run_adb_command(cmd)
-    time.sleep(1)
-    
-    # 拉取XML分析
-    local_xml = SCREENSHOT_DIR / "window_dump.xml"
-    run_adb_command(["pull", "/sdcard/window_dump.xml", str(local_xml)])
-    
-    # 简单解析XML查找文本（这里简化处理，实际需要更复杂的解析）
-    # 实际实现可以使用 uiautomatorviewer 或 Android SDK tools
+def find_and_click_by_text(text: str, timeout: float = 10, contains: bool = False) -> bool:
+    """按文本（或 content-desc）在界面层级中查找元素并点击其中心；超时未出现返回 False"""
     print(f"查找文本: {text}")
-    return False
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            index = UI.index()
+            node = index.find(text=text, contains=contains) or index.find(content_desc=text, contains=contains)
+        except UiDumpError as e:
+            print(f"界面层级获取失败: {e}")
+            node = None
+        if node is not None:
+            x, y = node.center
+            print(f"找到 '{text}' {node.bounds}，点击 ({x}, {y})")
+            return tap(x, y)
+        if time.monotonic() >= deadline:
+            print(f"未找到文本: {text}")
+            return False
+        # 界面可能仍在加载：稍后重新获取层级
+        time.sleep(0.5)
+        UI.invalidate()
 
 
 def click_at_ratio(x_ratio: float, y_ratio: float) -> bool:
@@ -117,6 +126,13 @@ def click_at_ratio(x_ratio: float, y_ratio: float) -> bool:
     return tap(x, y)
 
 
+def click_text_or_ratio(text: str, x_ratio: float, y_ratio: float) -> bool:
+    """优先点击当前界面中文本匹配的元素，找不到时退回按屏幕比例点击"""
+    if find_and_click_by_text(text, timeout=0):
+        return True
+    return click_at_ratio(x_ratio, y_ratio)
+
+
 def wait_and_sleep(seconds: float):
     """等待指定秒数"""
     print(f"等待 {seconds} 秒...")
@@ -141,9 +157,8 @@ def navigate_to_publish_page() -> bool:
     capture_and_save("publish_menu")
     
     # 2. 选择"发布商品"选项
-    # 这里需要根据实际界面调整坐标
-    # 常见位置大约在中间偏下
-    click_at_ratio(0.5, 0.7)
+    # 找不到文本时按常见位置（中间偏下）点击
+    click_text_or_ratio("发布商品", 0.5, 0.7)
     wait_and_sleep(3)
     
     capture_and_save("publish_page")
@@ -212,7 +227,7 @@ def add_product_images() -> bool:
     
     # 2. 选择图片（从相册）
     # 点击"相册"选项
-    click_at_ratio(0.3, 0.8)
+    click_text_or_ratio("相册", 0.3, 0.8)
     wait_and_sleep(2)
     
     # 3. 选择第一张图片
@@ -255,14 +270,14 @@ def publish_product() -> bool:
     
     # 1. 点击发布/提交按钮
     # 通常在底部
-    click_at_ratio(0.5, 0.92)
+    click_text_or_ratio("发布", 0.5, 0.92)
     wait_and_sleep(3)
     
     capture_and_save("published")
     
     # 2. 可能需要确认发布
     # 点击确认
-    click_at_ratio(0.7, 0.8)
+    click_text_or_ratio("确认", 0.7, 0.8)
     wait_and_sleep(5)
     
     capture_and_save("confirm_publish")
@@ -294,11 +309,13 @@ def auto_publish_product(
     
     # 导航到发布页
     if not navigate_to_publish_page():
+        capture_and_save("navigate_failed", failed=True)
         return False
     
     # 填写商品信息
     if not fill_product_info(title, description, price, stock, category):
         print("警告: 填写信息可能有问题")
+        capture_and_save("fill_failed", failed=True)
     
     # 添加图片
     if add_images:
@@ -311,6 +328,7 @@ def auto_publish_product(
     # 发布
     if not publish_product():
         print("警告: 发布可能有问题")
+        capture_and_save("publish_failed", failed=True)
     
     print("=" * 50)
     print("上架流程完成")
@@ -0,0 +1,40 @@
+import stat
+import sys
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+_FAKE_ADB = """#!{python}
+import os, subprocess, sys
+args = sys.argv[1:]
+if args[:1] == ["-s"]:
+    args = args[2:]
+os.environ["PATH"] = {bin_dir!r} + os.pathsep + os.environ["PATH"]
+if args[:1] not in (["shell"], ["exec-out"]):
+    print("device")
+    sys.exit(0)
+if args[1:]:
+    sys.exit(subprocess.call(["/bin/sh", "-c", " ".join(args[1:])]))
+os.execv("/bin/sh", ["/bin/sh"])
+"""
+
+
+def _executable(path: Path, content: str) -> str:
+    path.write_text(content)
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return str(path)
+
+
+@pytest.fixture
+def fake_adb(tmp_path) -> Callable[[dict[str, str]], str]:
+    """返回创建假 adb 的函数：本机 /bin/sh 扮演设备端，commands 为放进“设备端” PATH 的 sh 脚本（名称 -> 内容）。"""
+
+    def make(commands: dict[str, str]) -> str:
+        bin_dir = tmp_path / "bin"
+        bin_dir.mkdir(exist_ok=True)
+        for name, script in commands.items():
+            _executable(bin_dir / name, f"#!/bin/sh\n{script}\n")
+        return _executable(tmp_path / "adb", _FAKE_ADB.format(python=sys.executable, bin_dir=str(bin_dir)))
+
+    return make
@@ -0,0 +1,63 @@
+import os
+import subprocess
+
+import pytest
+
+from app.channels.adb_shell import AdbSessionError, AdbShellSession, ShellResult
+from app.channels.android_device_client import AndroidDeviceClient
+
+@pytest.fixture
+def adb(fake_adb, tmp_path) -> str:
+    """input 命令只把参数记到 input.log。"""
+    return fake_adb({"input": f'echo "$@" >> {tmp_path / "input.log"}'})
+
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="假 adb 依赖 /bin/sh")
+
+
+def test_session_output_matches_one_shot_shell(adb) -> None:
+    commands = ["echo hello", "printf 'a\\nb'", "printf 'x\\n\\n'", "echo oops >&2; false", "cat; echo after"]
+    with AdbShellSession(adb, "emulator-5554") as session:
+        results = [session.run(command) for command in commands]
+        # 引号不配对只让这一条命令报语法错误，exit 也只退出这一条命令，会话不受影响。
+        unbalanced = session.run("echo 'unbalanced")
+        assert unbalanced.returncode != 0 and "unbalanced" not in unbalanced.stdout
+        assert session.run("exit 7") == ShellResult(7, "")
+        assert session.run("echo still here").stdout == "still here\n"
+        assert session.connects == 1
+
+    expected = [subprocess.run([adb, "shell", command], capture_output=True, text=True) for command in commands]
+    # 会话中 stderr 合并进 stdout；cat 读到的是 /dev/null，不会吞掉后续命令。
+    assert [(r.returncode, r.stdout) for r in results] == [(e.returncode, e.stdout + e.stderr) for e in expected]
+    assert results[3] == ShellResult(1, "oops\n") and results[4].stdout == "after\n"
+
+
+def test_session_reconnects_after_process_loss_and_timeout(adb) -> None:
+    session = AdbShellSession(adb, "emulator-5554")
+    try:
+        assert session.run("echo 1").stdout == "1\n"
+        session._proc.kill()
+        session._proc.wait()
+        assert session.run("echo 2").stdout == "2\n"
+
+        with pytest.raises(AdbSessionError):
+            session.run("kill -9 $PPID")
+        with pytest.raises(subprocess.TimeoutExpired):
+            session.run("sleep 5", timeout=0.2)
+        assert session.run("echo 3").stdout == "3\n"
+        assert session.connects == 4
+    finally:
+        session.close()
+
+
+def test_device_client_routes_shell_commands_through_session(adb, tmp_path) -> None:
+    client = AndroidDeviceClient("emulator-5554", adb_path=adb, artifact_dir=str(tmp_path / "art"), shell_session=True)
+    try:
+        assert client.tap(10, 20) and client.input_text("a b")
+        assert client.health()["ok"]
+        assert client.shell.connects == 1
+    finally:
+        client.close()
+
+    assert (tmp_path / "input.log").read_text().splitlines() == ["tap 10 20", "text a%sb"]
+    assert client.latency.summary()["shell input"]["count"] == 2
@@ -0,0 +1,122 @@
+import os
+import struct
+import threading
+
+import pytest
+
+from app.channels.android_device_client import AndroidDeviceClient
+from app.channels.artifacts import ArtifactStore, artifact_scope, dhash, downscale, hamming
+from app.channels.device_auto import DeviceAutoChannel
+from app.channels.screencap import PNG_SIGNATURE, RGBA_8888, ScreenFrame
+
+
+def _gradient(width: int = 40, height: int = 20, reverse: bool = False) -> ScreenFrame:
+    pixels = bytearray()
+    for _ in range(height):
+        for x in range(width):
+            level = 255 - x * 6 if reverse else x * 6
+            pixels += bytes([level, level, level, 255])
+    return ScreenFrame(width, height, RGBA_8888, bytes(pixels))
+
+
+def _touch_pixel(frame: ScreenFrame) -> ScreenFrame:
+    pixels = bytearray(frame.pixels)
+    pixels[0] ^= 0x01
+    return ScreenFrame(frame.width, frame.height, frame.pixel_format, bytes(pixels))
+
+
+def test_dhash_tolerates_small_changes_and_downscale_keeps_aspect() -> None:
+    frame = _gradient()
+
+    assert hamming(dhash(frame), dhash(_touch_pixel(frame))) == 0
+    assert hamming(dhash(frame), dhash(_gradient(reverse=True))) > 32
+    small = downscale(frame, 10)
+    assert (small.width, small.height) == (10, 5)
+    assert len(small.pixels) == 10 * 5 * 4
+    assert downscale(frame, 100) is frame
+
+
+def test_store_deduplicates_and_shards_by_task(tmp_path) -> None:
+    store = ArtifactStore(tmp_path, thumbnail_width=10, thumbnail_format="png")
+    first = store.put(_gradient(), "task-abc", "create_product")
+    near = store.put(_touch_pixel(_gradient()), "task-abc", "set_product_online")
+    other = store.put(_gradient(reverse=True), "task-abc", "set_product_online")
+    other_task = store.put(_gradient(), "task-xyz", "create_product")
+    store.flush()
+
+    assert first.path.startswith("ta/task-abc/") and first.path.endswith(".png")
+    assert near.path == first.path and near.deduplicated
+    assert other.path != first.path
+    assert other_task.path.startswith("ta/task-xyz/")
+    assert (store.saved, store.deduplicated, store.write_errors) == (3, 1, 0)
+    thumbnail = store.absolute(first.path).read_bytes()
+    assert thumbnail.startswith(PNG_SIGNATURE)
+    assert struct.unpack_from(">II", thumbnail, 16) == (10, 5)
+
+    manifest = store.manifest("task-abc")
+    assert [record.step_name for record in manifest] == ["create_product", "set_product_online", "set_product_online"]
+    assert store.resolve(first.path) == first
+    assert store.resolve("ta/task-abc/missing.png") is None
+    store.close()
+
+
+def test_failed_step_keeps_full_resolution_frame(tmp_path) -> None:
+    store = ArtifactStore(tmp_path, thumbnail_width=10, thumbnail_format="png")
+    thumbnail = store.put(_gradient(), "task-1", "create_product")
+    full = store.put(_gradient(), "task-1", "create_product", keep_full=True)
+    store.close()
+
+    assert full.kind == "full" and not full.deduplicated
+    assert full.path.endswith(".full.png") and full.path != thumbnail.path
+    assert struct.unpack_from(">II", store.absolute(full.path).read_bytes(), 16) == (40, 20)
+    assert not list(tmp_path.rglob("*.part"))
+
+
+@pytest.mark.skipif(os.name != "posix", reason="假 adb 依赖 /bin/sh")
+def test_device_channel_snapshots_into_task_shard(fake_adb, tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    frame = _gradient()
+    (tmp_path / "frame.raw").write_bytes(struct.pack("<III", frame.width, frame.height, RGBA_8888) + frame.pixels)
+    adb = fake_adb({"screencap": f"cat {tmp_path / 'frame.raw'}", "am": "exit 0"})
+    store = ArtifactStore(tmp_path / "store", thumbnail_format="png")
+    channel = DeviceAutoChannel("emulator-5554", dry_run=False, artifact_store=store)
+    channel.client = AndroidDeviceClient("emulator-5554", adb_path=adb, artifact_dir=str(tmp_path / "art"))
+
+    with artifact_scope("9f3c", "create_product"):
+        result = channel.create_product({"title": "t"})
+    adhoc = channel.set_product_online("item-1")
+    store.flush()
+
+    assert result["artifacts"][0].startswith("9f/9f3c/")
+    assert store.resolve(result["artifacts"][0]).step_name == "create_product"
+    assert adhoc["artifacts"][0].startswith("ad/adhoc/")
+
+
+def test_failed_write_is_recorded_and_frame_saved_again(tmp_path, monkeypatch) -> None:
+    store = ArtifactStore(tmp_path, thumbnail_width=10, thumbnail_format="png")
+    write_file = store._write_file
+    failures = [OSError("disk full")]
+    queued = threading.Event()
+
+    def flaky_write(record, frame) -> None:
+        if failures:
+            # 等两帧都入队后再失败，第二帧必然按去重引用第一帧的文件。
+            queued.wait(5)
+            raise failures.pop()
+        write_file(record, frame)
+
+    monkeypatch.setattr(store, "_write_file", flaky_write)
+    lost = store.put(_gradient(), "task-1", "create_product")
+    duplicate = store.put(_gradient(), "task-1", "create_product")
+    queued.set()
+    store.flush()
+    # 写盘失败后该帧移出去重窗口，同一画面重新保存。
+    saved = store.put(_gradient(), "task-1", "set_product_online")
+    store.close()
+
+    assert duplicate.deduplicated and not saved.deduplicated and saved.path == lost.path
+    assert store.write_errors == 2
+    manifest = store.manifest("task-1")
+    assert [record.error for record in manifest] == ["disk full", f"去重引用的截图 {lost.path} 未落盘", None]
+    assert store.absolute(saved.path).exists()
+    assert store.resolve(saved.path).step_name == "set_product_online"
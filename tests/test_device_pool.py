@@ -0,0 +1,229 @@
+import subprocess
+import threading
+import time
+
+import pytest
+
+from app.analytics.latency import LatencyRecorder
+from app.channels.device_auto import DeviceAutoChannel
+from app.channels.device_pool import DevicePool, DeviceUnavailableError, current_device
+from app.models.schemas import ListingTask, TaskStatus
+from app.tasks.executor import ListingTaskExecutor
+from app.tasks.repository import SQLiteTaskRepository
+from app.tasks.retry import RetryPolicy
+
+
+class _StubClient:
+    def __init__(self, device_id: str) -> None:
+        self.device_id = device_id
+        self.ok = True
+        self.closed = False
+        self.latency = LatencyRecorder()
+
+    def health(self) -> dict:
+        return {"ok": self.ok, "stdout": "device" if self.ok else "", "stderr": ""}
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_pool_spreads_leases_and_prefers_previous_device() -> None:
+    pool = DevicePool(["a", "b", "c"], client_factory=_StubClient)
+
+    with pool.lease("t1") as first, pool.lease("t2") as second:
+        assert (first.device_id, second.device_id) == ("a", "b")
+        assert current_device() == second
+        # 偏好的设备被占用时不等待，直接用空闲设备。
+        with pool.lease("t3", prefer="a") as third:
+            assert third.device_id == "c"
+            with pytest.raises(DeviceUnavailableError):
+                with pool.lease("t4", timeout=0):
+                    pass
+        assert pool.metrics()["leased"] == 2
+    assert current_device() is None
+
+    with pool.lease("t5", prefer="b") as lease:
+        assert lease.device_id == "b"
+    assert [device["leases"] for device in pool.metrics()["devices"]] == [1, 2, 1]
+
+
+def test_failing_device_is_quarantined_and_probed_before_reuse() -> None:
+    now = [0.0]
+    pool = DevicePool(["a", "b"], failure_threshold=2, quarantine_seconds=10, clock=lambda: now[0], client_factory=_StubClient)
+    for _ in range(2):
+        with pytest.raises(ConnectionError), pool.lease("t1", prefer="a"):
+            raise ConnectionError("device offline")
+
+    with pool.lease("t2", prefer="a") as lease:
+        assert lease.device_id == "b"
+    assert pool.metrics()["quarantined"] == 1
+
+    # 隔离到期后先探测：探测失败则重新隔离，时长翻倍。
+    now[0] = 11
+    probe = pool._devices["a"].client
+    probe.ok = False
+    with pool.lease("t3", prefer="b") as held:
+        assert held.device_id == "b"
+        with pytest.raises(DeviceUnavailableError):
+            with pool.lease("t4", timeout=0):
+                pass
+    device = next(item for item in pool.metrics()["devices"] if item["device_id"] == "a")
+    assert device["state"] == "quarantined" and device["quarantines"] == 2
+    assert device["quarantine_remaining_seconds"] == 20
+
+    probe.ok = True
+    now[0] = 32
+    assert pool.check_health() == {"a": True, "b": True}
+    assert pool.metrics()["idle"] == 2
+    pool.close()
+    assert probe.closed
+
+
+def test_only_channel_failures_count_against_device() -> None:
+    pool = DevicePool(["a"], failure_threshold=2, client_factory=_StubClient)
+
+    with pytest.raises(ConnectionError), pool.lease("t1"):
+        raise ConnectionError("adb: device offline")
+    # 业务错误与设备健康无关：不计失败，也不清零此前的连续失败。
+    for _ in range(3):
+        with pytest.raises(ValueError), pool.lease("t2"):
+            raise ValueError("缺少必填字段")
+    assert pool.metrics()["devices"][0]["failures"] == 1
+    assert pool.metrics()["quarantined"] == 0
+
+    with pytest.raises(subprocess.TimeoutExpired), pool.lease("t3"):
+        raise subprocess.TimeoutExpired("adb", 30)
+    assert pool.metrics()["quarantined"] == 1
+
+
+def test_required_device_waits_for_it_and_never_substitutes() -> None:
+    now = [0.0]
+    pool = DevicePool(["a", "b"], failure_threshold=1, clock=lambda: now[0], client_factory=_StubClient)
+    pool._devices["b"].client.latency.record("shell input", 12.0)
+
+    with pool.lease("t1", require="a"):
+        # a 被占用时不会换到空闲的 b 上。
+        with pytest.raises(DeviceUnavailableError, match="设备 a"):
+            with pool.lease("t2", require="a", timeout=0):
+                pass
+    with pytest.raises(DeviceUnavailableError, match="不在设备池"):
+        with pool.lease("t3", require="zz"):
+            pass
+    with pytest.raises(TimeoutError), pool.lease("t4", require="a"):
+        raise TimeoutError("adb timed out")
+    with pytest.raises(DeviceUnavailableError, match="隔离中"):
+        with pool.lease("t5", require="a"):
+            pass
+
+    assert pool.latency()["b"]["shell input"]["count"] == 1
+    assert pool.latency()["a"] == {}
+
+
+class _RecordingChannel(DeviceAutoChannel):
+    def __init__(self) -> None:
+        super().__init__(device_id="default-device")
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def create_product(self, payload: dict) -> dict:
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            time.sleep(0.03)
+            return super().create_product(payload)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def test_executor_spreads_device_steps_across_pool(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    pool = DevicePool(["emu-1", "emu-2", "emu-3"], client_factory=_StubClient)
+    channel = _RecordingChannel()
+    executor = ListingTaskExecutor(channel, repo, max_workers=6, channel_limit=6, device_pool=pool)
+    items = []
+    for n in range(6):
+        pack = ListingTaskExecutor.build_pack(f"p{n}", {"title": f"商品{n}", "desc": "d", "sale_price": 1, "cost_price": 1})
+        items.append((ListingTask.create(pack.product_id, pack.version, pack.model_dump(), "auto_device"), pack.freeze()))
+
+    results = executor.execute_many(items)
+
+    assert all(task.status == TaskStatus.wait_manual_confirm for task in results)
+    # 同时在执行的设备步骤不超过设备数，且每台设备都分到了任务。
+    assert channel.peak == 3
+    used = {task.output["device_id"] for task in results}
+    assert used == {"emu-1", "emu-2", "emu-3"}
+    for task in results:
+        (step,) = repo.list_steps(task.task_id)
+        assert step["device_id"] == task.output["device_id"] == task.output["create"]["device_id"]
+
+    # 发布步骤严格沿用填写草稿的那台设备。
+    for outcome in executor.confirm_many([task.task_id for task in results]):
+        assert outcome["ok"]
+    for task in results:
+        steps = {step["step_name"]: step["device_id"] for step in repo.list_steps(task.task_id)}
+        assert steps["set_product_online"] == steps["create_product"]
+
+
+class _FlakyDeviceChannel(DeviceAutoChannel):
+    def __init__(self, broken: str) -> None:
+        super().__init__(device_id="default-device")
+        self.broken = broken
+        self.calls: list[str] = []
+
+    def create_product(self, payload: dict) -> dict:
+        device_id = current_device().device_id
+        self.calls.append(device_id)
+        if device_id == self.broken:
+            raise TimeoutError(f"{device_id} adb timed out")
+        return super().create_product(payload)
+
+
+def test_breaker_is_per_device_and_open_device_is_skipped_on_retry(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    pool = DevicePool(["a", "b"], failure_threshold=100, client_factory=_StubClient)
+    channel = _FlakyDeviceChannel(broken="a")
+    executor = ListingTaskExecutor(
+        channel,
+        repo,
+        retry_policy=RetryPolicy(max_attempts=3, base_delay=0),
+        breaker_threshold=2,
+        sleep=lambda _: None,
+        device_pool=pool,
+    )
+
+    for n in range(4):
+        pack = ListingTaskExecutor.build_pack(f"p{n}", {"title": f"商品{n}", "desc": "d", "sale_price": 1, "cost_price": 1})
+        task = executor.execute(ListingTask.create(pack.product_id, pack.version, pack.model_dump(), "auto_device"), pack.freeze())
+        assert task.status == TaskStatus.wait_manual_confirm and task.output["device_id"] == "b"
+
+    # a 熔断后不再在 a 上执行，b 的熔断器不受影响。
+    assert channel.calls.count("a") == 2
+    assert executor.breaker("auto_device", "a").state == "open"
+    assert executor.breaker("auto_device", "b").state == "closed"
+
+
+def test_open_device_breaker_is_not_counted_as_device_failure(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    pool = DevicePool(["a"], failure_threshold=1, lease_timeout=1, client_factory=_StubClient)
+    channel = _FlakyDeviceChannel(broken="b")
+    executor = ListingTaskExecutor(
+        channel,
+        repo,
+        retry_policy=RetryPolicy(max_attempts=2, base_delay=0),
+        breaker_threshold=1,
+        sleep=lambda _: None,
+        device_pool=pool,
+    )
+    executor.breaker("auto_device", "a").record_failure()
+    pack = ListingTaskExecutor.build_pack("p1", {"title": "t", "desc": "d", "sale_price": 1, "cost_price": 1})
+
+    task = executor.execute(ListingTask.create("p1", pack.version, pack.model_dump(), "auto_device"), pack)
+
+    assert task.status == TaskStatus.failed and "熔断" in task.output["error"]
+    assert channel.calls == []
+    # 两次尝试都被熔断拒绝；failure_threshold=1 下若计入设备失败，设备早已被隔离。
+    assert pool.metrics()["devices"][0]["failures"] == 0
+    assert pool.metrics()["quarantined"] == 0
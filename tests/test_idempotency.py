@@ -0,0 +1,116 @@
+import threading
+
+import pytest
+
+from app.ai_engine.content_generator import AIContentGenerator
+from app.channels.device_auto import DeviceAutoChannel
+from app.models.schemas import ProductCreate
+from app.product_manager.service import ProductManager
+from app.tasks.executor import ListingTaskExecutor
+from app.tasks.factory import build_idempotency_store
+from app.tasks.idempotency import (
+    IdempotencyGuard,
+    IdempotencyKeyConflict,
+    IdempotencyKeyInProgress,
+    InMemoryIdempotencyStore,
+    SQLiteIdempotencyStore,
+    request_fingerprint,
+)
+from app.tasks.repository import SQLiteTaskRepository
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store_env(request, tmp_path):
+    clock = _Clock()
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    store = InMemoryIdempotencyStore(clock=clock) if request.param == "memory" else SQLiteIdempotencyStore(repo, clock=clock)
+    yield store, clock, repo
+    repo.close()
+
+
+def test_retry_with_same_key_returns_original_response(store_env) -> None:
+    store, _, repo = store_env
+    channel = DeviceAutoChannel(device_id="test-device")
+    manager = ProductManager(
+        channel=channel,
+        ai_generator=AIContentGenerator(),
+        task_repo=repo,
+        task_executor=ListingTaskExecutor(channel, repo),
+        operation_mode="auto_device",
+        idempotency=IdempotencyGuard(store),
+    )
+    product = ProductCreate(title="风扇", cost_price=1, sale_price=2, category="3C数码")
+
+    first = manager.auto_create_product(product, idempotency_key="k1")
+    retried = manager.auto_create_product(product, idempotency_key="k1")
+
+    assert retried == first
+    assert [task.task_id for task in repo.iter_tasks()] == [first["task"]["task_id"]]
+    with pytest.raises(IdempotencyKeyConflict):
+        manager.auto_create_product(ProductCreate(title="台灯", cost_price=1, sale_price=2, category="家居"), idempotency_key="k1")
+    assert manager.auto_create_product(product)["task"]["task_id"] != first["task"]["task_id"]
+
+
+def test_concurrent_duplicate_waits_for_in_flight_execution(store_env) -> None:
+    store, _, _ = store_env
+    guard = IdempotencyGuard(store, poll_interval=0.01)
+    started, release = threading.Event(), threading.Event()
+    calls: list[int] = []
+    results: list[dict] = []
+
+    def slow() -> dict:
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"task": {"task_id": "t1"}}
+
+    first = threading.Thread(target=lambda: results.append(guard.run("k1", {"a": 1}, slow)))
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=lambda: results.append(guard.run("k1", {"a": 1}, slow)))
+    second.start()
+    release.set()
+    first.join()
+    second.join()
+
+    assert len(calls) == 1
+    assert results == [{"task": {"task_id": "t1"}}] * 2
+
+
+def test_failed_execution_releases_key_and_stale_locks_are_taken_over(store_env) -> None:
+    store, clock, _ = store_env
+    guard = IdempotencyGuard(store, ttl_seconds=60, lock_seconds=10, wait_seconds=0)
+
+    def boom() -> dict:
+        raise RuntimeError("device offline")
+
+    with pytest.raises(RuntimeError):
+        guard.run("k1", {"a": 1}, boom)
+    assert guard.run("k1", {"a": 1}, lambda: {"ok": 1}) == {"ok": 1}
+
+    assert store.begin("k2", request_fingerprint("b"), lock_seconds=10, ttl_seconds=60) is None
+    with pytest.raises(IdempotencyKeyInProgress):
+        guard.run("k2", "b", lambda: {"ok": 2})
+    clock.now += 11
+    assert guard.run("k2", "b", lambda: {"ok": 2}) == {"ok": 2}
+
+    clock.now += 60
+    assert store.purge_expired() == 2
+    assert guard.run("k1", {"a": 1}, lambda: {"ok": 3}) == {"ok": 3}
+
+
+def test_duplicate_waits_out_the_run_lease_and_non_sqlite_store_warns(caplog) -> None:
+    guard = IdempotencyGuard(InMemoryIdempotencyStore(), lock_seconds=900)
+    assert guard.wait_seconds == 900
+
+    with caplog.at_level("WARNING", logger="app.tasks.factory"):
+        assert isinstance(build_idempotency_store(object()), InMemoryIdempotencyStore)
+    assert "不会去重" in caplog.text
@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from app.analytics.latency import LatencyRecorder, QuantileSketch, summarize_step_latency
+from app.channels.device_auto import DeviceAutoChannel
+from app.models.schemas import ListingTask
+from app.tasks.executor import ListingTaskExecutor
+from app.tasks.repository import SQLiteTaskRepository
+
+
+def _exact(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def test_sketch_quantiles_stay_within_relative_accuracy() -> None:
+    rng = random.Random(7)
+    values = [rng.lognormvariate(6, 1.2) for _ in range(20_000)]
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+
+    for q in (0.5, 0.95, 0.99):
+        assert sketch.quantile(q) == pytest.approx(_exact(values, q), rel=0.011)
+    assert sketch.count == len(values) and sketch.max == max(values)
+    assert len(sketch._bins) < 1000
+
+
+def test_sketch_merge_matches_single_sketch() -> None:
+    left, right, whole = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    for n in range(1, 1001):
+        (left if n % 2 else right).add(float(n))
+        whole.add(float(n))
+    left.merge(right)
+
+    assert left.summary() == whole.summary()
+    assert QuantileSketch().quantile(0.5) is None
+    with pytest.raises(ValueError):
+        left.merge(QuantileSketch(relative_accuracy=0.05))
+
+
+def test_summarize_groups_by_step_channel_and_device() -> None:
+    rows = [
+        ("create_product", "auto_device", "emulator-5554", 1000.0),
+        ("create_product", "auto_device", "emulator-5556", 3000.0),
+        ("set_product_online", "browser_assist", None, 200.0),
+    ]
+
+    report = summarize_step_latency(iter(rows))
+
+    assert report["by_step"]["create_product"]["count"] == 2
+    assert report["by_channel"]["browser_assist"]["p99"] == pytest.approx(200.0, rel=0.01)
+    assert sorted(report["by_device"]) == ["emulator-5554", "emulator-5556"]
+
+    recorder = LatencyRecorder()
+    recorder.record("shell input", 12.0)
+    assert recorder.summary()["shell input"]["count"] == 1
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        self.now += 0.25
+        return self.now
+
+
+def test_executor_records_step_timings_and_device(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    executor = ListingTaskExecutor(DeviceAutoChannel(device_id="test-device"), repo, final_confirm_required=False, clock=_Clock())
+    pack = ListingTaskExecutor.build_pack("p1", {"title": "t", "desc": "d", "sale_price": 1, "cost_price": 1})
+    task = ListingTask.create("p1", pack.version, pack.model_dump(), "auto_device")
+
+    executor.execute(task, pack)
+
+    steps = repo.list_steps(task.task_id)
+    assert [(s["duration_ms"], s["device_id"]) for s in steps] == [(250.0, "test-device")] * 2
+    assert all(s["started_at"] <= s["finished_at"] for s in steps)
+    report = summarize_step_latency(repo.iter_step_durations("2000-01-01", "2100-01-01"))
+    assert report["by_device"]["test-device"]["count"] == 2
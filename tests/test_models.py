@@ -0,0 +1,59 @@
+import dataclasses
+
+import pytest
+
+from app.models.schemas import AIProductDraft, ListingPack, ListingTask, ProductRecord
+
+
+def _pack() -> ListingPack:
+    return ListingPack(
+        product_id="p-1",
+        title="便携风扇",
+        desc="静音 续航",
+        tags=["3C数码"],
+        sale_price=39.9,
+        cost_price=19.9,
+        sku_list=[{"name": "标准版", "stock": 100}],
+    )
+
+
+def test_models_are_slotted() -> None:
+    task = ListingTask.create("p-1", "v1", {}, "auto_device")
+    record = ProductRecord(title="风扇", cost_price=1.0, sale_price=2.0, category="3C数码")
+
+    for obj in (task, record, _pack()):
+        assert not hasattr(obj, "__dict__")
+
+
+def test_model_dump_is_cached_until_field_reassigned() -> None:
+    pack = _pack()
+    dump = pack.model_dump()
+
+    assert pack.model_dump() is dump
+    pack.tags.append("静音")
+    assert pack.model_dump()["tags"] == ["3C数码", "静音"]
+
+    pack.title = "新标题"
+    assert pack.model_dump() is not dump
+    assert pack.model_dump()["title"] == "新标题"
+
+    draft = AIProductDraft("标题", [], "详情", [], [], [])
+    first = draft.model_dump()
+    draft.detail_copy = "新详情"
+    assert draft.model_dump()["detail_copy"] == "新详情" and first["detail_copy"] == "详情"
+
+
+def test_frozen_pack_round_trips_and_rejects_mutation() -> None:
+    pack = _pack()
+    frozen = pack.freeze()
+
+    assert frozen.model_dump() == pack.model_dump()
+    snapshot = frozen.model_dump()
+    assert frozen.model_dump() is snapshot
+    # 缓存的是只读视图：存入 input_snapshot、传给通道的都是它，任何持有者都不能改写顶层键。
+    with pytest.raises(TypeError):
+        snapshot["title"] = "被改写"
+    assert {**snapshot, "title": "副本"}["title"] == "副本" and snapshot["title"] == pack.title
+    assert frozen.thaw() == pack
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        frozen.title = "x"
@@ -0,0 +1,108 @@
+import os
+import struct
+import zlib
+
+import pytest
+
+from app.channels.android_device_client import AndroidDeviceClient
+from app.channels.screencap import (
+    BGRA_8888,
+    PNG_SIGNATURE,
+    RGBA_8888,
+    RGBX_8888,
+    ScreencapError,
+    encode_png,
+    parse_raw_screencap,
+)
+
+
+def _decode_png(data: bytes) -> tuple[int, int, bytes]:
+    """只支持本模块写出的 PNG（单个 IDAT、过滤类型 0）。"""
+    assert data.startswith(PNG_SIGNATURE)
+    pos, chunks = len(PNG_SIGNATURE), {}
+    while pos < len(data):
+        (length,) = struct.unpack_from(">I", data, pos)
+        kind, body = data[pos + 4 : pos + 8], data[pos + 8 : pos + 8 + length]
+        assert struct.unpack_from(">I", data, pos + 8 + length)[0] == zlib.crc32(kind + body)
+        chunks[kind] = body
+        pos += 12 + length
+    width, height = struct.unpack_from(">II", chunks[b"IHDR"])
+    raw = zlib.decompress(chunks[b"IDAT"])
+    stride = len(raw) // height
+    return width, height, b"".join(raw[row * stride + 1 : (row + 1) * stride] for row in range(height))
+
+
+def test_parse_raw_screencap_accepts_both_header_layouts() -> None:
+    pixels = bytes(range(2 * 3 * 4))
+    legacy = struct.pack("<III", 2, 3, RGBA_8888) + pixels
+    modern = struct.pack("<IIII", 2, 3, RGBA_8888, 1) + pixels
+
+    assert parse_raw_screencap(legacy) == parse_raw_screencap(modern)
+    assert parse_raw_screencap(modern).pixels == pixels
+    with pytest.raises(ScreencapError):
+        parse_raw_screencap(legacy[:-1])
+    with pytest.raises(ScreencapError):
+        parse_raw_screencap(struct.pack("<III", 1, 1, 99) + b"\x00" * 4)
+
+
+def test_frame_png_round_trip_swaps_bgra() -> None:
+    bgra = bytes([3, 2, 1, 255] * 6)
+    frame = parse_raw_screencap(struct.pack("<III", 3, 2, BGRA_8888) + bgra)
+
+    assert _decode_png(frame.to_png()) == (3, 2, bytes([1, 2, 3, 255] * 6))
+    assert _decode_png(encode_png(1, 2, b"\x01\x02\x03\x04\x05\x06", channels=3)) == (1, 2, b"\x01\x02\x03\x04\x05\x06")
+    with pytest.raises(ValueError):
+        encode_png(2, 2, b"\x00" * 15)
+
+
+def test_rgbx_frame_drops_padding_byte_instead_of_using_it_as_alpha() -> None:
+    # X 字节是未定义的填充（这里为 0），当作 alpha 会编码出全透明的图。
+    frame = parse_raw_screencap(struct.pack("<III", 2, 1, RGBX_8888) + bytes([1, 2, 3, 0, 4, 5, 6, 0]))
+
+    assert frame.color_channels == 3
+    assert frame.rgb_bytes() == bytes([1, 2, 3, 4, 5, 6])
+    assert _decode_png(frame.to_png()) == (2, 1, bytes([1, 2, 3, 4, 5, 6]))
+
+
+@pytest.mark.skipif(os.name != "posix", reason="假 adb 依赖 /bin/sh")
+def test_client_streams_screencap_through_exec_out(fake_adb, tmp_path) -> None:
+    png = encode_png(2, 1, bytes([255, 0, 0, 255, 0, 255, 0, 255]))
+    raw = struct.pack("<IIII", 2, 1, RGBA_8888, 1) + bytes(8)
+    (tmp_path / "frame.png").write_bytes(png)
+    (tmp_path / "frame.raw").write_bytes(raw)
+    adb = fake_adb({"screencap": f'if [ "$1" = "-p" ]; then cat {tmp_path / "frame.png"}; else cat {tmp_path / "frame.raw"}; fi'})
+    client = AndroidDeviceClient("emulator-5554", adb_path=adb, artifact_dir=str(tmp_path / "art"), shell_session=True)
+
+    try:
+        assert client.capture_png() == png
+        frame = client.capture_frame()
+        path = client.screenshot("step.png")
+    finally:
+        client.close()
+
+    assert (frame.width, frame.height, frame.pixels) == (2, 1, bytes(8))
+    assert (tmp_path / "art" / "step.png").read_bytes() == png and path.endswith("step.png")
+    # 不再经过设备存储：没有 shell screencap / pull / rm。
+    assert set(client.latency.summary()) == {"exec-out screencap"}
+    assert client.shell.connects == 0
+
+
+@pytest.mark.skipif(os.name != "posix", reason="假 adb 依赖 /bin/sh")
+def test_client_raises_on_failed_capture(fake_adb, tmp_path) -> None:
+    adb = fake_adb({"screencap": "echo 'error: device offline' >&2; exit 1"})
+    client = AndroidDeviceClient("emulator-5554", adb_path=adb, artifact_dir=str(tmp_path / "art"))
+
+    with pytest.raises(ScreencapError, match="device offline"):
+        client.capture_png()
+    with pytest.raises(ScreencapError):
+        client.capture_frame()
+
+
+def test_frame_to_array_shape() -> None:
+    np = pytest.importorskip("numpy")
+    frame = parse_raw_screencap(struct.pack("<III", 2, 3, BGRA_8888) + bytes([3, 2, 1, 255] * 6))
+
+    array = frame.to_array()
+
+    assert array.shape == (3, 2, 4) and array.dtype == np.uint8
+    assert array[0, 0].tolist() == [1, 2, 3, 255]
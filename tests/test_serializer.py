@@ -0,0 +1,64 @@
+import json
+from types import MappingProxyType
+
+import pytest
+
+from app.models.schemas import ListingPack, ListingTask, TaskStatus
+from app.models.serializer import available_backends, build_serializer
+
+
+def _task() -> ListingTask:
+    pack = ListingPack(
+        product_id="p-1",
+        title="便携风扇",
+        desc="静音 续航",
+        tags=["3C数码"],
+        sale_price=39.9,
+        cost_price=19.9,
+        sku_list=[{"name": "标准版", "stock": 100}],
+    )
+    task = ListingTask.create(pack.product_id, pack.version, pack.model_dump(), "auto_device")
+    task.status = TaskStatus.done
+    task.output = {"create": {"success": True, "data": {"item_id": "auto_1"}}}
+    return task
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_dataclass_encodes_like_model_dump(backend) -> None:
+    codec = build_serializer(backend)
+    task = _task()
+
+    text = codec.dumps(task)
+
+    assert "便携风扇" in text
+    assert json.loads(text) == task.model_dump()
+    assert codec.loads(text) == task.model_dump()
+    assert codec.dumps_bytes(task) == text.encode("utf-8")
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_backends_share_output_conventions(backend) -> None:
+    codec = build_serializer(backend)
+
+    assert codec.dumps({"a": [1, "中"], "b": None}) == '{"a":[1,"中"],"b":null}'
+    assert codec.loads(codec.dumps({1: "x"})) == {"1": "x"}
+    with pytest.raises(ValueError):
+        codec.loads("{not json")
+    with pytest.raises(TypeError):
+        codec.dumps(object())
+
+
+def test_build_serializer_rejects_unknown_backend() -> None:
+    assert available_backends()[-1] == "json"
+    with pytest.raises(ValueError):
+        build_serializer("yaml")
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_cached_read_only_dump_encodes_as_object(backend) -> None:
+    codec = build_serializer(backend)
+    task = _task()
+    task.output["create"]["payload"] = task.input_snapshot
+
+    assert isinstance(task.input_snapshot, MappingProxyType)
+    assert codec.loads(codec.dumps(task))["output"]["create"]["payload"] == dict(task.input_snapshot)
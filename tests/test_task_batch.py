@@ -0,0 +1,176 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+
+from app.channels.device_auto import DeviceAutoChannel
+from app.models.schemas import ListingTask, TaskStatus
+from app.tasks.batch import BatchWriter, ChannelLimiter
+from app.tasks.executor import ListingTaskExecutor
+from app.tasks.repository import SQLiteTaskRepository
+
+
+class _SlowChannel(DeviceAutoChannel):
+    """记录同时在执行的 create_product 数量；标题含 boom 的商品失败。"""
+
+    def __init__(self) -> None:
+        super().__init__(device_id="test-device")
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def create_product(self, payload: dict) -> dict:
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            time.sleep(0.02)
+            if "boom" in payload["title"]:
+                raise RuntimeError("emulator offline")
+            return super().create_product(payload)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def _items(count: int, channel: str = "auto_device") -> list[tuple[ListingTask, object]]:
+    items = []
+    for n in range(count):
+        title = "boom" if n == 3 else f"商品{n}"
+        pack = ListingTaskExecutor.build_pack(f"p{n}", {"title": title, "desc": "d", "sale_price": 1, "cost_price": 1})
+        items.append((ListingTask.create(pack.product_id, pack.version, pack.model_dump(), channel), pack.freeze()))
+    return items
+
+
+def test_execute_many_keeps_order_caps_channel_and_persists_all(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    channel = _SlowChannel()
+    executor = ListingTaskExecutor(channel=channel, repo=repo, max_workers=8, channel_limit=3)
+    items = _items(12)
+
+    results = executor.execute_many(items, flush_size=5)
+
+    assert [task.task_id for task in results] == [task.task_id for task, _ in items]
+    assert 1 < channel.peak <= 3
+    assert results[3].status == TaskStatus.failed
+    for task in results:
+        loaded = repo.get_task(task.task_id)
+        assert loaded == task
+        assert len(repo.list_steps(task.task_id)) == 1
+
+
+def test_execute_many_applies_per_channel_limits(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    channel = _SlowChannel()
+    executor = ListingTaskExecutor(channel=channel, repo=repo, max_workers=8, channel_limits={"auto_device": 1})
+
+    executor.execute_many(_items(4))
+
+    assert channel.peak == 1
+
+
+class _CountingRepo(SQLiteTaskRepository):
+    def __init__(self, db_path: str) -> None:
+        super().__init__(db_path)
+        self.commits = 0
+
+    def transaction(self):
+        self.commits += 1
+        return super().transaction()
+
+
+def test_batch_writer_groups_steps_and_discards_failed_block(tmp_path) -> None:
+    repo = _CountingRepo(str(tmp_path / "autopilot.db"))
+    writer = BatchWriter(repo, flush_size=10, flush_interval=60)
+    tasks = [ListingTask.create(f"p{n}", "v1", {}, "auto_device") for n in range(25)]
+
+    for task in tasks:
+        with writer.transaction() as uow:
+            uow.save_task(task)
+        task.status = TaskStatus.done
+    with pytest.raises(RuntimeError):
+        with writer.transaction() as uow:
+            uow.save_task(ListingTask.create("discarded", "v1", {}, "auto_device"))
+            raise RuntimeError("boom")
+    writer.close()
+
+    assert repo.commits == 3
+    assert all(repo.get_task(task.task_id).status == TaskStatus.drafted for task in tasks)
+    assert len(repo.list_tasks(limit=100).items) == 25
+
+
+def test_batch_writer_commits_lone_group_after_interval(tmp_path) -> None:
+    repo = _CountingRepo(str(tmp_path / "autopilot.db"))
+    writer = BatchWriter(repo, flush_size=50, flush_interval=0.05)
+    task = ListingTask.create("p0", "v1", {}, "auto_device")
+
+    with writer.transaction() as uow:
+        uow.save_task(task)
+    assert repo.get_task(task.task_id) is None
+    # 没有第二个步骤到达，也由定时器在 flush_interval 后提交。
+    deadline = time.monotonic() + 2
+    while repo.get_task(task.task_id) is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert repo.get_task(task.task_id) is not None
+    assert repo.commits == 1
+    writer.close()
+
+
+def test_batch_writer_surfaces_failed_background_flush(tmp_path, caplog) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    transaction = repo.transaction
+    flush_threads: list[str] = []
+
+    @contextmanager
+    def failing_once():
+        with transaction() as uow:
+            yield uow
+            flush_threads.append(threading.current_thread().name)
+            if len(flush_threads) == 1:
+                raise sqlite3.OperationalError("disk I/O error")
+
+    repo.transaction = failing_once
+    writer = BatchWriter(repo, flush_size=50, flush_interval=0.01)
+    lost = ListingTask.create("p0", "v1", {}, "auto_device")
+    with writer.transaction() as uow:
+        uow.save_task(lost)
+    deadline = time.monotonic() + 2
+    while not flush_threads and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    # 定时提交的失败记日志，并由下一次写入抛出，而不是随定时线程一起消失。
+    with pytest.raises(sqlite3.OperationalError, match="disk I/O error"):
+        with writer.transaction():
+            pass
+    assert "定时提交失败" in caplog.text
+    kept = ListingTask.create("p1", "v1", {}, "auto_device")
+    with writer.transaction() as uow:
+        uow.save_task(kept)
+    writer.close()
+
+    assert repo.get_task(lost.task_id) is None
+    assert repo.get_task(kept.task_id) is not None
+    assert flush_threads[0] == "batch-writer"
+
+
+def test_batch_writer_commits_settled_task_immediately(tmp_path) -> None:
+    repo = _CountingRepo(str(tmp_path / "autopilot.db"))
+    writer = BatchWriter(repo, flush_size=50, flush_interval=60)
+    task = ListingTask.create("p0", "v1", {}, "auto_device")
+    task.status = TaskStatus.wait_manual_confirm
+
+    with writer.transaction() as uow:
+        uow.save_task(task)
+
+    assert repo.get_task(task.task_id).status == TaskStatus.wait_manual_confirm
+    writer.close()
+
+
+def test_channel_limiter_rejects_non_positive_limits() -> None:
+    with pytest.raises(ValueError):
+        ChannelLimiter(0)
+    with pytest.raises(ValueError):
+        ChannelLimiter(2, {"auto_device": 0})
@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+from app.models.schemas import ListingTask
+from app.tasks.blobs import BLOB_ESCAPE_KEY, BLOB_REF_KEY, BlobStore
+from app.tasks.repository import SQLiteTaskRepository
+
+
+def _pack() -> dict:
+    return {
+        "product_id": "p1",
+        "title": "3C数码 | 便携风扇｜高转化优化版",
+        "desc": "这是一款面向3C数码场景打造的商品，主打高性价比与稳定品质。" * 20,
+        "tags": ["静音", "续航"],
+    }
+
+
+def test_encode_replaces_large_subdocuments_with_refs() -> None:
+    store = BlobStore(threshold_bytes=256)
+
+    text, rows = store.encode({"create": {"success": True, "payload": _pack()}, "item_id": "auto_1"})
+
+    assert len(rows) == 1
+    assert rows[0].codec == "zlib" and len(rows[0].data) < rows[0].raw_size
+    assert f'"{BLOB_REF_KEY}":"{rows[0].hash}"' in text
+    assert store.encode(_pack())[1][0].hash == rows[0].hash
+
+
+def test_repository_stores_shared_payload_once_and_round_trips(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"), blob_threshold_bytes=256)
+    pack = _pack()
+    task = ListingTask.create("p1", "v1", pack, "auto_device")
+    create_res = {"success": True, "payload": pack, "data": {"item_id": "auto_1"}}
+    task.output = {"create": create_res, "item_id": "auto_1"}
+
+    with repo.transaction() as uow:
+        uow.log_step(task.task_id, "create_product", True, "ok", create_res, "t1")
+        uow.save_task(task)
+
+    conn = repo._connect()
+    assert conn.execute("SELECT COUNT(*) FROM task_blobs").fetchone()[0] == 1
+    assert repo.get_task(task.task_id) == task
+    assert repo.list_logs(task.task_id)[0]["payload"] == create_res
+
+
+def test_decoded_values_are_independent_copies(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"), blob_threshold_bytes=64)
+    task = ListingTask.create("p1", "v1", _pack(), "auto_device")
+    repo.save_task(task)
+
+    first = repo.get_task(task.task_id)
+    assert first is not None
+    first.input_snapshot["tags"].append("mutated")
+
+    second = repo.get_task(task.task_id)
+    assert second is not None and second.input_snapshot["tags"] == ["静音", "续航"]
+
+
+def test_user_objects_shaped_like_refs_round_trip_and_are_not_live(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"), blob_threshold_bytes=256)
+    fake_ref = {BLOB_REF_KEY: "0123456789abcdef0123456789abcdef"}
+    task = ListingTask.create("p1", "v1", _pack(), "auto_device")
+    task.output = {"note": fake_ref, "nested": {BLOB_ESCAPE_KEY: {"a": 1}}, "big": [fake_ref, _pack()]}
+    repo.save_task(task)
+
+    assert repo.get_task(task.task_id) == task
+    texts = [repo._connect().execute("SELECT output FROM listing_tasks").fetchone()[0]]
+    fetch = lambda digest: repo._connect().execute("SELECT codec, data FROM task_blobs WHERE hash = ?", (digest,)).fetchone()  # noqa: E731
+    live = repo.blobs.live_refs(texts, fetch)
+    # 只有 _pack() 被存成 blob；形如引用的用户对象不计入存活集合。
+    assert live == {repo.blobs.encode(_pack())[1][0].hash}
+
+
+def test_live_refs_do_not_depend_on_serializer_formatting() -> None:
+    store = BlobStore(threshold_bytes=256)
+    text, rows = store.encode({"payload": _pack()})
+    saved = {row.hash: (row.codec, row.data) for row in rows}
+    pretty = json.dumps(json.loads(text), indent=2)
+
+    assert store.live_refs([pretty], saved.get) == set(saved)
+
+
+def test_blob_gc_rolls_back_write_lock_on_any_error(tmp_path, monkeypatch) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"), blob_threshold_bytes=64)
+    task = ListingTask.create("p1", "v1", _pack(), "auto_device")
+    repo.save_task(task)
+    repo.delete_tasks([task.task_id])
+
+    def boom(*_args):
+        raise RuntimeError("recheck failed")
+
+    monkeypatch.setattr(repo.blobs, "rereferenced", boom)
+    with pytest.raises(RuntimeError):
+        repo.compact()
+
+    assert not repo._connect().in_transaction
+    assert repo._connect().execute("SELECT COUNT(*) FROM task_blobs").fetchone()[0] == 1
@@ -1,13 +1,15 @@
+import pytest
+
 from app.ai_engine.content_generator import AIContentGenerator
 from app.channels.device_auto import DeviceAutoChannel
-from app.models.schemas import ProductCreate, TaskStatus
+from app.models.schemas import ListingTask, ProductCreate, TaskStatus
 from app.product_manager.service import ProductManager
 from app.tasks.executor import ListingTaskExecutor
-from app.tasks.repository import TaskRepository
+from app.tasks.repository import SQLiteTaskRepository
 
 
 def test_auto_create_product_waits_manual_confirm_and_can_publish(tmp_path) -> None:
-    repo = TaskRepository(str(tmp_path / "autopilot.db"))
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
     channel = DeviceAutoChannel(device_id="test-device")
     executor = ListingTaskExecutor(channel=channel, repo=repo, final_confirm_required=True)
     manager = ProductManager(
@@ -41,3 +43,144 @@ def test_auto_create_product_waits_manual_confirm_and_can_publish(tmp_path) -> N
 
     steps = repo.list_steps(task["task_id"])
     assert [step["step_name"] for step in steps] == ["create_product", "set_product_online"]
+
+
+class _BrokenChannel(DeviceAutoChannel):
+    def create_product(self, payload: dict) -> dict:
+        raise RuntimeError("emulator offline")
+
+
+def test_execute_failure_persists_failed_step_and_task_together(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    executor = ListingTaskExecutor(channel=_BrokenChannel(device_id="test-device"), repo=repo)
+    pack = ListingTaskExecutor.build_pack(
+        "p1", {"title": "t", "desc": "d", "sale_price": 1, "cost_price": 1}
+    )
+    task = ListingTask.create("p1", pack.version, pack.model_dump(), "auto_device")
+
+    executor.execute(task, pack)
+
+    loaded = repo.get_task(task.task_id)
+    assert loaded is not None
+    assert loaded.status == TaskStatus.failed
+    assert loaded.output == {"error": "emulator offline"}
+    assert [step["status"] for step in repo.list_steps(task.task_id)] == ["failed"]
+
+
+def test_auto_create_products_runs_batch_and_keeps_input_order(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    channel = DeviceAutoChannel(device_id="test-device")
+    executor = ListingTaskExecutor(channel=channel, repo=repo, final_confirm_required=True)
+    manager = ProductManager(
+        channel=channel,
+        ai_generator=AIContentGenerator(),
+        task_repo=repo,
+        task_executor=executor,
+        operation_mode="auto_device",
+    )
+    products = [
+        ProductCreate(title=f"商品{n}", cost_price=10, sale_price=20, category="家居") for n in range(5)
+    ]
+
+    outputs = manager.auto_create_products(products)
+
+    assert [output["listing_pack"]["title"] for output in outputs] == [
+        output["draft"]["optimized_title"] for output in outputs
+    ]
+    assert all("商品" + str(n) in output["draft"]["optimized_title"] for n, output in enumerate(outputs))
+    for output in outputs:
+        loaded = repo.get_task(output["task"]["task_id"])
+        assert loaded is not None
+        assert loaded.status == TaskStatus.wait_manual_confirm
+
+
+class _FlakyOnlineChannel(DeviceAutoChannel):
+    def __init__(self) -> None:
+        super().__init__(device_id="test-device")
+        self.create_calls = 0
+        self.online_failures = 1
+
+    def create_product(self, payload: dict) -> dict:
+        self.create_calls += 1
+        return super().create_product(payload)
+
+    def set_product_online(self, xhs_product_id: str) -> dict:
+        if self.online_failures:
+            self.online_failures -= 1
+            raise RuntimeError("publish button not found")
+        return super().set_product_online(xhs_product_id)
+
+
+def test_resume_skips_done_steps_and_continues_from_failed_one(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    channel = _FlakyOnlineChannel()
+    executor = ListingTaskExecutor(channel=channel, repo=repo, final_confirm_required=False)
+    pack = ListingTaskExecutor.build_pack("p1", {"title": "t", "desc": "d", "sale_price": 1, "cost_price": 1})
+    task = ListingTask.create("p1", pack.version, pack.model_dump(), "auto_device")
+
+    failed = executor.execute(task, pack)
+    assert failed.status == TaskStatus.failed
+    assert failed.output["item_id"]
+
+    resumed = executor.resume(task.task_id)
+
+    assert resumed.status == TaskStatus.done
+    assert channel.create_calls == 1
+    assert "error" not in resumed.output
+    assert resumed.output["online"]["payload"]["item_id"] == failed.output["item_id"]
+    assert [(step["step_name"], step["status"]) for step in repo.list_steps(task.task_id)] == [
+        ("create_product", "done"),
+        ("set_product_online", "failed"),
+        ("set_product_online", "done"),
+    ]
+    assert executor.resume(task.task_id) == resumed
+    assert channel.create_calls == 1
+
+
+def test_resume_stops_at_manual_confirm_gate(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    executor = ListingTaskExecutor(channel=_BrokenChannel(device_id="test-device"), repo=repo)
+    pack = ListingTaskExecutor.build_pack("p1", {"title": "t", "desc": "d", "sale_price": 1, "cost_price": 1})
+    task = ListingTask.create("p1", pack.version, pack.model_dump(), "auto_device")
+    executor.execute(task, pack)
+
+    executor.channel = DeviceAutoChannel(device_id="test-device")
+    resumed = executor.resume(task.task_id)
+
+    assert resumed.status == TaskStatus.wait_manual_confirm
+    assert executor.confirm_and_publish(task.task_id).status == TaskStatus.done
+    with pytest.raises(ValueError):
+        executor.resume("missing")
+
+
+def test_confirm_many_commits_each_published_task_and_reports_per_task(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    executor = ListingTaskExecutor(channel=DeviceAutoChannel(device_id="test-device"), repo=repo, channel_limit=2)
+    pack = ListingTaskExecutor.build_pack("p1", {"title": "t", "desc": "d", "sale_price": 1, "cost_price": 1})
+    waiting = [executor.execute(ListingTask.create("p1", pack.version, pack.model_dump(), "auto_device"), pack) for _ in range(3)]
+    drafted = ListingTask.create("p1", pack.version, pack.model_dump(), "auto_device")
+    repo.save_task(drafted)
+
+    transactions = 0
+    open_transaction = repo.transaction
+
+    def counting_transaction():
+        nonlocal transactions
+        transactions += 1
+        return open_transaction()
+
+    repo.transaction = counting_transaction
+    ids = [waiting[0].task_id, "missing", drafted.task_id, waiting[1].task_id, waiting[0].task_id, waiting[2].task_id]
+    outcomes = executor.confirm_many(ids)
+
+    # 每组写入单独提交：每个任务一次转为 running、一次发布步骤完成。
+    assert transactions == 6
+    assert [(o["task_id"], o["ok"], o["status"]) for o in outcomes] == [
+        (waiting[0].task_id, True, "done"),
+        ("missing", False, None),
+        (drafted.task_id, False, "drafted"),
+        (waiting[1].task_id, True, "done"),
+        (waiting[2].task_id, True, "done"),
+    ]
+    assert all(repo.get_task(task.task_id).status == TaskStatus.done for task in waiting)
+    assert [s["step_name"] for s in repo.list_steps(waiting[1].task_id)] == ["create_product", "set_product_online"]
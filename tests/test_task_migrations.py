@@ -0,0 +1,69 @@
+import sqlite3
+
+import pytest
+
+from app.tasks.migrations import MIGRATIONS, Migration, apply_migrations, current_version
+from app.tasks.repository import _SELECT_LOGS_SQL, _SELECT_STEPS_SQL, SQLiteTaskRepository
+
+
+def _plan(conn: sqlite3.Connection, sql: str, params: tuple) -> str:
+    return " | ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+
+def test_repository_applies_all_migrations_once(tmp_path) -> None:
+    db_path = str(tmp_path / "autopilot.db")
+    repo = SQLiteTaskRepository(db_path)
+    conn = repo._connect()
+    assert current_version(conn) == MIGRATIONS[-1].version
+
+    assert apply_migrations(conn) == []
+    versions = [row[0] for row in conn.execute("SELECT version FROM schema_version ORDER BY version")]
+    assert versions == [migration.version for migration in MIGRATIONS]
+
+
+def test_migrations_upgrade_legacy_database_in_place(tmp_path) -> None:
+    db_path = tmp_path / "legacy.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(MIGRATIONS[0].statements[1])
+        conn.execute(
+            "INSERT INTO task_logs (task_id, step_name, success, message, payload, created_at) "
+            "VALUES ('t1', 'create_product', 1, 'ok', '{}', 'now')"
+        )
+
+    repo = SQLiteTaskRepository(str(db_path))
+    assert [log["step_name"] for log in repo.list_logs("t1")] == ["create_product"]
+
+
+def test_failed_migration_rolls_back_and_keeps_version(tmp_path) -> None:
+    conn = sqlite3.connect(tmp_path / "broken.db")
+    broken = (
+        Migration(1, "ok", ("CREATE TABLE a (id INTEGER)",)),
+        Migration(2, "broken", ("CREATE TABLE b (id INTEGER)", "CREATE TABLE a (id INTEGER)")),
+    )
+
+    with pytest.raises(sqlite3.OperationalError):
+        apply_migrations(conn, broken)
+
+    assert current_version(conn) == 1
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'b'").fetchone() is None
+
+
+@pytest.mark.parametrize(
+    ("sql", "index_name"),
+    [
+        (_SELECT_STEPS_SQL, "idx_listing_task_steps_task_id"),
+        (_SELECT_LOGS_SQL, "idx_task_logs_task_id"),
+        ("SELECT task_id FROM listing_tasks WHERE product_id = ?", "idx_listing_tasks_product_id"),
+        (
+            "SELECT task_id FROM listing_tasks WHERE status = ? ORDER BY updated_at",
+            "idx_listing_tasks_status_keyset",
+        ),
+    ],
+)
+def test_per_task_queries_use_indexes(tmp_path, sql: str, index_name: str) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+
+    plan = _plan(repo._connect(), sql, ("x",))
+
+    assert index_name in plan
+    assert "USE TEMP B-TREE" not in plan
@@ -0,0 +1,202 @@
+import threading
+
+import pytest
+
+from app.ai_engine.content_generator import AIContentGenerator
+from app.channels.device_auto import DeviceAutoChannel
+from app.models.schemas import ListingTask, ProductCreate, TaskStatus
+from app.product_manager.service import ProductManager
+from app.tasks.executor import ListingTaskExecutor
+from app.tasks.queue import InMemoryTaskQueue, RedisTaskQueue, SQLiteTaskQueue
+from app.tasks.repository import SQLiteTaskRepository
+from app.tasks.worker import TaskWorker
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeRedis:
+    """只实现 RedisTaskQueue 用到的命令，返回值形态与 redis-py（bytes）一致。"""
+
+    def __init__(self, clock: _Clock) -> None:
+        self.clock = clock
+        self.zsets: dict[str, dict[str, float]] = {}
+        self.hashes: dict[str, dict[str, int]] = {}
+        self.strings: dict[str, tuple[bytes, float]] = {}
+        self._lock = threading.Lock()
+
+    def time(self) -> tuple[int, int]:
+        return int(self.clock.now), int(self.clock.now % 1 * 1_000_000)
+
+    def _live(self, key: str) -> bytes | None:
+        entry = self.strings.get(key)
+        if entry is None or entry[1] <= self.clock.now:
+            self.strings.pop(key, None)
+            return None
+        return entry[0]
+
+    def zadd(self, name, mapping, nx=False, xx=False, ch=False) -> int:
+        with self._lock:
+            zset = self.zsets.setdefault(name, {})
+            changed = 0
+            for member, score in mapping.items():
+                exists = member in zset
+                if (nx and exists) or (xx and not exists):
+                    continue
+                changed += int(not exists or (ch and zset[member] != score))
+                zset[member] = score
+            return changed
+
+    def zrangebyscore(self, name, low, high, start=0, num=None) -> list[bytes]:
+        members = sorted((score, member) for member, score in self.zsets.get(name, {}).items() if score <= high)
+        return [member.encode() for _, member in members[start : start + num]]
+
+    def zrem(self, name, member) -> int:
+        return int(self.zsets.get(name, {}).pop(member, None) is not None)
+
+    def zscore(self, name, member) -> float | None:
+        return self.zsets.get(name, {}).get(member)
+
+    def zcard(self, name) -> int:
+        return len(self.zsets.get(name, {}))
+
+    def hincrby(self, name, key, amount) -> int:
+        values = self.hashes.setdefault(name, {})
+        values[key] = values.get(key, 0) + amount
+        return values[key]
+
+    def hdel(self, name, key) -> int:
+        return int(self.hashes.get(name, {}).pop(key, None) is not None)
+
+    def set(self, name, value, nx=False, px=None) -> bool | None:
+        with self._lock:
+            if nx and self._live(name) is not None:
+                return None
+            self.strings[name] = (value.encode(), self.clock.now + px / 1000)
+            return True
+
+    def get(self, name) -> bytes | None:
+        return self._live(name)
+
+    def pexpire(self, name, ms) -> bool:
+        value = self._live(name)
+        if value is None:
+            return False
+        self.strings[name] = (value, self.clock.now + ms / 1000)
+        return True
+
+    def delete(self, name) -> int:
+        return int(self.strings.pop(name, None) is not None)
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def queue_env(request, tmp_path):
+    clock = _Clock()
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    if request.param == "memory":
+        queue = InMemoryTaskQueue(clock=clock)
+    elif request.param == "sqlite":
+        queue = SQLiteTaskQueue(repo, clock=clock)
+    else:
+        queue = RedisTaskQueue(FakeRedis(clock))
+    yield queue, clock, repo
+    repo.close()
+
+
+def test_claim_hides_task_until_lease_expires(queue_env) -> None:
+    queue, clock, _ = queue_env
+    queue.enqueue("t1")
+    queue.enqueue("t2", delay=5)
+
+    first = queue.claim("w1", lease_seconds=30)
+    assert first is not None and first.task_id == "t1" and first.attempts == 1
+    assert queue.claim("w2", lease_seconds=30) is None
+
+    clock.now += 10
+    second = queue.claim("w2", lease_seconds=30)
+    assert second is not None and second.task_id == "t2"
+
+    clock.now += 25
+    assert queue.heartbeat(second, lease_seconds=30)
+    clock.now += 10
+    stolen = queue.claim("w3", lease_seconds=30)
+    assert stolen is not None and stolen.task_id == "t1" and stolen.attempts == 2
+
+    assert not queue.ack(first)
+    assert queue.ack(stolen)
+    assert queue.depth() == 1
+    assert not queue.is_queued("t1") and queue.is_queued("t2")
+
+
+def test_release_makes_task_available_again(queue_env) -> None:
+    queue, clock, _ = queue_env
+    queue.enqueue("t1")
+    queue.enqueue("t1")
+    lease = queue.claim("w1", lease_seconds=30)
+
+    assert queue.release(lease, delay=3)
+    assert not queue.heartbeat(lease, lease_seconds=30)
+    assert queue.claim("w1", lease_seconds=30) is None
+    clock.now += 3
+    assert queue.claim("w2", lease_seconds=30).attempts == 2
+    assert queue.depth() == 1
+
+
+def test_concurrent_claims_never_hand_out_the_same_task(queue_env) -> None:
+    queue, _, _ = queue_env
+    for n in range(40):
+        queue.enqueue(f"t{n}")
+    claimed: list[str] = []
+    lock = threading.Lock()
+
+    def drain(worker_id: str) -> None:
+        while (lease := queue.claim(worker_id, lease_seconds=60)) is not None:
+            with lock:
+                claimed.append(lease.task_id)
+
+    threads = [threading.Thread(target=drain, args=(f"w{n}",)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == sorted(f"t{n}" for n in range(40))
+
+
+def test_worker_claims_executes_and_acks(queue_env) -> None:
+    queue, _, repo = queue_env
+    executor = ListingTaskExecutor(DeviceAutoChannel(device_id="test-device"), repo, final_confirm_required=False)
+    pack = ListingTaskExecutor.build_pack("p1", {"title": "t", "desc": "d", "sale_price": 1, "cost_price": 1})
+    task = ListingTask.create("p1", pack.version, pack.model_dump(), "auto_device")
+    repo.save_task(task)
+    queue.enqueue(task.task_id)
+
+    handled = TaskWorker(queue, executor, worker_id="w1", sleep=lambda _: None).run(max_jobs=1)
+
+    assert handled == 1
+    assert repo.get_task(task.task_id).status == TaskStatus.done
+    assert queue.depth() == 0
+
+
+def test_queue_mode_only_enqueues_from_product_manager(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    queue = SQLiteTaskQueue(repo)
+    channel = DeviceAutoChannel(device_id="test-device")
+    manager = ProductManager(
+        channel=channel,
+        ai_generator=AIContentGenerator(),
+        task_repo=repo,
+        task_executor=ListingTaskExecutor(channel, repo),
+        operation_mode="auto_device",
+        task_queue=queue,
+    )
+
+    output = manager.auto_create_product(ProductCreate(title="风扇", cost_price=1, sale_price=2, category="3C数码"))
+
+    assert output["task"]["status"] == TaskStatus.drafted.value
+    assert queue.claim("w1", lease_seconds=30).task_id == output["task"]["task_id"]
@@ -0,0 +1,87 @@
+from datetime import datetime, timezone
+
+from app.channels.device_auto import DeviceAutoChannel
+from app.models.schemas import ListingTask, TaskStatus
+from app.tasks.executor import ListingTaskExecutor
+from app.tasks.queue import SQLiteTaskQueue
+from app.tasks.recovery import TaskRecovery
+from app.tasks.repository import SQLiteTaskRepository
+
+NOW = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+def _orphan(repo: SQLiteTaskRepository, updated_at: str, done_steps: tuple[str, ...] = ()) -> ListingTask:
+    pack = ListingTaskExecutor.build_pack("p1", {"title": "t", "desc": "d", "sale_price": 1, "cost_price": 1})
+    task = ListingTask.create("p1", pack.version, pack.model_dump(), "auto_device")
+    task.status = TaskStatus.running
+    task.updated_at = updated_at
+    with repo.transaction() as uow:
+        for step in done_steps:
+            uow.save_step(task_id=task.task_id, step_name=step, status="done", updated_at=updated_at)
+        uow.save_task(task)
+    return task
+
+
+def _executor(repo: SQLiteTaskRepository) -> ListingTaskExecutor:
+    return ListingTaskExecutor(DeviceAutoChannel(device_id="test-device"), repo, final_confirm_required=False)
+
+
+def test_recovery_resumes_stale_running_tasks_inline_from_last_step(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    stale = _orphan(repo, "2026-02-28T00:00:00", done_steps=("create_product",))
+    fresh = _orphan(repo, "2026-02-28T23:59:00")
+
+    report = TaskRecovery(repo, _executor(repo), stale_after_seconds=600, now=lambda: NOW).run()
+
+    assert report.scanned == 1 and report.resumed == [stale.task_id]
+    recovered = repo.get_task(stale.task_id)
+    assert recovered.status == TaskStatus.done and recovered.output["recoveries"] == 1
+    assert [step["step_name"] for step in repo.list_steps(stale.task_id)] == ["create_product", "set_product_online"]
+    log = next(log for log in repo.list_logs(stale.task_id) if log["step_name"] == "task_recovery")
+    assert log["payload"]["last_step"] == "create_product" and log["payload"]["resume_from"] == "set_product_online"
+    assert repo.get_task(fresh.task_id).status == TaskStatus.running
+
+
+def test_recovery_requeues_orphans_and_skips_tasks_still_in_queue(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    queue = SQLiteTaskQueue(repo)
+    leased = _orphan(repo, "2026-02-27T00:00:00")
+    orphan = _orphan(repo, "2026-02-28T00:00:00")
+    queue.enqueue(leased.task_id)
+    queue.claim("w1", lease_seconds=300)
+
+    recovery = TaskRecovery(repo, _executor(repo), queue=queue, now=lambda: NOW)
+    report = recovery.run()
+
+    assert report.skipped == [leased.task_id] and report.requeued == [orphan.task_id]
+    assert queue.is_queued(orphan.task_id)
+    assert repo.get_task(orphan.task_id).status == TaskStatus.running
+    # 已认领的任务 updated_at 被刷新，再次巡检不会重复入队。
+    assert recovery.run().requeued == []
+
+
+def test_recovery_marks_repeatedly_interrupted_task_failed(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    task = _orphan(repo, "2026-02-28T00:00:00")
+    task.output["recoveries"] = 3
+    repo.save_task(task)
+
+    report = TaskRecovery(repo, _executor(repo), max_recoveries=3, now=lambda: NOW).run()
+
+    assert report.failed == [task.task_id]
+    failed = repo.get_task(task.task_id)
+    assert failed.status == TaskStatus.failed and "3 次" in failed.output["error"]
+    assert [(s["step_name"], s["status"]) for s in repo.list_steps(task.task_id)] == [("create_product", "failed")]
+
+
+def test_stale_sweep_query_seeks_status_keyset_index(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    sql = (
+        "EXPLAIN QUERY PLAN SELECT task_id FROM listing_tasks "
+        "WHERE status = ? AND updated_at < ? ORDER BY updated_at ASC, task_id ASC LIMIT 200"
+    )
+
+    plan = " | ".join(row[-1] for row in repo._connect().execute(sql, ("running", "2026-03-01")))
+
+    assert "idx_listing_tasks_status_keyset" in plan
+    assert "TEMP B-TREE" not in plan
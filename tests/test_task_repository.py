@@ -0,0 +1,155 @@
+import threading
+
+import pytest
+
+from app.models.schemas import ListingTask, TaskStatus
+from app.tasks.repository import _SELECT_STEP_DURATIONS_SQL, SQLiteTaskRepository
+
+
+def test_repository_uses_wal_and_reuses_thread_connection(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+
+    conn = repo._connect()
+    assert conn is repo._connect()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+    repo.close()
+
+
+def test_repository_concurrent_writers_all_persist(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    connections = []
+
+    def writer(worker_id: int) -> None:
+        connections.append(repo._connect())
+        for i in range(50):
+            repo.save_step(task_id=f"task-{worker_id}", step_name=f"s{i}", status="done", updated_at="t")
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(conn) for conn in connections}) == 4
+    assert all(len(repo.list_steps(f"task-{n}")) == 50 for n in range(4))
+    repo.close()
+
+
+def test_transaction_commits_buffered_writes_once(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    task = ListingTask.create("p1", "v1", {"title": "t"}, "auto_device")
+
+    with repo.transaction() as uow:
+        uow.log_step(task.task_id, "create_product", True, "ok", {"a": 1}, "t1")
+        uow.save_step(task_id=task.task_id, step_name="create_product", status="done", updated_at="t1")
+        task.status = TaskStatus.done
+        uow.save_task(task)
+        assert repo.get_task(task.task_id) is None
+
+    loaded = repo.get_task(task.task_id)
+    assert loaded is not None and loaded.status == TaskStatus.done
+    assert [step["step_name"] for step in repo.list_steps(task.task_id)] == ["create_product"]
+
+
+def test_transaction_discards_writes_on_error(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+
+    with pytest.raises(RuntimeError):
+        with repo.transaction() as uow:
+            uow.save_step(task_id="t1", step_name="create_product", status="done", updated_at="t1")
+            raise RuntimeError("device lost")
+
+    assert repo.list_steps("t1") == []
+
+
+def _seed_tasks(repo: SQLiteTaskRepository, count: int) -> list[ListingTask]:
+    tasks = []
+    for n in range(count):
+        task = ListingTask.create(f"p{n}", "v1", {}, "auto_device" if n % 2 else "manual")
+        task.status = TaskStatus.failed if n % 3 == 0 else TaskStatus.done
+        task.updated_at = f"2026-01-01T00:00:{n // 2:02d}"
+        repo.save_task(task)
+        tasks.append(task)
+    return tasks
+
+
+def test_list_tasks_keyset_pages_cover_filtered_set_in_order(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    tasks = _seed_tasks(repo, 25)
+    expected = sorted(
+        (t for t in tasks if t.status == TaskStatus.failed and t.channel == "manual"),
+        key=lambda t: (t.updated_at, t.task_id),
+    )
+
+    seen, after = [], None
+    while True:
+        page = repo.list_tasks(status=TaskStatus.failed, channel="manual", after=after, limit=2)
+        seen.extend(task.task_id for task in page.items)
+        if page.next_after is None:
+            break
+        after = page.next_after
+
+    assert seen == [task.task_id for task in expected]
+    assert [task.task_id for task in repo.iter_tasks(page_size=4)] == [
+        t.task_id for t in sorted(tasks, key=lambda t: (t.updated_at, t.task_id))
+    ]
+
+
+def test_list_tasks_rejects_bad_cursor_and_limit(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+
+    with pytest.raises(ValueError):
+        repo.list_tasks(after="not-a-cursor")
+    with pytest.raises(ValueError):
+        repo.list_tasks(limit=0)
+
+
+def test_list_tasks_cursor_query_seeks_keyset_index(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    sql = (
+        "EXPLAIN QUERY PLAN SELECT task_id FROM listing_tasks "
+        "WHERE status = ? AND (updated_at, task_id) > (?, ?) ORDER BY updated_at, task_id LIMIT 10"
+    )
+
+    plan = " | ".join(row[-1] for row in repo._connect().execute(sql, ("failed", "t", "x")))
+
+    assert "idx_listing_tasks_status_keyset" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_get_task_detail_returns_task_and_steps_in_one_read(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    task = ListingTask.create("p1", "v1", {"title": "大字段"}, "auto_device")
+    repo.save_task(task)
+    for name in ("create_product", "set_product_online"):
+        repo.save_step(task_id=task.task_id, step_name=name, status="done", updated_at="t")
+
+    full = repo.get_task_detail(task.task_id)
+    summary = repo.get_task_detail(task.task_id, include_payload=False)
+
+    assert full is not None and summary is not None
+    assert full["task"] == task.model_dump()
+    assert [step["step_name"] for step in full["steps"]] == ["create_product", "set_product_online"]
+    assert "input_snapshot" not in summary["task"] and "output" not in summary["task"]
+    assert summary["task"]["status"] == TaskStatus.drafted.value
+    assert summary["steps"] == full["steps"]
+    assert repo.get_task_detail("missing") is None
+
+
+def test_get_task_detail_without_steps_returns_empty_list(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    task = ListingTask.create("p1", "v1", {}, "manual")
+    repo.save_task(task)
+
+    detail = repo.get_task_detail(task.task_id, include_payload=False)
+
+    assert detail is not None and detail["steps"] == []
+
+
+def test_step_duration_window_scan_uses_finished_index(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+
+    plan = " | ".join(row[-1] for row in repo._connect().execute(f"EXPLAIN QUERY PLAN {_SELECT_STEP_DURATIONS_SQL}", ("a", "b")))
+
+    assert "idx_listing_task_steps_finished" in plan
@@ -0,0 +1,187 @@
+"""TaskRepository 契约测试：同一组用例覆盖所有后端实现。"""
+
+import threading
+import time
+
+import pytest
+
+from app.models.schemas import ListingTask, TaskStatus
+from app.tasks.base import StepTiming, TaskRepository
+from app.tasks.factory import build_task_repository
+from app.tasks.repository import SQLiteTaskRepository
+from app.tasks.sqlalchemy_repository import SQLAlchemyTaskRepository
+
+
+@pytest.fixture(params=["sqlite3-file", "sqlalchemy-file", "sqlalchemy-memory"])
+def repo(request, tmp_path) -> TaskRepository:
+    if request.param == "sqlite3-file":
+        instance = SQLiteTaskRepository(str(tmp_path / "autopilot.db"), blob_threshold_bytes=128)
+    elif request.param == "sqlalchemy-file":
+        instance = SQLAlchemyTaskRepository(f"sqlite:///{tmp_path / 'autopilot.db'}", blob_threshold_bytes=128)
+    else:
+        instance = SQLAlchemyTaskRepository("sqlite:///:memory:", blob_threshold_bytes=128)
+    yield instance
+    instance.close()
+
+
+def _task(updated_at: str = "2026-01-01T00:00:00", status: TaskStatus = TaskStatus.drafted) -> ListingTask:
+    task = ListingTask.create("p1", "v1", {"desc": "商品详情" * 60, "tags": ["a"]}, "auto_device")
+    task.status = status
+    task.updated_at = updated_at
+    return task
+
+
+def test_factory_selects_backend_by_path_or_url(tmp_path) -> None:
+    assert isinstance(build_task_repository(str(tmp_path / "a.db")), SQLiteTaskRepository)
+    assert isinstance(build_task_repository(f"sqlite:///{tmp_path / 'b.db'}"), SQLAlchemyTaskRepository)
+
+
+def test_transaction_round_trip(repo: TaskRepository) -> None:
+    task = _task()
+    create_res = {"success": True, "payload": task.input_snapshot}
+
+    with repo.transaction() as uow:
+        uow.log_step(task.task_id, "create_product", True, "ok", create_res, "t1")
+        uow.save_step(task_id=task.task_id, step_name="create_product", status="done", updated_at="t1")
+        uow.save_step(task_id=task.task_id, step_name="set_product_online", status="done", updated_at="t2")
+        task.output = {"create": create_res}
+        uow.save_task(task)
+
+    assert repo.get_task(task.task_id) == task
+    assert [log["payload"] for log in repo.list_logs(task.task_id)] == [create_res]
+    steps = repo.list_steps(task.task_id)
+    assert [step["step_name"] for step in steps] == ["create_product", "set_product_online"]
+
+    detail = repo.get_task_detail(task.task_id)
+    summary = repo.get_task_detail(task.task_id, include_payload=False)
+    assert detail is not None and detail["task"] == task.model_dump() and detail["steps"] == steps
+    assert summary is not None and "output" not in summary["task"] and summary["steps"] == steps
+    assert repo.get_tasks([task.task_id, "missing"]) == {task.task_id: task}
+    assert repo.list_steps_many([task.task_id, "missing"]) == {task.task_id: steps}
+    assert repo.list_logs_many([task.task_id, "missing"]) == {task.task_id: repo.list_logs(task.task_id)}
+
+
+def test_delete_orphans_keeps_rows_of_live_tasks_and_recent_rows(repo: TaskRepository) -> None:
+    live = _task()
+    with repo.transaction() as uow:
+        uow.save_task(live)
+        uow.log_step(live.task_id, "create_product", True, "ok", {}, "2026-01-01T00:00:00")
+        uow.save_step(task_id=live.task_id, step_name="create_product", status="done", updated_at="2026-01-01T00:00:00")
+        for task_id, at in (("gone", "2026-01-01T00:00:00"), ("gone-recent", "2026-03-01T00:00:00")):
+            uow.log_step(task_id, "create_product", False, "boom", {}, at)
+            uow.save_step(task_id=task_id, step_name="create_product", status="failed", updated_at=at)
+
+    assert repo.delete_orphans("2026-02-01T00:00:00") == {"steps": 1, "logs": 1}
+    assert repo.list_steps("gone") == [] and repo.list_logs("gone") == []
+    assert len(repo.list_steps("gone-recent")) == 1 and len(repo.list_logs(live.task_id)) == 1
+
+
+def test_step_timings_round_trip_and_stream_by_window(repo: TaskRepository) -> None:
+    task = _task()
+    timing = StepTiming("2026-01-01T00:00:00", "2026-01-01T00:00:01.500000", 1500.0)
+    with repo.transaction() as uow:
+        uow.save_step(task.task_id, "create_product", "done", "t1", timing=timing, device_id="emulator-5554")
+        uow.save_step(task.task_id, "set_product_online", "failed", "t2")
+        uow.save_task(task)
+
+    first, second = repo.list_steps(task.task_id)
+    assert (first["started_at"], first["finished_at"], first["duration_ms"], first["device_id"]) == (
+        timing.started_at, timing.finished_at, 1500.0, "emulator-5554"
+    )
+    assert second["duration_ms"] is None and second["device_id"] is None
+    assert list(repo.iter_step_durations("2026-01-01", "2026-01-02")) == [
+        ("create_product", "auto_device", "emulator-5554", 1500.0)
+    ]
+    assert list(repo.iter_step_durations("2026-01-02", "2026-01-03")) == []
+
+
+def test_transaction_discards_on_error_and_upserts_task(repo: TaskRepository) -> None:
+    task = _task()
+    with pytest.raises(RuntimeError):
+        with repo.transaction() as uow:
+            uow.save_task(task)
+            raise RuntimeError("boom")
+    assert repo.get_task(task.task_id) is None
+
+    repo.save_task(task)
+    task.status = TaskStatus.done
+    repo.save_task(task)
+    loaded = repo.get_task(task.task_id)
+    assert loaded is not None and loaded.status == TaskStatus.done
+
+
+def test_keyset_pagination_and_expiry(repo: TaskRepository) -> None:
+    tasks = [_task(f"2026-01-0{n % 5 + 1}T00:00:00", TaskStatus.done if n % 2 else TaskStatus.failed) for n in range(9)]
+    for task in tasks:
+        repo.save_task(task)
+
+    expected = sorted((t for t in tasks if t.status == TaskStatus.done), key=lambda t: (t.updated_at, t.task_id))
+    assert [t.task_id for t in repo.iter_tasks(status=TaskStatus.done, page_size=2)] == [t.task_id for t in expected]
+    with pytest.raises(ValueError):
+        repo.list_tasks(after="%%%")
+
+    expired = repo.list_expired_task_ids(TaskStatus.done, "2026-01-03T00:00:00", limit=10)
+    assert expired == [t.task_id for t in expected if t.updated_at < "2026-01-03T00:00:00"]
+    assert repo.delete_tasks(expired)["tasks"] == len(expired)
+    assert all(repo.get_task(task_id) is None for task_id in expired)
+
+    survivor = next(t for t in expected if t.task_id not in expired)
+    assert not repo.touch_task(survivor.task_id, TaskStatus.running, survivor.updated_at, "2026-02-01T00:00:00")
+    assert repo.touch_task(survivor.task_id, TaskStatus.done, survivor.updated_at, "2026-02-01T00:00:00")
+    assert not repo.touch_task(survivor.task_id, TaskStatus.done, survivor.updated_at, "2026-02-02T00:00:00")
+    assert repo.get_task(survivor.task_id).updated_at == "2026-02-01T00:00:00"
+
+
+def test_compact_removes_unreferenced_blobs_only(repo: TaskRepository) -> None:
+    keep, drop = _task(), _task()
+    drop.input_snapshot = {"desc": "待删除" * 80}
+    repo.save_task(keep)
+    repo.save_task(drop)
+
+    repo.delete_tasks([drop.task_id])
+
+    assert repo.compact() == 1
+    assert repo.get_task(keep.task_id) == keep
+
+
+def test_compact_keeps_blobs_referenced_after_the_mark_phase(repo: TaskRepository, monkeypatch) -> None:
+    gone, late = _task(), _task()
+    repo.save_task(gone)
+    repo.delete_tasks([gone.task_id])
+    mark = repo.blobs.live_refs
+
+    def mark_then_concurrent_write(texts, fetch):
+        live = mark(texts, fetch)
+        # 标记结束、取得写锁之前，另一个写入方复用了刚被判定为垃圾的 blob（INSERT OR IGNORE 不会重写）。
+        repo.save_task(late)
+        return live
+
+    monkeypatch.setattr(repo.blobs, "live_refs", mark_then_concurrent_write)
+
+    assert repo.compact() == 0
+    assert repo.get_task(late.task_id) == late
+
+
+def test_concurrent_writer_throughput(repo: TaskRepository) -> None:
+    threads, batches, steps_per_batch = 4, 25, 8
+
+    def writer(worker_id: int) -> None:
+        for batch in range(batches):
+            task = _task()
+            with repo.transaction() as uow:
+                for n in range(steps_per_batch):
+                    uow.save_step(task_id=task.task_id, step_name=f"s{n}", status="done", updated_at=str(batch))
+                uow.save_task(task)
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=writer, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    written = list(repo.iter_tasks(page_size=50))
+    assert len(written) == threads * batches
+    assert all(len(repo.list_steps(task.task_id)) == steps_per_batch for task in written[:5])
+    assert threads * batches * (steps_per_batch + 1) / elapsed > 200
@@ -0,0 +1,73 @@
+from datetime import datetime, timezone
+
+from app.models.schemas import ListingTask, TaskStatus
+from app.tasks.repository import SQLiteTaskRepository
+from app.tasks.retention import TaskRetention, read_segment
+
+NOW = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+def _task(repo: SQLiteTaskRepository, status: TaskStatus, updated_at: str, desc: str) -> ListingTask:
+    task = ListingTask.create("p", "v1", {"desc": desc * 40}, "auto_device")
+    task.status = status
+    task.updated_at = updated_at
+    with repo.transaction() as uow:
+        uow.log_step(task.task_id, "create_product", True, "ok", {"payload": task.input_snapshot}, updated_at)
+        uow.save_step(task_id=task.task_id, step_name="create_product", status="done", updated_at=updated_at)
+        uow.save_task(task)
+    return task
+
+
+def test_retention_archives_expired_terminal_tasks_and_prunes_hot_tables(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"), blob_threshold_bytes=128)
+    old_done = [_task(repo, TaskStatus.done, f"2026-01-0{n}T00:00:00", f"done{n}") for n in range(1, 4)]
+    old_failed = _task(repo, TaskStatus.failed, "2026-01-02T08:00:00", "failed")
+    old_running = _task(repo, TaskStatus.running, "2026-01-01T00:00:00", "running")
+    recent_done = _task(repo, TaskStatus.done, "2026-02-25T00:00:00", "recent")
+
+    retention = TaskRetention(repo, archive_dir=str(tmp_path / "archive"), max_age_days=30, batch_size=2, now=lambda: NOW)
+    report = retention.run()
+
+    assert report.archived_tasks == 4
+    assert report.deleted_steps == 4 and report.deleted_logs == 4
+    assert report.deleted_blobs == 4
+    archived = [record for segment in report.segments for record in read_segment(segment)]
+    assert sorted(r["task"]["task_id"] for r in archived) == sorted(t.task_id for t in [*old_done, old_failed])
+    assert all(len(r["steps"]) == 1 and len(r["logs"]) == 1 for r in archived)
+    assert all(r["logs"][0]["payload"]["payload"] == r["task"]["input_snapshot"] for r in archived)
+    assert any("2026-01-02" in segment for segment in report.segments)
+
+    assert repo.get_task(old_running.task_id) == old_running
+    assert repo.get_task(recent_done.task_id) == recent_done
+    assert repo.get_task(old_failed.task_id) is None
+    assert repo.list_steps(old_failed.task_id) == []
+
+
+def test_retention_noop_when_nothing_expired(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    _task(repo, TaskStatus.done, "2026-02-28T00:00:00", "fresh")
+
+    report = TaskRetention(repo, archive_dir=str(tmp_path / "archive"), now=lambda: NOW).run()
+
+    assert report.archived_tasks == 0 and report.segments == []
+
+
+def test_retention_reads_each_batch_in_bulk_and_sweeps_orphans(tmp_path, monkeypatch) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    expired = [_task(repo, TaskStatus.done, f"2026-01-0{n}T00:00:00", f"done{n}") for n in range(1, 4)]
+    orphan = _task(repo, TaskStatus.done, "2026-01-05T00:00:00", "orphan")
+    repo._connect().execute("DELETE FROM listing_tasks WHERE task_id = ?", (orphan.task_id,))
+    repo._connect().commit()
+
+    def per_task(*_args, **_kwargs):
+        raise AssertionError("归档应按批读取，不应逐个任务查询")
+
+    monkeypatch.setattr(repo, "get_task_detail", per_task)
+    monkeypatch.setattr(repo, "list_logs", per_task)
+    report = TaskRetention(repo, archive_dir=str(tmp_path / "archive"), batch_size=10, now=lambda: NOW).run()
+
+    assert report.archived_tasks == 3 and (report.orphan_steps, report.orphan_logs) == (1, 1)
+    archived = [record for segment in report.segments for record in read_segment(segment)]
+    assert sorted(r["task"]["task_id"] for r in archived) == sorted(t.task_id for t in expired)
+    assert all(len(r["steps"]) == 1 and len(r["logs"]) == 1 for r in archived)
+    assert repo.list_steps(orphan.task_id) == []
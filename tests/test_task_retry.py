@@ -0,0 +1,149 @@
+import random
+import sqlite3
+
+import pytest
+
+from app.channels.device_auto import DeviceAutoChannel
+from app.models.schemas import ListingTask, TaskStatus
+from app.tasks.executor import ListingTaskExecutor
+from app.tasks.repository import SQLiteTaskRepository
+from app.tasks.retry import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+
+class _FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _TimeoutChannel(DeviceAutoChannel):
+    def __init__(self, failures: int) -> None:
+        super().__init__(device_id="test-device")
+        self.failures = failures
+        self.calls = 0
+
+    def create_product(self, payload: dict) -> dict:
+        self.calls += 1
+        if self.failures:
+            self.failures -= 1
+            raise TimeoutError("adb timed out")
+        return super().create_product(payload)
+
+
+def _task() -> tuple[ListingTask, object]:
+    pack = ListingTaskExecutor.build_pack("p1", {"title": "t", "desc": "d", "sale_price": 1, "cost_price": 1})
+    return ListingTask.create("p1", pack.version, pack.model_dump(), "auto_device"), pack
+
+
+def test_retry_policy_backs_off_exponentially_with_bounded_jitter() -> None:
+    policy = RetryPolicy(max_attempts=4, base_delay=1.0, max_delay=5.0, jitter=0.5)
+    rng = random.Random(7)
+
+    delays = [policy.delay(attempt, rng) for attempt in (1, 2, 3, 4)]
+
+    assert 0.5 <= delays[0] <= 1.0
+    assert 1.0 <= delays[1] <= 2.0
+    assert 2.0 <= delays[2] <= 4.0
+    assert 2.5 <= delays[3] <= 5.0
+    assert policy.should_retry(TimeoutError(), 3)
+    assert not policy.should_retry(TimeoutError(), 4)
+    assert not policy.should_retry(ValueError(), 1)
+
+
+def test_circuit_breaker_opens_then_half_opens_after_timeout() -> None:
+    clock = _FakeClock()
+    breaker = CircuitBreaker("auto_device", failure_threshold=2, reset_timeout=10, clock=clock)
+
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now = 10
+    assert breaker.state == "half_open"
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now = 20
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_step_retries_transient_errors_and_records_retry_count(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    sleeps: list[float] = []
+    channel = _TimeoutChannel(failures=2)
+    executor = ListingTaskExecutor(
+        channel=channel,
+        repo=repo,
+        retry_policy=RetryPolicy(max_attempts=3, base_delay=1.0, jitter=0),
+        sleep=sleeps.append,
+    )
+    task, pack = _task()
+
+    result = executor.execute(task, pack)
+
+    assert result.status == TaskStatus.wait_manual_confirm
+    assert channel.calls == 3
+    assert sleeps == [1.0, 2.0]
+    assert [(s["status"], s["retry_count"], s["error"]) for s in repo.list_steps(task.task_id)] == [
+        ("retrying", 0, "adb timed out"),
+        ("retrying", 1, "adb timed out"),
+        ("done", 2, None),
+    ]
+
+
+def test_open_breaker_fails_later_tasks_without_touching_device(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    channel = _TimeoutChannel(failures=100)
+    executor = ListingTaskExecutor(
+        channel=channel,
+        repo=repo,
+        retry_policy=RetryPolicy(max_attempts=2, base_delay=0),
+        breaker_threshold=2,
+        clock=_FakeClock(),
+        sleep=lambda _: None,
+    )
+
+    first = executor.execute(*_task())
+    second = executor.execute(*_task())
+
+    assert first.status == second.status == TaskStatus.failed
+    assert channel.calls == 2
+    assert "熔断" in second.output["error"]
+    assert repo.list_steps(first.task_id)[-1]["retry_count"] == 1
+
+
+def test_repository_error_inside_step_fails_task_instead_of_escaping(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    transaction = repo.transaction
+    calls = {"n": 0}
+
+    def flaky_transaction():
+        calls["n"] += 1
+        if calls["n"] == 2:  # 第一次重试前写 retrying 记录
+            raise sqlite3.OperationalError("database is locked")
+        return transaction()
+
+    repo.transaction = flaky_transaction
+    executor = ListingTaskExecutor(
+        channel=_TimeoutChannel(failures=1),
+        repo=repo,
+        retry_policy=RetryPolicy(max_attempts=3, base_delay=0),
+        sleep=lambda _: None,
+    )
+    task, pack = _task()
+
+    result = executor.execute(task, pack)
+
+    assert result.status == TaskStatus.failed
+    assert result.output["error"] == "database is locked"
+    assert repo.get_task(task.task_id).status == TaskStatus.failed
+    assert [(s["step_name"], s["status"]) for s in repo.list_steps(task.task_id)] == [("create_product", "failed")]
@@ -0,0 +1,144 @@
+import threading
+import time
+
+import pytest
+
+from app.ai_engine.content_generator import AIContentGenerator
+from app.channels.device_auto import DeviceAutoChannel
+from app.models.schemas import ListingTask, ProductCreate, TaskPriority
+from app.product_manager.service import ProductManager
+from app.tasks.executor import ListingTaskExecutor
+from app.tasks.queue import SQLiteTaskQueue
+from app.tasks.repository import SQLiteTaskRepository
+from app.tasks.scheduling import FairShareScheduler
+from app.tasks.sqlalchemy_repository import SQLAlchemyTaskRepository
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _queue_waiters(
+    scheduler: FairShareScheduler,
+    waiters: list[tuple[str, TaskPriority, str]],
+    granted: list[str] | None = None,
+) -> tuple[list[str], list[threading.Thread]]:
+    """依次排入等待者（前一个进入队列后再排下一个），返回按获得准入先后记录的名称。"""
+    granted = [] if granted is None else granted
+    threads: list[threading.Thread] = []
+    base = sum(c["queued"] for c in scheduler.metrics()["classes"].values())
+
+    def wait_for(name: str, priority: TaskPriority, fair_key: str) -> None:
+        with scheduler.slot(priority, fair_key):
+            granted.append(name)
+
+    for queued, (name, priority, fair_key) in enumerate(waiters, start=1):
+        thread = threading.Thread(target=wait_for, args=(name, priority, fair_key))
+        thread.start()
+        threads.append(thread)
+        deadline = time.monotonic() + 5
+        while sum(c["queued"] for c in scheduler.metrics()["classes"].values()) < base + queued:
+            assert time.monotonic() < deadline
+            time.sleep(0.001)
+    return granted, threads
+
+
+def test_urgent_overtakes_bulk_backlog_and_shops_take_turns() -> None:
+    scheduler = FairShareScheduler(slots=1)
+    waiters = [(f"a{n}", TaskPriority.bulk, "shop-a/家居") for n in range(4)]
+    waiters += [("b0", TaskPriority.bulk, "shop-b/家居"), ("b1", TaskPriority.bulk, "shop-b/家居")]
+    waiters += [("urgent", TaskPriority.urgent, "shop-c/美妆")]
+
+    with scheduler.slot(TaskPriority.bulk, "shop-a/家居"):
+        granted, threads = _queue_waiters(scheduler, waiters)
+        metrics = scheduler.metrics()
+    for thread in threads:
+        thread.join(5)
+
+    assert metrics["running"] == 1
+    assert metrics["classes"]["bulk"]["queued"] == 6 and metrics["classes"]["bulk"]["flows"] == 2
+    assert metrics["classes"]["urgent"]["queued"] == 1
+    assert granted == ["urgent", "a0", "b0", "a1", "b1", "a2", "a3"]
+    assert scheduler.metrics()["classes"]["bulk"]["granted"] == 7
+
+
+def test_weights_split_capacity_between_busy_classes() -> None:
+    scheduler = FairShareScheduler(slots=1)
+    waiters = [(f"n{n}", TaskPriority.normal, "") for n in range(8)]
+    waiters += [(f"k{n}", TaskPriority.bulk, "") for n in range(8)]
+
+    with scheduler.slot(TaskPriority.normal):
+        granted, threads = _queue_waiters(scheduler, waiters)
+    for thread in threads:
+        thread.join(5)
+
+    # normal:bulk = 4:1，前 10 次准入中 bulk 占 2 次，之后 normal 排空再轮到 bulk。
+    assert [name[0] for name in granted[:10]].count("k") == 2
+    assert granted[-1].startswith("k")
+
+
+def test_long_waiting_task_is_aged_ahead_of_higher_priority() -> None:
+    clock = _Clock()
+    scheduler = FairShareScheduler(slots=1, max_wait_seconds=60, clock=clock)
+
+    with scheduler.slot(TaskPriority.normal):
+        granted, bulk_threads = _queue_waiters(scheduler, [("bulk", TaskPriority.bulk, "")])
+        clock.now = 30
+        _, urgent_threads = _queue_waiters(scheduler, [("urgent", TaskPriority.urgent, "")], granted)
+        clock.now = 61
+        assert scheduler.metrics()["classes"]["bulk"]["oldest_wait_seconds"] == 61
+    for thread in bulk_threads + urgent_threads:
+        thread.join(5)
+
+    assert granted == ["bulk", "urgent"]
+    assert scheduler.metrics()["classes"]["bulk"]["aged"] == 1
+
+
+def test_scheduler_rejects_bad_config() -> None:
+    with pytest.raises(ValueError):
+        FairShareScheduler(slots=0)
+    with pytest.raises(ValueError):
+        FairShareScheduler(weights={TaskPriority.bulk: 0})
+
+
+@pytest.mark.parametrize("kind", ["sqlite", "sqlalchemy"])
+def test_priority_and_fair_key_round_trip(tmp_path, kind: str) -> None:
+    path = tmp_path / "autopilot.db"
+    repo = SQLiteTaskRepository(str(path)) if kind == "sqlite" else SQLAlchemyTaskRepository(f"sqlite:///{path}")
+    task = ListingTask.create("p1", "v1", {"title": "t"}, "auto_device", TaskPriority.urgent, "shop-a/家居")
+    repo.save_task(task)
+
+    loaded = repo.get_task(task.task_id)
+    summary = repo.get_task_detail(task.task_id, include_payload=False)["task"]
+
+    assert (loaded.priority, loaded.fair_key) == (TaskPriority.urgent, "shop-a/家居")
+    assert (summary["priority"], summary["fair_key"]) == ("urgent", "shop-a/家居")
+
+
+def test_queue_mode_claims_urgent_before_earlier_bulk_import(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    queue = SQLiteTaskQueue(repo)
+    channel = DeviceAutoChannel(device_id="test-device")
+    manager = ProductManager(
+        channel=channel,
+        ai_generator=AIContentGenerator(),
+        task_repo=repo,
+        task_executor=ListingTaskExecutor(channel, repo),
+        operation_mode="auto_device",
+        task_queue=queue,
+    )
+
+    bulk = manager.auto_create_products(
+        [ProductCreate(title=f"商品{n}", cost_price=1, sale_price=2, category="家居") for n in range(3)],
+        priority=TaskPriority.bulk,
+    )
+    urgent = manager.auto_create_product(
+        ProductCreate(title="补货", cost_price=1, sale_price=2, category="美妆", shop="shop-a", priority=TaskPriority.urgent)
+    )
+
+    assert urgent["task"]["fair_key"] == "shop-a/美妆" and bulk[0]["task"]["priority"] == "bulk"
+    assert queue.claim("w1", lease_seconds=30).task_id == urgent["task"]["task_id"]
@@ -0,0 +1,114 @@
+import threading
+
+import pytest
+
+from app.channels.device_auto import DeviceAutoChannel
+from app.models.schemas import ListingTask, TaskStatus
+from app.tasks.executor import ListingTaskExecutor
+from app.tasks.repository import SQLiteTaskRepository
+from app.tasks.steps import RESOURCE_CPU, RESOURCE_NETWORK, ResourceLimiter, StepOutcome, StepRegistry, StepSpec
+
+
+def _noop(task, pack) -> StepOutcome:
+    return StepOutcome({"success": True}, "ok")
+
+
+def test_registry_orders_steps_topologically_and_rejects_bad_graphs() -> None:
+    registry = StepRegistry()
+    registry.register(StepSpec("publish", _noop, depends_on=("upload", "refine")))
+    registry.register(StepSpec("upload", _noop, depends_on=("resize",)))
+    registry.register(StepSpec("refine", _noop, resources=frozenset({RESOURCE_NETWORK})))
+    registry.register(StepSpec("resize", _noop, resources=frozenset({RESOURCE_CPU})))
+
+    assert registry.names == ("refine", "resize", "upload", "publish")
+    assert registry.ready(done={"resize"}, started={"refine"}) == ["upload"]
+
+    with pytest.raises(ValueError):
+        registry.register(StepSpec("resize", _noop))
+    with pytest.raises(ValueError):
+        _ = StepRegistry([StepSpec("a", _noop, depends_on=("b",)), StepSpec("b", _noop, depends_on=("a",))]).names
+    with pytest.raises(ValueError):
+        _ = StepRegistry([StepSpec("a", _noop, depends_on=("missing",))]).names
+    with pytest.raises(ValueError):
+        ResourceLimiter({RESOURCE_CPU: 0})
+
+
+def test_executor_runs_independent_steps_in_parallel_and_serializes_device(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    both_started = threading.Barrier(2, timeout=5)
+    device_lock = threading.Lock()
+    overlaps: list[str] = []
+    registry = StepRegistry()
+
+    @registry.step("preprocess_images", resources=(RESOURCE_CPU,))
+    def preprocess(task, pack) -> StepOutcome:
+        both_started.wait()
+        return StepOutcome({"success": True}, "图片处理完成", {"images": ["a.webp"]})
+
+    @registry.step("refine_copy", resources=(RESOURCE_NETWORK,))
+    def refine(task, pack) -> StepOutcome:
+        both_started.wait()
+        return StepOutcome({"success": True}, "文案优化完成", {"title": "优化标题"})
+
+    def device_step(name: str):
+        def handler(task, pack) -> StepOutcome:
+            if not device_lock.acquire(blocking=False):
+                overlaps.append(name)
+                return StepOutcome({"success": True}, name)
+            try:
+                threading.Event().wait(0.02)
+            finally:
+                device_lock.release()
+            return StepOutcome({"success": True}, name, {name: task.output.get("title")})
+
+        return handler
+
+    registry.register(StepSpec("fill_form", device_step("fill_form"), depends_on=("refine_copy",)))
+    registry.register(StepSpec("upload_images", device_step("upload_images"), depends_on=("preprocess_images",)))
+    registry.register(StepSpec("publish", device_step("publish"), depends_on=("fill_form", "upload_images"), confirm_gated=True))
+
+    executor = ListingTaskExecutor(DeviceAutoChannel(device_id="test-device"), repo, registry=registry)
+    pack = ListingTaskExecutor.build_pack("p1", {"title": "t", "desc": "d", "sale_price": 1, "cost_price": 1})
+    task = ListingTask.create("p1", pack.version, pack.model_dump(), "auto_device")
+
+    waiting = executor.execute(task, pack)
+
+    assert waiting.status == TaskStatus.wait_manual_confirm
+    assert overlaps == []
+    assert waiting.output["images"] == ["a.webp"] and waiting.output["fill_form"] == "优化标题"
+    steps = repo.list_steps(task.task_id)
+    assert {s["step_name"] for s in steps} == {"preprocess_images", "refine_copy", "fill_form", "upload_images"}
+    assert {s["step_name"]: s["device_id"] for s in steps}["refine_copy"] is None
+    assert executor.confirm_and_publish(task.task_id).status == TaskStatus.done
+
+    step_threads = list(executor._step_pool._threads)
+    executor.close()
+    assert step_threads and not any(thread.is_alive() for thread in step_threads)
+
+
+def test_failed_branch_waits_for_running_siblings_then_fails_task(tmp_path) -> None:
+    repo = SQLiteTaskRepository(str(tmp_path / "autopilot.db"))
+    registry = StepRegistry()
+    started = threading.Event()
+
+    @registry.step("slow_cpu", resources=(RESOURCE_CPU,))
+    def slow(task, pack) -> StepOutcome:
+        started.wait(5)
+        return StepOutcome({"success": True}, "ok", {"slow": True})
+
+    @registry.step("broken_network", resources=(RESOURCE_NETWORK,))
+    def broken(task, pack) -> StepOutcome:
+        started.set()
+        raise ValueError("bad response")
+
+    registry.register(StepSpec("publish", _noop, depends_on=("slow_cpu", "broken_network")))
+    executor = ListingTaskExecutor(DeviceAutoChannel(device_id="test-device"), repo, registry=registry)
+    pack = ListingTaskExecutor.build_pack("p1", {"title": "t", "desc": "d", "sale_price": 1, "cost_price": 1})
+
+    failed = executor.execute(ListingTask.create("p1", pack.version, pack.model_dump(), "auto_device"), pack)
+
+    assert failed.status == TaskStatus.failed and failed.output["slow"] is True
+    assert sorted((s["step_name"], s["status"]) for s in repo.list_steps(failed.task_id)) == [
+        ("broken_network", "failed"),
+        ("slow_cpu", "done"),
+    ]
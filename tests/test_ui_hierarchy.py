@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from app.channels.android_device_client import AndroidDeviceClient
+from app.channels.ui_hierarchy import UiDumpError, UiHierarchy, extract_hierarchy_xml, parse_hierarchy
+
+_DUMP = """<?xml version='1.0' encoding='UTF-8' standalone='yes' ?><hierarchy rotation="0">
+<node index="0" text="" resource-id="" class="android.widget.FrameLayout" package="com.xingin.xhs" content-desc="" clickable="false" enabled="true" bounds="[0,0][1080,2400]">
+<node index="0" text="发布商品" resource-id="com.xingin.xhs:id/menu_goods" class="android.widget.TextView" package="com.xingin.xhs" content-desc="" clickable="true" enabled="true" bounds="[100,1600][980,1720]" />
+<node index="1" text="发布" resource-id="com.xingin.xhs:id/submit" class="android.widget.Button" package="com.xingin.xhs" content-desc="" clickable="true" enabled="true" bounds="[40,2200][1040,2320]" />
+<node index="2" text="发布" resource-id="" class="android.widget.TextView" package="com.xingin.xhs" content-desc="" clickable="false" enabled="true" bounds="[0,0][0,0]" />
+<node index="3" text="" resource-id="com.xingin.xhs:id/close" class="android.widget.ImageView" package="com.xingin.xhs" content-desc="关闭" clickable="true" enabled="true" bounds="[980,60][1060,140]" />
+</node>
+</hierarchy>
+UI hierchary dumped to: /dev/tty
+"""
+
+
+def test_parse_hierarchy_indexes_visible_nodes_in_document_order() -> None:
+    index = parse_hierarchy(extract_hierarchy_xml(_DUMP.encode()))
+
+    assert len(index) == 5
+    assert [node.text for node in index.nodes[:3]] == ["", "发布商品", "发布"]
+    submit = index.find(text="发布")
+    assert submit is not None and submit.resource_id == "com.xingin.xhs:id/submit"
+    assert submit.center == (540, 2260) and submit.clickable
+    # 零面积的节点不可见，不参与查找。
+    assert len(index.find_all(text="发布")) == 1
+    assert index.find(content_desc="关闭").bounds == (980, 60, 1060, 140)
+    assert index.find(resource_id="com.xingin.xhs:id/menu_goods").text == "发布商品"
+    assert index.find(text="商品", contains=True).text == "发布商品"
+    assert index.find(text="商品") is None
+    assert index.find(text="发布", resource_id="com.xingin.xhs:id/close") is None
+    with pytest.raises(ValueError):
+        index.find()
+    with pytest.raises(UiDumpError):
+        extract_hierarchy_xml(b"ERROR: could not get idle state.\n")
+
+
+def test_hierarchy_cache_invalidated_by_screen_changes() -> None:
+    version, now, fetches = [0], [0.0], []
+
+    def fetch() -> bytes:
+        fetches.append(now[0])
+        return _DUMP.encode()
+
+    ui = UiHierarchy(fetch, lambda: version[0], max_age_seconds=5, clock=lambda: now[0])
+
+    assert ui.find(text="发布商品") is not None
+    assert ui.find(content_desc="关闭") is not None
+    assert ui.dumps == 1
+    version[0] += 1
+    ui.find(text="发布")
+    assert ui.dumps == 2
+    ui.invalidate()
+    ui.find(text="发布")
+    now[0] = 6.0
+    ui.find(text="发布")
+    assert fetches == [0.0, 0.0, 0.0, 6.0]
+
+
+@pytest.mark.skipif(os.name != "posix", reason="假 adb 依赖 /bin/sh")
+def test_client_taps_element_from_exec_out_dump(fake_adb, tmp_path) -> None:
+    (tmp_path / "dump.xml").write_text(_DUMP, encoding="utf-8")
+    taps = tmp_path / "taps.log"
+    adb = fake_adb({"uiautomator": f"cat {tmp_path / 'dump.xml'}", "input": f'echo "$@" >> {taps}'})
+    client = AndroidDeviceClient("emulator-5554", adb_path=adb, artifact_dir=str(tmp_path / "art"), shell_session=True)
+
+    try:
+        assert client.find_element(text="发布商品").center == (540, 1660)
+        assert client.tap_element(text="发布商品")
+        assert not client.tap_element(text="不存在的按钮")
+        assert client.tap_element(content_desc="关闭")
+    finally:
+        client.close()
+
+    assert taps.read_text().splitlines() == ["tap 540 1660", "tap 1020 100"]
+    # 首次查找 dump 一次；每次点击后界面视为已变化，下一次查找重新 dump。
+    assert client.ui.dumps == 2
+    assert client.latency.summary()["exec-out uiautomator"]["count"] == 2